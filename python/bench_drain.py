@@ -0,0 +1,50 @@
+import time
+import uuid
+import click
+from kafka import KafkaProducer
+from kafka.admin import KafkaAdminClient, NewTopic
+from kafka_drain import drain_consumer, drain_fetch, drain_offsets
+from metrics import OutputTimeline
+
+# Output-like record, roughly the size of a q0 result
+SAMPLE_VALUE = (b'{"auction":1000,"bidder":2001,"price":1234567,'
+                b'"date_time":"2024-01-01 00:00:00.000","extra":"' + b'x' * 60 + b'"}')
+
+def produce(bootstrap: str, topic: str, records: int, partitions: int):
+    producer = KafkaProducer(bootstrap_servers=bootstrap, linger_ms=20, batch_size=512 * 1024, acks=1)
+    for i in range(records):
+        producer.send(topic, value=SAMPLE_VALUE, partition=i % partitions)
+    producer.flush()
+    producer.close()
+
+@click.command()
+@click.option('--bootstrap', default='localhost:19092', help='Kafka bootstrap servers')
+@click.option('--records', default=1000000, help='Number of records to produce')
+@click.option('--partitions', default=1, help='Partitions of the benchmark topic')
+@click.option('--modes', default='consumer,fetch,offsets', help='Drain modes to measure (comma-separated)')
+@click.option('--idle-timeout', default=1.0, help='Seconds of an empty poll; three end a drain')
+def main(bootstrap, records, partitions, modes, idle_timeout):
+    """Measure output drain rate of each drain mode against a local broker"""
+    topic = f'nexmark_drain_bench_{uuid.uuid4().hex[:8]}'
+    admin = KafkaAdminClient(bootstrap_servers=bootstrap)
+    admin.create_topics([NewTopic(topic, num_partitions=partitions, replication_factor=1)])
+
+    try:
+        start = time.time()
+        produce(bootstrap, topic, records, partitions)
+        print(f"Produced {records} records to {topic} in {time.time() - start:.2f}s")
+
+        drains = {'consumer': drain_consumer, 'fetch': drain_fetch, 'offsets': drain_offsets}
+        print(f"{'Mode':<10} {'Records':>10} {'Drain (s)':>10} {'Records/s':>12}")
+        for mode in [m.strip() for m in modes.split(',')]:
+            start = time.time()
+            size = drains[mode](bootstrap, topic, idle_timeout, 3, OutputTimeline())
+            # Idle polls are the completion tail, not drain time
+            elapsed = max(time.time() - start - 3 * idle_timeout, 1e-6)
+            print(f"{mode:<10} {size:>10} {elapsed:>10.2f} {size / elapsed:>12.0f}")
+    finally:
+        admin.delete_topics([topic])
+        admin.close()
+
+if __name__ == '__main__':
+    main()
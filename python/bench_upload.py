@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import click
+import report_upload
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Accepts JSONEachRow inserts like the Timeplus HTTP interface, keeping rows by (stream, report_time, seq)"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        time.sleep(server.latency)
+        if random.random() < server.fail_rate:
+            self.send_response(503)
+            self.end_headers()
+            return
+        query = parse_qs(urlparse(self.path).query).get('query', [''])[0]
+        if query.startswith('INSERT INTO'):
+            stream = query.split()[2]
+            rows = [json.loads(line) for line in body.splitlines() if line]
+            with server.lock:
+                server.requests += 1
+                server.received += len(rows)
+                for row in rows:
+                    server.rows[(stream, row['report_time'], row['seq'])] = row
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def write_report(report_time: str, samples: int, containers: int):
+    start = datetime.now()
+    with open(f'stats_report_{report_time}.json', 'w') as f:
+        for i in range(samples):
+            f.write(json.dumps({
+                'timestamp': (start + timedelta(seconds=i // containers)).isoformat(),
+                'cpu_percent': random.uniform(0, 200), 'cpu_seconds': random.uniform(0, 2),
+                'memory_usage_bytes': 2.0e9, 'memory_rss_bytes': 1.5e9, 'memory_limit_bytes': 4.0e9,
+                'net_rx_bytes': 1.0e6, 'net_tx_bytes': 1.0e6, 'blk_read_bytes': 0.0, 'blk_write_bytes': 4096.0,
+                'cpu_pressure_us': None, 'memory_pressure_us': None, 'io_pressure_us': None,
+                'case': f'flink_q{i % 23}', 'container_name': f'container-{i % containers}'
+            }) + '\n')
+    with open(f'report_{report_time}.csv', 'w') as f:
+        f.write('case,platform,execution_time,output_size,error\n')
+        for i in range(23):
+            f.write(f'q{i},flink,{random.uniform(10, 60):.3f},{random.randint(0, 10 ** 6)},\n')
+
+@click.command()
+@click.option('--samples', default=1000000, help='Stats samples in the synthetic report')
+@click.option('--containers', default=3, help='Containers the samples are spread over')
+@click.option('--batch-bytes', default=4 * 1024 * 1024, help='Maximum encoded size of one insert')
+@click.option('--concurrency', default=4, help='Concurrent insert connections')
+@click.option('--latency-ms', default=20, help='Simulated server latency per request')
+@click.option('--fail-rate', default=0.05, help='Fraction of requests the stand-in rejects with 503')
+def main(samples, containers, batch_bytes, concurrency, latency_ms, fail_rate):
+    """Measure report upload throughput against a local HTTP stand-in for Timeplus"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.latency = latency_ms / 1000
+    server.fail_rate = fail_rate
+    server.lock = threading.Lock()
+    server.rows = {}
+    server.requests = 0
+    server.received = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            report_time = datetime.now().strftime('%Y%m%d%H%M%S')
+            write_report(report_time, samples, containers)
+            client = report_upload.TimeplusHttp('127.0.0.1', server.server_address[1], 'bench', 'bench',
+                                                pool_size=concurrency, initial_backoff=0.01)
+            start = time.time()
+            stats, results = report_upload.upload_report(client, report_time, batch_bytes, concurrency)
+            elapsed = time.time() - start
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+
+    print(f"Uploaded {stats} stats and {results} result rows in {elapsed:.2f}s "
+          f"({(stats + results) / elapsed:.0f} rows/s, {server.requests} inserts)")
+    # Retried batches may be received twice, but keyed rows must match the report exactly
+    print(f"Rows received: {server.received}, distinct keys: {len(server.rows)}")
+    if len(server.rows) != stats + results:
+        raise SystemExit(f"Expected {stats + results} distinct rows")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import os
+import re
+import click
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from platforms import PLATFORMS
+from verification import APPEND, UPSERT, output_mode
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts')
+# Scripts of a pair without an implementation write one fixed message to the output topic
+PLACEHOLDER = re.compile(r'\bmessage\s+(VARCHAR|string)\b', re.IGNORECASE)
+
+ALL_PLATFORMS = tuple(PLATFORMS)
+
+@dataclass(frozen=True)
+class Case:
+    """One Nexmark case: its scripts, output and the platforms implementing it"""
+    name: str
+    description: str
+    platforms: Tuple[str, ...] = ALL_PLATFORMS  # platforms whose script implements the case
+    upsert: Tuple[str, ...] = ()  # platforms whose script writes a keyed changelog, the others an append stream
+    unverifiable: Optional[str] = None  # why the case has no one expected output, else reference.py computes it
+    placeholder: bool = False  # writes a fixed message on every platform, checking connectivity only
+
+    @property
+    def topic(self) -> str:
+        """Output topic of the scripts, namespaced per job by JobContext.topic"""
+        return f'NEXMARK_{self.name.upper()}'
+
+    def script(self, platform: str) -> str:
+        """Script path relative to the scripts directory"""
+        return os.path.join(platform, f'{self.name}.sql')
+
+    def supports(self, platform: str) -> bool:
+        return platform in self.platforms
+
+    def output_mode(self, platform: str) -> str:
+        return UPSERT if platform in self.upsert else APPEND
+
+CASES = [
+    Case('base', 'Connectivity check', placeholder=True, unverifiable='fixed message'),
+    Case('q0', 'Pass through'),
+    Case('q1', 'Currency conversion'),
+    Case('q2', 'Selection'),
+    Case('q3', 'Local item suggestion'),
+    Case('q4', 'Average price for a category', upsert=('flink', 'ksqldb')),
+    Case('q5', 'Hot items', platforms=('flink', 'timeplus'), upsert=('flink',)),
+    Case('q6', 'Average selling price by seller', platforms=('timeplus',),
+         unverifiable='no Flink script for the reference evaluator to follow'),
+    Case('q7', 'Highest bid', platforms=('flink', 'timeplus')),
+    Case('q8', 'Monitor new users', platforms=('flink', 'timeplus')),
+    Case('q9', 'Winning bids', platforms=('flink', 'timeplus'), upsert=('flink',)),
+    Case('q10', 'Log to file system'),
+    Case('q11', 'User sessions'),
+    Case('q12', 'Processing time windows', unverifiable='processing-time windows'),
+    Case('q13', 'Bounded side input join', platforms=(), unverifiable='no implementation'),
+    Case('q14', 'Calculation', platforms=('flink', 'timeplus')),
+    Case('q15', 'Bidding statistics report', platforms=('flink', 'timeplus'), upsert=('flink',)),
+    Case('q16', 'Channel statistics report', platforms=('flink', 'timeplus'), upsert=('flink',)),
+    Case('q17', 'Auction statistics report', platforms=('flink', 'timeplus'), upsert=('flink',)),
+    Case('q18', 'Find last bid', platforms=('flink', 'timeplus'), upsert=('flink',)),
+    Case('q19', 'Auction top-k', platforms=('flink', 'timeplus'), upsert=('flink',),
+         unverifiable='the top-10 changelog keyed by auction keeps an arbitrary one of the ten rows'),
+    Case('q20', 'Expand bid with auction'),
+    Case('q21', 'Add channel id'),
+    Case('q22', 'Get URL directories'),
+]
+CASE_MANIFEST: Dict[str, Case] = {case.name: case for case in CASES}
+
+def get_case(name: str) -> Case:
+    if name not in CASE_MANIFEST:
+        raise RuntimeError(f"Unknown case: {name}, add it to the case manifest in cases.py")
+    return CASE_MANIFEST[name]
+
+def check_manifest(scripts_dir: str = SCRIPTS_DIR) -> List[str]:
+    """Disagreements between the manifest and the scripts, empty when they agree"""
+    problems = []
+    for case in CASES:
+        for platform in PLATFORMS:
+            path = os.path.join(scripts_dir, case.script(platform))
+            if not os.path.exists(path):
+                if case.supports(platform):
+                    problems.append(f"{case.name} on {platform}: {path} is missing")
+                continue
+            with open(path, 'r') as f:
+                script = f.read()
+            placeholder = PLACEHOLDER.search(script) is not None
+            if not case.supports(platform):
+                if not placeholder:
+                    problems.append(f"{case.name} on {platform}: the script implements the case, "
+                                    f"the manifest does not list {platform}")
+                continue
+            if placeholder != case.placeholder:
+                problems.append(f"{case.name} on {platform}: the script is {'a' if placeholder else 'not a'} placeholder")
+            if not re.search(rf'\b{case.topic}\b', script, re.IGNORECASE):
+                problems.append(f"{case.name} on {platform}: the script does not write {case.topic}")
+            mode = output_mode(platform, script)
+            if mode != case.output_mode(platform):
+                problems.append(f"{case.name} on {platform}: the script writes {mode} output, "
+                                f"the manifest declares {case.output_mode(platform)}")
+    return problems
+
+@click.group()
+def cli():
+    """Case manifest of the benchmark"""
+
+@cli.command()
+@click.option('--scripts', default=SCRIPTS_DIR, help='Scripts directory, one subdirectory per platform')
+def check(scripts):
+    """Check that the manifest agrees with the scripts"""
+    problems = check_manifest(scripts)
+    for problem in problems:
+        print(problem)
+    if problems:
+        raise SystemExit(1)
+    print(f"{len(CASES)} cases agree with the scripts of {', '.join(PLATFORMS)}")
+
+@cli.command()
+def table():
+    """Print the platform support of every case as a Markdown table"""
+    labels = [platform.label for platform in PLATFORMS.values()]
+    print('| Query | ' + ' | '.join(labels) + ' | Description |')
+    print('|-------|' + '|'.join('-' * (len(label) + 2) for label in labels) + '|-------------|')
+    for case in CASES:
+        marks = ['✅' if case.supports(platform) else '❌' for platform in PLATFORMS]
+        print(f'| {case.name} | ' + ' | '.join(marks) + f' | {case.description} |')
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,163 @@
+import time
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+from kafka import KafkaConsumer, TopicPartition
+from kafka_drain import record_bounds
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class OutputState:
+    """Progress of an output topic as seen by a completion watcher"""
+    end_offsets: Dict[int, int]
+    total: int
+    started_at: float  # wall clock when watching started
+    last_change: float  # wall clock when the end offsets last moved
+
+@dataclass
+class Completion:
+    """When a query finished producing output, and when that was noticed"""
+    detector: str
+    completed_at: float  # epoch seconds of the last output record (or last offset change)
+    detected_at: float  # epoch seconds when the detector fired
+    end_offsets: Dict[int, int]
+    timed_out: bool = False
+
+    @property
+    def detection_delay(self) -> float:
+        return self.detected_at - self.completed_at
+
+class CompletionDetector(ABC):
+    """Decides from the output state (and possibly the engine) that a query has finished"""
+    name = 'base'
+
+    @abstractmethod
+    def is_complete(self, state: OutputState, now: float) -> bool:
+        """Whether the query has finished producing output"""
+
+class StableWatermarkDetector(CompletionDetector):
+    """Complete once the output high watermark has not moved for stable_ms"""
+    name = 'watermark'
+
+    def __init__(self, stable_ms: int, empty_timeout: float):
+        self.stable_ms = stable_ms
+        self.empty_timeout = empty_timeout  # queries without output are complete after this long
+
+    def is_complete(self, state: OutputState, now: float) -> bool:
+        if state.total == 0:
+            return now - state.started_at >= self.empty_timeout
+        return (now - state.last_change) * 1000 >= self.stable_ms
+
+class EngineProgressDetector(CompletionDetector):
+    """Complete once the engine reports it consumed the input end offsets and the output settled.
+
+    While the engine reports no progress for the job (pending is None or fails), the fallback decides.
+    """
+    name = 'engine'
+
+    def __init__(self, pending: Callable[[], Optional[float]], settle_ms: int, fallback: CompletionDetector):
+        self.pending = pending
+        self.settle_ms = settle_ms
+        self.fallback = fallback
+        self.reported = True
+
+    def is_complete(self, state: OutputState, now: float) -> bool:
+        if (now - state.last_change) * 1000 < self.settle_ms:
+            return False
+        try:
+            pending = self.pending()
+        except Exception as e:
+            logger.debug(f"Engine progress not available: {e}")
+            pending = None
+        if pending is None:
+            if self.reported:
+                logger.info(f"Engine reports no progress for the job, detecting completion by {self.fallback.name}")
+                self.reported = False
+            return self.fallback.is_complete(state, now)
+        self.reported = True
+        return pending == 0
+
+class ExpectedCountDetector(CompletionDetector):
+    """Complete once the output holds the expected number of records, for deterministic queries"""
+    name = 'expected'
+
+    def __init__(self, expected: int):
+        self.expected = expected
+
+    def is_complete(self, state: OutputState, now: float) -> bool:
+        return state.total >= self.expected
+
+class CompletionWatcher:
+    """Polls an output topic's end offsets until a detector fires or the deadline passes"""
+
+    def __init__(self, bootstrap_servers: str, topic: str, detector: CompletionDetector,
+                 poll_interval: float = 0.1, deadline: float = 3600.0):
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.detector = detector
+        self.poll_interval = poll_interval
+        self.deadline = deadline
+
+    def _offsets(self, consumer: KafkaConsumer) -> Dict[int, Tuple[int, int]]:
+        partitions = consumer.partitions_for_topic(self.topic)
+        if not partitions:
+            return {}
+        tps = [TopicPartition(self.topic, p) for p in sorted(partitions)]
+        beginning = consumer.beginning_offsets(tps)
+        end = consumer.end_offsets(tps)
+        return {tp.partition: (beginning[tp], end[tp]) for tp in tps}
+
+    def wait(self, started_at: Optional[float] = None) -> Completion:
+        started_at = started_at or time.time()
+        state = OutputState(end_offsets={}, total=0, started_at=started_at, last_change=started_at)
+        offsets: Dict[int, Tuple[int, int]] = {}
+        timed_out = False
+
+        # One consumer for all polls, so each poll is a ListOffsets round trip rather than a new connection
+        consumer = KafkaConsumer(bootstrap_servers=self.bootstrap_servers, enable_auto_commit=False)
+        try:
+            while True:
+                now = time.time()
+                try:
+                    offsets = self._offsets(consumer)
+                    end_offsets = {partition: end for partition, (_, end) in offsets.items()}
+                    if end_offsets != state.end_offsets:
+                        state.end_offsets = end_offsets
+                        state.total = sum(end - begin for begin, end in offsets.values())
+                        state.last_change = now
+                except Exception as e:
+                    logger.debug(f"Failed to read end offsets of {self.topic}: {e}")
+
+                if self.detector.is_complete(state, now):
+                    break
+                if now - started_at >= self.deadline:
+                    logger.warning(f"Completion of {self.topic} not detected within {self.deadline}s")
+                    timed_out = True
+                    break
+                time.sleep(self.poll_interval)
+        finally:
+            consumer.close()
+
+        detected_at = time.time()
+        completed_at = state.last_change
+        if state.total:
+            # The last output record's log-append timestamp is when the output really completed
+            try:
+                bounds = record_bounds(self.bootstrap_servers, self.topic, offsets)
+                if bounds:
+                    completed_at = bounds[1] / 1000
+            except Exception as e:
+                logger.debug(f"Failed to read last output record of {self.topic}: {e}")
+
+        completion = Completion(
+            detector=self.detector.name,
+            completed_at=completed_at,
+            detected_at=detected_at,
+            end_offsets=state.end_offsets,
+            timed_out=timed_out
+        )
+        logger.info(f"Completion of {self.topic} detected by {completion.detector}: {state.total} records, "
+                    f"detection delay {completion.detection_delay:.3f}s")
+        return completion
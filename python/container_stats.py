@@ -0,0 +1,343 @@
+import os
+import time
+import math
+import logging
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import docker
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+# Columns of one sample; counters are deltas since the container's previous sample, NaN if a backend lacks them
+STAT_FIELDS = ['timestamp', 'cpu_percent', 'cpu_seconds', 'memory_usage_bytes', 'memory_rss_bytes',
+               'memory_limit_bytes', 'net_rx_bytes', 'net_tx_bytes', 'blk_read_bytes', 'blk_write_bytes',
+               'cpu_pressure_us', 'memory_pressure_us', 'io_pressure_us']
+CPU_SECONDS = STAT_FIELDS.index('cpu_seconds')
+MEMORY_USAGE = STAT_FIELDS.index('memory_usage_bytes')
+COUNTER_FIELDS = ['cpu_seconds', 'net_rx_bytes', 'net_tx_bytes', 'blk_read_bytes', 'blk_write_bytes',
+                  'cpu_pressure_us', 'memory_pressure_us', 'io_pressure_us']
+
+class StatsRing:
+    """Fixed-capacity numeric columns, overwriting the oldest sample once full"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.columns = {name: array('d', bytes(8 * capacity)) for name in STAT_FIELDS}
+        self.size = 0
+        self.next = 0
+        self.dropped = 0
+        self.appended = 0
+
+    def append(self, values: Sequence[float]):
+        for name, value in zip(STAT_FIELDS, values):
+            self.columns[name][self.next] = value
+        self.next = (self.next + 1) % self.capacity
+        self.appended += 1
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.dropped += 1
+
+    def rows(self, since: int = 0) -> Iterator[Tuple[float, ...]]:
+        """Samples from oldest to newest, skipping the first since samples ever appended"""
+        skip = max(0, since - (self.appended - self.size))
+        start = (self.next - self.size) % self.capacity
+        columns = [self.columns[name] for name in STAT_FIELDS]
+        for i in range(skip, self.size):
+            index = (start + i) % self.capacity
+            yield tuple(column[index] for column in columns)
+
+def derive_stats(stats: Dict) -> Optional[Dict[str, float]]:
+    """Reduce one Docker stats document to CPU %, memory and cumulative I/O counters"""
+    if not stats.get('read') or stats['read'].startswith('0001-'):
+        return None  # the container is not running
+
+    cpu = stats.get('cpu_stats', {})
+    precpu = stats.get('precpu_stats', {})
+    cpu_delta = cpu.get('cpu_usage', {}).get('total_usage', 0) - precpu.get('cpu_usage', {}).get('total_usage', 0)
+    system_delta = cpu.get('system_cpu_usage', 0) - precpu.get('system_cpu_usage', 0)
+    online_cpus = cpu.get('online_cpus') or len(cpu.get('cpu_usage', {}).get('percpu_usage') or []) or 1
+    cpu_percent = cpu_delta / system_delta * online_cpus * 100 if system_delta > 0 and cpu_delta >= 0 else 0.0
+
+    memory = stats.get('memory_stats', {})
+    memory_detail = memory.get('stats', {})
+    # 'rss' on cgroup v1, 'anon' on cgroup v2
+    rss = memory_detail.get('rss', memory_detail.get('anon', memory.get('usage', 0)))
+
+    networks = stats.get('networks') or {}
+    blkio = (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []
+    return {
+        'cpu_percent': cpu_percent,
+        'cpu_seconds': cpu.get('cpu_usage', {}).get('total_usage', 0) / 1e9,
+        'memory_usage_bytes': float(memory.get('usage', 0)),
+        'memory_rss_bytes': float(rss),
+        'memory_limit_bytes': float(memory.get('limit', 0)),
+        'net_rx_bytes': float(sum(n.get('rx_bytes', 0) for n in networks.values())),
+        'net_tx_bytes': float(sum(n.get('tx_bytes', 0) for n in networks.values())),
+        'blk_read_bytes': float(sum(e.get('value', 0) for e in blkio if e.get('op', '').lower() == 'read')),
+        'blk_write_bytes': float(sum(e.get('value', 0) for e in blkio if e.get('op', '').lower() == 'write')),
+        'cpu_pressure_us': math.nan,
+        'memory_pressure_us': math.nan,
+        'io_pressure_us': math.nan
+    }
+
+class ContainerStream(threading.Thread):
+    """Follows one container's Docker stats stream, keeping only the latest derived sample"""
+
+    def __init__(self, container: docker.models.containers.Container, stop_event: threading.Event):
+        super().__init__(daemon=True, name=f'stats-{container.name}')
+        self.container = container
+        self.stop_event = stop_event
+        self.latest: Optional[Dict[str, float]] = None
+
+    def run(self):
+        try:
+            # The daemon pushes one document per second over a single long-lived request
+            for stats in self.container.stats(stream=True, decode=True):
+                if self.stop_event.is_set():
+                    break
+                sample = derive_stats(stats)
+                if sample is None:
+                    break
+                self.latest = sample
+        except docker.errors.NotFound:
+            logger.debug(f"Container {self.container.name} removed during collection")
+        except Exception as e:
+            if not self.stop_event.is_set():
+                logger.warning(f"Stats stream of {self.container.name} ended: {e}")
+
+    def read(self) -> Optional[Dict[str, float]]:
+        return self.latest
+
+def resolve_cgroup(container: docker.models.containers.Container) -> Optional[str]:
+    """cgroup v2 directory of a container, or None if cgroup v2 files are not readable here"""
+    if not os.path.exists(os.path.join(CGROUP_ROOT, 'cgroup.controllers')):
+        return None
+    candidates = []
+    pid = container.attrs.get('State', {}).get('Pid')
+    if pid:
+        try:
+            with open(f'/proc/{pid}/cgroup') as f:
+                candidates += [CGROUP_ROOT + line[3:].strip() for line in f if line.startswith('0::')]
+        except OSError:
+            pass
+    # systemd and cgroupfs cgroup drivers
+    candidates += [os.path.join(CGROUP_ROOT, 'system.slice', f'docker-{container.id}.scope'),
+                   os.path.join(CGROUP_ROOT, 'docker', container.id)]
+    for path in candidates:
+        if os.access(os.path.join(path, 'cpu.stat'), os.R_OK):
+            return path
+    return None
+
+class CgroupReader:
+    """Reads a container's metrics straight from its cgroup v2 files, cheap enough for 10-100 Hz"""
+
+    def __init__(self, container: docker.models.containers.Container, path: str):
+        self.name = container.name
+        self.path = path
+        self.fds: Dict[str, int] = {}
+        for name in ('cpu.stat', 'memory.current', 'memory.stat', 'memory.max', 'io.stat',
+                     'cpu.pressure', 'memory.pressure', 'io.pressure'):
+            try:
+                self.fds[name] = os.open(os.path.join(path, name), os.O_RDONLY)
+            except OSError:
+                pass  # controllers not enabled for this cgroup, or PSI disabled
+        pid = container.attrs.get('State', {}).get('Pid')
+        try:
+            # The container's network namespace, seen through its init process
+            self.fds['net/dev'] = os.open(f'/proc/{pid}/net/dev', os.O_RDONLY)
+        except OSError:
+            pass
+        self.alive = True
+        self.previous: Optional[Tuple[float, float]] = None
+
+    @classmethod
+    def open(cls, container: docker.models.containers.Container) -> Optional['CgroupReader']:
+        path = resolve_cgroup(container)
+        return cls(container, path) if path else None
+
+    def _read(self, name: str) -> Optional[str]:
+        fd = self.fds.get(name)
+        if fd is None:
+            return None
+        return os.pread(fd, 65536, 0).decode()
+
+    @staticmethod
+    def _flat(text: Optional[str]) -> Dict[str, int]:
+        values = {}
+        for line in (text or '').splitlines():
+            key, _, value = line.partition(' ')
+            if value.isdigit():
+                values[key] = int(value)
+        return values
+
+    @staticmethod
+    def _pressure(text: Optional[str]) -> float:
+        for line in (text or '').splitlines():
+            if line.startswith('some '):
+                return float(line.rsplit('total=', 1)[-1])
+        return math.nan
+
+    def _io(self) -> Tuple[float, float]:
+        read_bytes = write_bytes = 0
+        for line in (self._read('io.stat') or '').splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition('=')
+                if key == 'rbytes':
+                    read_bytes += int(value)
+                elif key == 'wbytes':
+                    write_bytes += int(value)
+        return float(read_bytes), float(write_bytes)
+
+    def _net(self) -> Tuple[float, float]:
+        rx_bytes = tx_bytes = 0
+        for line in (self._read('net/dev') or '').splitlines()[2:]:
+            interface, _, counters = line.partition(':')
+            if interface.strip() == 'lo':
+                continue
+            columns = counters.split()
+            rx_bytes += int(columns[0])
+            tx_bytes += int(columns[8])
+        return float(rx_bytes), float(tx_bytes)
+
+    def read(self) -> Optional[Dict[str, float]]:
+        try:
+            now = time.monotonic()
+            cpu_seconds = self._flat(self._read('cpu.stat')).get('usage_usec', 0) / 1e6
+            memory_stat = self._flat(self._read('memory.stat'))
+            memory_max = (self._read('memory.max') or 'max').strip()
+            blk_read, blk_write = self._io()
+            net_rx, net_tx = self._net()
+            sample = {
+                'cpu_percent': 0.0,
+                'cpu_seconds': cpu_seconds,
+                'memory_usage_bytes': float((self._read('memory.current') or '0').strip()),
+                'memory_rss_bytes': float(memory_stat.get('anon', 0)),
+                'memory_limit_bytes': float(memory_max) if memory_max != 'max' else math.nan,
+                'net_rx_bytes': net_rx,
+                'net_tx_bytes': net_tx,
+                'blk_read_bytes': blk_read,
+                'blk_write_bytes': blk_write,
+                'cpu_pressure_us': self._pressure(self._read('cpu.pressure')),
+                'memory_pressure_us': self._pressure(self._read('memory.pressure')),
+                'io_pressure_us': self._pressure(self._read('io.pressure'))
+            }
+        except OSError:
+            # The cgroup is removed with its container
+            self.close()
+            return None
+        if self.previous is not None and now > self.previous[0]:
+            sample['cpu_percent'] = (cpu_seconds - self.previous[1]) / (now - self.previous[0]) * 100
+        self.previous = (now, cpu_seconds)
+        return sample
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def close(self):
+        self.alive = False
+        for fd in self.fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.fds = {}
+
+class ContainerSeries:
+    """Ring of samples of one container, turning cumulative counters into per-sample deltas"""
+
+    def __init__(self, name: str, capacity: int, node: str = ''):
+        self.name = name
+        self.node = node  # '<platform>/<role>' of the container, empty when it has no node label
+        self.ring = StatsRing(capacity)
+        self.counters: Optional[Dict[str, float]] = None
+        self.flushed = 0  # samples already handed to a stats writer
+        self.lock = threading.Lock()
+
+    def unflushed(self) -> List[Tuple[float, ...]]:
+        """Samples appended since the previous call"""
+        with self.lock:
+            appended = self.ring.appended
+            if appended - self.flushed > self.ring.size:
+                logger.warning(f"Stats of {self.name} overran the ring before being written, "
+                               f"{appended - self.flushed - self.ring.size} samples lost")
+            rows = list(self.ring.rows(self.flushed))
+            self.flushed = appended
+        return rows
+
+    def sample(self, timestamp: float, latest: Dict[str, float]) -> List[float]:
+        """Append a sample, returning its values in STAT_FIELDS order"""
+        previous = self.counters or latest
+        self.counters = {name: latest[name] for name in COUNTER_FIELDS}
+        deltas = {name: latest[name] - previous[name] for name in COUNTER_FIELDS}
+        deltas = {name: value if math.isnan(value) else max(0.0, value) for name, value in deltas.items()}
+        values = [timestamp] + [deltas[name] if name in deltas else latest[name] for name in STAT_FIELDS[1:]]
+        with self.lock:
+            self.ring.append(values)
+        return values
+
+class UsageTotals:
+    """Running CPU-seconds and peak summed memory of a group of containers.
+
+    Fed as samples arrive, so the totals stay exact once the sample rings wrap. Samples of one tick share
+    their timestamp and arrive together, their memory is summed before the peak is taken.
+    """
+
+    def __init__(self):
+        self.cpu_seconds = 0.0
+        self.peak_memory_bytes = 0.0
+        self._tick: Optional[float] = None
+        self._tick_memory = 0.0
+
+    def add(self, values: Sequence[float]):
+        timestamp, cpu_seconds, memory = values[0], values[CPU_SECONDS], values[MEMORY_USAGE]
+        if not math.isnan(cpu_seconds):
+            self.cpu_seconds += cpu_seconds
+        if timestamp != self._tick:
+            self._tick, self._tick_memory = timestamp, 0.0
+        if not math.isnan(memory):
+            self._tick_memory += memory
+        self.peak_memory_bytes = max(self.peak_memory_bytes, self._tick_memory)
+
+    def usage(self) -> Dict[str, float]:
+        return {'cpu_seconds': self.cpu_seconds, 'peak_memory_bytes': self.peak_memory_bytes}
+
+class IntervalTicker:
+    """Ticks on a fixed monotonic schedule, skipping missed ticks instead of drifting.
+
+    With align, ticks fall on wall-clock multiples of the interval, so samplers of the same or a multiple
+    interval sample together and their rows join on the timestamp.
+    """
+
+    def __init__(self, interval: float, align: bool = False):
+        self.interval = interval
+        self.next_tick = time.monotonic()
+        if align:
+            # The previous boundary; the first sample is taken right away, the following ones on boundaries
+            self.next_tick -= time.time() % interval
+
+    def wait(self, stop_event: threading.Event) -> bool:
+        """Wait for the next tick, returning False once stop_event is set"""
+        self.next_tick += self.interval
+        now = time.monotonic()
+        if self.next_tick < now:
+            missed = int((now - self.next_tick) / self.interval) + 1
+            logger.debug(f"Stats sampler missed {missed} ticks")
+            self.next_tick += missed * self.interval
+        return not stop_event.wait(self.next_tick - now)
+
+def node_platform(node: str) -> str:
+    return node.split('/', 1)[0]
+
+def row_dict(values: Sequence[float], case: str, container_name: str, node: str = '') -> Dict:
+    """One sample as a JSON-ready dict, with an ISO timestamp and None for missing metrics"""
+    row = {name: None if math.isnan(value) else value for name, value in zip(STAT_FIELDS, values)}
+    row['timestamp'] = datetime.fromtimestamp(row['timestamp']).isoformat()
+    row['case'] = case
+    row['container_name'] = container_name
+    row['node'] = node
+    return row
@@ -0,0 +1,443 @@
+import os
+import json
+import time
+import gzip
+import shutil
+import struct
+import hashlib
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Callable, List, Dict, Optional, Tuple
+import numpy as np
+import kafka.errors as Errors
+from kafka import KafkaClient, KafkaConsumer, TopicPartition
+from kafka.protocol.produce import ProduceRequest
+from kafka.record.default_records import DefaultRecordBase
+from kafka.record.util import encode_varint
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+
+# Segments hold uncompressed Kafka v2 record batches, produced as they are on a restore.
+# Entries of an older format are misses, and are regenerated.
+SEGMENT_FORMAT = 'record-batches-v2'
+BATCH_HEADER = DefaultRecordBase.HEADER_STRUCT
+# Batches stay well below the brokers' default 1 MiB batch limit
+BATCH_BYTES = 512 * 1024
+
+CRC32C_POLYNOMIAL = 0x82F63B78
+# Bytes per lane of the vectorized CRC
+CRC_LANE_BYTES = 64
+
+def _crc32c_table() -> np.ndarray:
+    table = np.arange(256, dtype=np.uint32)
+    for _ in range(8):
+        table = np.where(table & 1, (table >> 1) ^ np.uint32(CRC32C_POLYNOMIAL), table >> 1).astype(np.uint32)
+    return table
+
+CRC32C_TABLE = _crc32c_table()
+
+def _apply(tables: np.ndarray, registers: np.ndarray) -> np.ndarray:
+    """A linear map of CRC registers, looked up byte by byte"""
+    return (tables[0][registers & 0xff] ^ tables[1][(registers >> 8) & 0xff]
+            ^ tables[2][(registers >> 16) & 0xff] ^ tables[3][registers >> 24])
+
+@lru_cache(maxsize=None)
+def _zeros_tables(length: int) -> np.ndarray:
+    """Lookup tables advancing a CRC register over length zero bytes"""
+    bits = np.uint32(1) << np.arange(32, dtype=np.uint32)
+    if length == CRC_LANE_BYTES:
+        images = bits
+        for _ in range(length):
+            images = CRC32C_TABLE[images & 0xff] ^ (images >> 8)
+    else:
+        half = _zeros_tables(length // 2)
+        images = _apply(half, _apply(half, bits))
+    # The image of a byte value is the xor of the images of its bits
+    values = np.arange(256, dtype=np.uint32)
+    tables = np.zeros((4, 256), dtype=np.uint32)
+    for bit in range(32):
+        tables[bit // 8][(values >> (bit % 8)) & 1 == 1] ^= images[bit]
+    return tables
+
+def crc32c(data: bytes) -> int:
+    """CRC-32C of at least 4 bytes, the checksum of Kafka record batches, which kafka-python computes in Python.
+
+    The data is cut into lanes whose registers advance together, then combined pairwise: the CRC of two lanes
+    is the first's register advanced over the second's length, xor the second's CRC from a zero register.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    lanes = 1 << (max(1, -(-len(buffer) // CRC_LANE_BYTES)) - 1).bit_length()
+    # Leading zeros leave a zero register at zero, and the initial register is the first 4 bytes inverted
+    padded = np.zeros(lanes * CRC_LANE_BYTES, dtype=np.uint8)
+    padded[len(padded) - len(buffer):] = buffer
+    padded[len(padded) - len(buffer):len(padded) - len(buffer) + 4] ^= 0xff
+    registers = np.zeros(lanes, dtype=np.uint32)
+    for column in padded.reshape(lanes, CRC_LANE_BYTES).T.copy():
+        registers = CRC32C_TABLE[(registers ^ column) & 0xff] ^ (registers >> 8)
+    span = CRC_LANE_BYTES
+    while len(registers) > 1:
+        registers = _apply(_zeros_tables(span), registers[0::2]) ^ registers[1::2]
+        span *= 2
+    return int(registers[0]) ^ 0xFFFFFFFF
+
+def encode_batch(records: List[Tuple[int, Optional[bytes], Optional[bytes]]]) -> bytes:
+    """Uncompressed Kafka v2 record batch of (timestamp_ms, key, value) records"""
+    first_timestamp = records[0][0]
+    body = bytearray()
+    for delta, (timestamp, key, value) in enumerate(records):
+        record = bytearray(b'\x00')  # attributes
+        encode_varint(timestamp - first_timestamp, record.append)
+        encode_varint(delta, record.append)
+        for field in (key, value):
+            encode_varint(-1 if field is None else len(field), record.append)
+            if field:
+                record += field
+        record.append(0)  # headers
+        encode_varint(len(record), body.append)
+        body += record
+    batch = bytearray(BATCH_HEADER.size) + body
+    # Offsets and leader epoch are set by the broker, no producer id or sequence
+    BATCH_HEADER.pack_into(batch, 0, 0, len(batch) - DefaultRecordBase.AFTER_LEN_OFFSET, 0, 2, 0, 0,
+                           len(records) - 1, first_timestamp, max(timestamp for timestamp, _, _ in records),
+                           -1, -1, -1, len(records))
+    crc = crc32c(bytes(batch[DefaultRecordBase.ATTRIBUTES_OFFSET:]))
+    struct.pack_into('>I', batch, DefaultRecordBase.CRC_OFFSET, crc)
+    return bytes(batch)
+
+def split_batches(data: bytes) -> List[Tuple[int, int]]:
+    """(start, end) of each record batch in a segment"""
+    batches = []
+    position = 0
+    while position < len(data):
+        end = position + DefaultRecordBase.AFTER_LEN_OFFSET + struct.unpack_from('>i', data, position + 8)[0]
+        batches.append((position, end))
+        position = end
+    return batches
+
+@dataclass
+class SegmentInfo:
+    """One compressed segment file holding a contiguous offset range of a partition"""
+    file: str
+    topic: str
+    partition: int
+    start_offset: int
+    end_offset: int
+    records: int
+
+def _dump_partition(bootstrap_servers: str, topic: str, partition: int, start: int, end: int,
+                    directory: str, segment_records: int) -> List[Dict]:
+    """Write offsets [start, end) of one partition to compressed segment files"""
+    segments = []
+    if end <= start:
+        return segments
+
+    consumer = KafkaConsumer(
+        bootstrap_servers=bootstrap_servers,
+        enable_auto_commit=False,
+        fetch_max_bytes=64 * 1024 * 1024,
+        max_partition_fetch_bytes=16 * 1024 * 1024,
+        max_poll_records=100000,
+        receive_buffer_bytes=8 * 1024 * 1024
+    )
+    tp = TopicPartition(topic, partition)
+    consumer.assign([tp])
+    consumer.seek(tp, start)
+
+    writer = None
+    file_name = None
+    segment_start = start
+    count = 0
+    position = start
+    pending = []  # records of the batch being filled
+    pending_bytes = 0
+
+    def write_batch():
+        nonlocal pending_bytes
+        writer.write(encode_batch(pending))
+        pending.clear()
+        pending_bytes = 0
+
+    def close_segment():
+        if pending:
+            write_batch()
+        writer.close()
+        segments.append(asdict(SegmentInfo(
+            file=file_name, topic=topic, partition=partition,
+            start_offset=segment_start, end_offset=position, records=count
+        )))
+
+    try:
+        while position < end:
+            batch = consumer.poll(timeout_ms=5000)
+            if not batch:
+                # Offsets may have gaps (e.g. transaction markers) right before the end offset
+                if consumer.position(tp) >= end:
+                    break
+                raise RuntimeError(f"Timed out reading {topic}/{partition} at offset {position}")
+            for message in batch.get(tp, []):
+                if message.offset >= end:
+                    break
+                if writer is None:
+                    segment_start = message.offset
+                    file_name = f'{topic}-{partition}-{segment_start}.seg.gz'
+                    writer = gzip.open(os.path.join(directory, file_name), 'wb', compresslevel=1)
+                pending.append((message.timestamp, message.key, message.value))
+                pending_bytes += len(message.key or b'') + len(message.value or b'')
+                count += 1
+                position = message.offset + 1
+                if pending_bytes >= BATCH_BYTES:
+                    write_batch()
+                if count >= segment_records:
+                    close_segment()
+                    writer = None
+                    count = 0
+            position = max(position, consumer.position(tp))
+
+        if writer is not None:
+            close_segment()
+            writer = None
+        return segments
+    finally:
+        if writer is not None:
+            writer.close()
+        consumer.close()
+
+def _read_segment(path: str) -> bytes:
+    """Record batches of a segment file"""
+    with gzip.open(path, 'rb') as f:
+        return f.read()
+
+class BatchProducer:
+    """Produces prebuilt record batches with kafka-python's network client, one produce request per batch.
+
+    Requests are pipelined on each broker connection, which handles them in order, and a failed request is not
+    retried, so a partition receives its batches in the order they are sent.
+    """
+
+    def __init__(self, bootstrap_servers: str, topics: List[str], max_in_flight: int = 16, timeout: float = 60.0):
+        self.client = KafkaClient(bootstrap_servers=bootstrap_servers,
+                                  max_in_flight_requests_per_connection=max_in_flight)
+        self.timeout = timeout
+        self.in_flight = deque()  # (topic, partition, records, future) in send order
+        self.records = 0  # records of the acknowledged batches
+        self.client.set_topics(topics)
+        update = self.client.cluster.request_update()
+        self._poll_until(lambda: update.is_done, f"metadata of {topics}")
+        if update.failed():
+            raise RuntimeError(f"Failed to read metadata of {topics}: {update.exception}")
+
+    def _poll_until(self, done: Callable[[], bool], what: str):
+        deadline = time.monotonic() + self.timeout
+        while not done():
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Timed out waiting for {what}")
+            self.client.poll(timeout_ms=100)
+
+    def send(self, topic: str, partition: int, batch: bytes, records: int):
+        node = self.client.cluster.leader_for_partition(TopicPartition(topic, partition))
+        if node is None or node < 0:
+            raise RuntimeError(f"No leader for {topic}/{partition}")
+        self._poll_until(lambda: self.client.ready(node), f"broker {node}")
+        request = ProduceRequest[3](transactional_id=None, required_acks=1, timeout=int(self.timeout * 1000),
+                                    topics=[(topic, [(partition, batch)])])
+        self.in_flight.append((topic, partition, records, self.client.send(node, request)))
+        self._collect()
+
+    def _collect(self) -> bool:
+        """Account for the acknowledged requests at the head of the queue, returning whether none is left"""
+        while self.in_flight and self.in_flight[0][3].is_done:
+            topic, partition, records, future = self.in_flight.popleft()
+            if future.failed():
+                raise RuntimeError(f"Failed to produce to {topic}/{partition}: {future.exception}")
+            for _, partitions in future.value.topics:
+                for _, error_code, *_ in partitions:
+                    if error_code:
+                        raise RuntimeError(f"Failed to produce to {topic}/{partition}: "
+                                           f"{Errors.for_code(error_code).__name__}")
+            self.records += records
+        return not self.in_flight
+
+    def flush(self):
+        self._poll_until(self._collect, "produce acknowledgements")
+
+    def close(self):
+        self.client.close()
+
+class DatasetCache:
+    """Content-addressed on-disk cache of the Nexmark input topics with LRU eviction"""
+
+    def __init__(self, cache_dir: str, max_bytes: int, segment_records: int = 100000):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_bytes = max_bytes
+        self.segment_records = segment_records
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(**params) -> str:
+        """Derive the cache key from the generator image and generation parameters"""
+        canonical = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _read_manifest(self, key: str) -> Optional[Dict]:
+        path = os.path.join(self._entry_dir(key), MANIFEST_FILE)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _touch(self, key: str):
+        """Mark an entry as recently used"""
+        now = time.time()
+        os.utime(os.path.join(self._entry_dir(key), MANIFEST_FILE), (now, now))
+
+    def contains(self, key: str) -> bool:
+        return self._read_manifest(key) is not None
+
+    def entry_dir(self, key: str) -> Optional[str]:
+        """Directory of a complete cache entry, for storing artifacts derived from the dataset"""
+        return self._entry_dir(key) if self.contains(key) else None
+
+    def store(self, key: str, params: Dict, bootstrap_servers: str, topics: List[str]) -> Dict:
+        """Snapshot the given topics into a new cache entry"""
+        logger.info(f"Snapshotting input topics {topics} into dataset cache entry {key}")
+        start_time = time.time()
+
+        tmp_dir = self._entry_dir(key) + f'.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        try:
+            partitions = self._partition_offsets(bootstrap_servers, topics)
+            with ProcessPoolExecutor(max_workers=max(1, len(partitions))) as pool:
+                futures = [
+                    pool.submit(_dump_partition, bootstrap_servers, topic, partition,
+                                start, end, tmp_dir, self.segment_records)
+                    for (topic, partition), (start, end) in partitions.items()
+                ]
+                segments = [segment for future in futures for segment in future.result()]
+
+            manifest = {
+                'key': key,
+                'format': SEGMENT_FORMAT,
+                'params': params,
+                'created': time.time(),
+                'topics': {topic: {str(p): [s, e] for (t, p), (s, e) in partitions.items() if t == topic}
+                           for topic in topics},
+                'segments': segments,
+                'bytes': sum(os.path.getsize(os.path.join(tmp_dir, s['file'])) for s in segments)
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            os.rename(tmp_dir, self._entry_dir(key))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Dataset cache entry {key} stored: {sum(s['records'] for s in segments)} records, "
+                    f"{manifest['bytes']} bytes in {time.time() - start_time:.2f}s")
+        self.evict(keep=key)
+        return manifest
+
+    def restore(self, key: str, bootstrap_servers: str) -> bool:
+        """Replay a cached dataset into Kafka, returning False on a cache miss"""
+        manifest = self._read_manifest(key)
+        if manifest is None:
+            logger.info(f"Dataset cache miss for {key}")
+            return False
+
+        if manifest.get('format') != SEGMENT_FORMAT:
+            logger.info(f"Dataset cache entry {key} has an older segment format, regenerating")
+            return False
+
+        logger.info(f"Dataset cache hit for {key}, restoring into Kafka")
+        start_time = time.time()
+        self._touch(key)
+
+        # Segments are decompressed in parallel, a bounded window ahead, and their batches produced in offset order
+        segments = sorted(manifest['segments'], key=lambda s: s['start_offset'])
+        workers = max(1, min(len(segments), os.cpu_count() or 1))
+        producer = BatchProducer(bootstrap_servers, sorted({segment['topic'] for segment in segments}))
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                reads = deque()
+                for segment in segments:
+                    path = os.path.join(self._entry_dir(key), segment['file'])
+                    reads.append((segment, pool.submit(_read_segment, path)))
+                    if len(reads) > 2 * workers:
+                        self._produce_segment(producer, *reads.popleft())
+                while reads:
+                    self._produce_segment(producer, *reads.popleft())
+            producer.flush()
+            produced = producer.records
+        finally:
+            producer.close()
+
+        expected = sum(s['records'] for s in manifest['segments'])
+        if produced != expected:
+            raise RuntimeError(f"Restored {produced} records from cache entry {key}, expected {expected}")
+
+        logger.info(f"Restored {produced} records from dataset cache in {time.time() - start_time:.2f}s")
+        return True
+
+    @staticmethod
+    def _produce_segment(producer: BatchProducer, segment: Dict, read):
+        data = read.result()
+        for start, end in split_batches(data):
+            producer.send(segment['topic'], segment['partition'], data[start:end],
+                          BATCH_HEADER.unpack_from(data, start)[-1])
+
+    def _partition_offsets(self, bootstrap_servers: str, topics: List[str]) -> Dict[Tuple[str, int], Tuple[int, int]]:
+        consumer = KafkaConsumer(bootstrap_servers=bootstrap_servers, enable_auto_commit=False)
+        try:
+            offsets = {}
+            for topic in topics:
+                tps = [TopicPartition(topic, p) for p in sorted(consumer.partitions_for_topic(topic) or set())]
+                beginning = consumer.beginning_offsets(tps)
+                end = consumer.end_offsets(tps)
+                for tp in tps:
+                    offsets[(topic, tp.partition)] = (beginning[tp], end[tp])
+            return offsets
+        finally:
+            consumer.close()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """List (last_used, size_bytes, key) for every complete entry"""
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            manifest_path = os.path.join(self._entry_dir(key), MANIFEST_FILE)
+            if not os.path.isfile(manifest_path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(self._entry_dir(key)) for name in names
+            )
+            entries.append((os.path.getmtime(manifest_path), size, key))
+        return entries
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove least recently used entries until the cache fits its disk budget"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            logger.info(f"Evicting dataset cache entry {key} ({size} bytes)")
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+
+        if total > self.max_bytes:
+            logger.warning(f"Dataset cache uses {total} bytes, above its budget of {self.max_bytes}")
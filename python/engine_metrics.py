@@ -0,0 +1,136 @@
+import re
+import time
+import math
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from container_stats import IntervalTicker
+
+logger = logging.getLogger(__name__)
+
+# Wide rows like the container stats: timestamp, then metrics, NaN where an engine does not report one
+ENGINE_METRIC_FIELDS = [
+    'timestamp',
+    'records_in',  # records read by the scope since it started
+    'records_out',
+    'records_in_per_sec',
+    'records_out_per_sec',
+    'backpressured_ms_per_sec',  # Flink, the busiest subtask
+    'busy_ms_per_sec',
+    'checkpoint_duration_ms',  # Flink, of the latest completed checkpoint
+    'checkpoint_size_bytes',
+    'checkpoints_completed',
+    'checkpoints_failed',
+    'memory_bytes',  # Timeplus, of the query
+    'errors'  # ksqlDB, failed messages of a query or failed commands
+]
+# Label columns; scope is what a sample describes: a Flink vertex or job, a Timeplus or ksqlDB query
+ENGINE_LABEL_FIELDS = ['case', 'platform', 'node', 'scope']
+
+# Counters whose rate is derived from successive samples when the engine reports only the counter
+RATE_FIELDS = {'records_in': 'records_in_per_sec', 'records_out': 'records_out_per_sec'}
+
+KSQL_STATISTIC = re.compile(r'(?<![\w-])([a-z][\w-]*):\s*(-?[\d.]+(?:[eE]-?\d+)?)')
+KSQL_METRICS = {
+    'consumer-total-messages': 'records_in',
+    'consumer-messages-per-sec': 'records_in_per_sec',
+    'total-messages': 'records_out',
+    'messages-per-sec': 'records_out_per_sec'
+}
+KSQL_ERRORS = ('consumer-failed-messages', 'failed-messages')
+
+def ksql_query_metrics(statistics: str, error_stats: str) -> Dict[str, float]:
+    """Metrics of a ksqlDB query from the statistics and errorStats text of SHOW QUERIES EXTENDED"""
+    stats = {name: float(value) for name, value in KSQL_STATISTIC.findall(f'{statistics} {error_stats}')}
+    metrics = {field: stats[name] for name, field in KSQL_METRICS.items() if name in stats}
+    errors = [stats[name] for name in KSQL_ERRORS if name in stats]
+    if errors:
+        metrics['errors'] = sum(errors)
+    return metrics
+
+def metric_row(timestamp: float, values: Dict[str, float]) -> Tuple[float, ...]:
+    return (timestamp,) + tuple(float(values.get(name, math.nan)) for name in ENGINE_METRIC_FIELDS[1:])
+
+class EngineMetricsCollector:
+    """Samples an engine's own metrics in a separate thread, on the wall-clock ticks of the container stats.
+
+    scrape returns the metrics of every scope the engine reports, keyed by scope. A failed scrape skips the
+    tick, engines answer their metrics endpoints only once they run a query.
+    """
+
+    def __init__(self, scrape: Callable[[], Dict[str, Dict[str, float]]], case: str, platform: str, node: str,
+                 writer, interval: float, flush_interval: float):
+        self.scrape = scrape
+        self.case = case
+        self.platform = platform
+        self.node = node  # container serving the metrics
+        self.writer = writer
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.pending: Dict[str, List[Tuple[float, ...]]] = {}  # rows per scope since the last flush
+        self.previous: Dict[str, Tuple[float, Dict[str, float]]] = {}  # last counters per scope
+        self.samples = 0
+        self.failures = 0
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._collect, daemon=True)
+        self.thread.start()
+        logger.info(f"Started {self.platform} engine metrics collection")
+
+    def _collect(self):
+        ticker = IntervalTicker(self.interval, align=True)
+        last_flush = time.monotonic()
+        # Samples only on boundaries, a first sample off the grid would derive rates over a partial interval
+        while ticker.wait(self.stop_event):
+            timestamp = time.time()
+            try:
+                self._sample(timestamp, self.scrape())
+            except Exception as e:
+                self.failures += 1
+                logger.debug(f"Failed to scrape {self.platform} engine metrics: {e}")
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+
+    def _sample(self, timestamp: float, scopes: Dict[str, Dict[str, float]]):
+        for scope, values in scopes.items():
+            values = dict(values)
+            previous = self.previous.get(scope)
+            if previous is not None and timestamp > previous[0]:
+                elapsed = timestamp - previous[0]
+                for counter, rate in RATE_FIELDS.items():
+                    # A counter that went back belongs to a restarted query, it has no rate this tick
+                    if rate not in values and counter in values and values[counter] >= previous[1].get(counter, math.inf):
+                        values[rate] = (values[counter] - previous[1][counter]) / elapsed
+            self.previous[scope] = (timestamp, values)
+            self.pending.setdefault(scope, []).append(metric_row(timestamp, values))
+            self.samples += 1
+
+    def _flush(self):
+        """Hand samples taken since the previous flush to the writer"""
+        pending, self.pending = self.pending, {}
+        if self.writer is None:
+            return
+        for scope, rows in pending.items():
+            try:
+                self.writer.write(self.case, self.platform, scope, rows, self.node)
+            except Exception as e:
+                logger.error(f"Failed to write engine metrics of {scope}: {e}")
+
+    def stop(self) -> int:
+        """Stop collecting and flush, returning the number of samples taken"""
+        if self.thread is None:
+            return 0
+        self.stop_event.set()
+        self.thread.join(timeout=10)
+        if self.thread.is_alive():
+            logger.warning("Engine metrics collection thread did not stop gracefully")
+        else:
+            self._flush()
+        self.thread = None
+        logger.info(f"Stopped {self.platform} engine metrics collection: {self.samples} samples, "
+                    f"{self.failures} failed scrapes")
+        return self.samples
@@ -0,0 +1,71 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+import docker
+
+logger = logging.getLogger(__name__)
+
+def split_reference(reference: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """(repository, tag, digest) of an image reference; the tag defaults to latest unless a digest is given"""
+    repository, _, digest = reference.partition('@')
+    tag = None
+    # A colon after the last slash separates the tag, one before it belongs to a registry port
+    name_start = repository.rfind('/') + 1
+    if ':' in repository[name_start:]:
+        repository, tag = repository.rsplit(':', 1)
+    if not tag and not digest:
+        tag = 'latest'
+    return repository, tag, digest or None
+
+def pinned_reference(reference: str, image) -> str:
+    """Reference of the exact image pulled for reference: repository@digest, or the image id of a local-only image"""
+    repository, _, _ = split_reference(reference)
+    digests = image.attrs.get('RepoDigests') or []
+    for repo_digest in digests:
+        if repo_digest.split('@')[0] == repository or repo_digest.split('@')[0].endswith('/' + repository):
+            return f"{repository}@{repo_digest.split('@')[1]}"
+    if digests:
+        return f"{repository}@{digests[0].split('@')[1]}"
+    # Built or loaded locally, never pushed: only the id identifies it
+    return image.id
+
+def resolve_image(client: docker.DockerClient, reference: str, policy: str = 'missing') -> str:
+    """Make the image available locally and return its pinned reference.
+
+    With policy 'missing' a local image is used as is, with 'always' the tag is pulled again.
+    Digest references are only pulled when missing.
+    """
+    repository, tag, digest = split_reference(reference)
+    image = None
+    if digest or policy != 'always':
+        try:
+            image = client.images.get(reference)
+        except docker.errors.ImageNotFound:
+            pass
+    if image is None:
+        started = time.time()
+        image = client.images.pull(repository, tag=digest or tag)
+        logger.info(f"Pulled {reference} in {time.time() - started:.1f}s")
+    return reference if digest else pinned_reference(reference, image)
+
+def resolve_images(client: docker.DockerClient, images: Dict[str, str], policy: str = 'missing',
+                   concurrency: int = 4) -> Dict[str, str]:
+    """Resolve named image references concurrently, returning the pinned reference of each name.
+
+    Raises once every image was tried, naming all images that could not be pulled.
+    """
+    if not images:
+        return {}
+    references = sorted(set(images.values()))
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {reference: pool.submit(resolve_image, client, reference, policy) for reference in references}
+    pinned, errors = {}, []
+    for reference, future in futures.items():
+        try:
+            pinned[reference] = future.result()
+        except Exception as e:
+            errors.append(f"{reference}: {e}")
+    if errors:
+        raise RuntimeError("Failed to pull images: " + '; '.join(errors))
+    return {name: pinned[reference] for name, reference in images.items()}
@@ -0,0 +1,281 @@
+import time
+import logging
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+from kafka import KafkaConsumer, TopicPartition
+from kafka.client_async import KafkaClient
+from kafka.protocol.fetch import FetchRequest
+from kafka.record import MemoryRecords
+from metrics import OutputTimeline
+
+logger = logging.getLogger(__name__)
+
+MAX_EMPTY_POLLS = 3  # Allow a few empty polls before giving up
+
+def drain_consumer(bootstrap_servers: str, topic: str, poll_timeout: float, max_idle_polls: int,
+                   timeline: Optional[OutputTimeline] = None,
+                   end_offsets: Optional[Dict[int, int]] = None) -> int:
+    """Drain a topic with a single KafkaConsumer, one Python record object per message.
+
+    With end_offsets (from a completion detector) the drain stops there instead of after idle polls.
+    """
+    # Configure consumer to reduce connection issues
+    consumer = KafkaConsumer(
+        topic,
+        bootstrap_servers=bootstrap_servers,
+        auto_offset_reset='earliest',
+        enable_auto_commit=False,
+        consumer_timeout_ms=int(poll_timeout * 1000),
+        fetch_min_bytes=1,  # Don't wait for large batches
+        fetch_max_wait_ms=1000,  # Reduce wait time
+        max_poll_records=500,  # Reasonable batch size
+        session_timeout_ms=30000,  # Longer session timeout
+        heartbeat_interval_ms=10000,  # Regular heartbeats
+        request_timeout_ms=40000  # Longer request timeout
+    )
+
+    try:
+        size = 0
+        empty_polls = 0
+        remaining = {p: end for p, end in (end_offsets or {}).items() if end > 0}
+
+        while empty_polls < max_idle_polls:
+            if end_offsets is not None and not remaining:
+                break
+            message_batch = consumer.poll(timeout_ms=int(poll_timeout * 1000))
+            if message_batch:
+                for tp, messages in message_batch.items():
+                    size += len(messages)
+                    if timeline is not None:
+                        for message in messages:
+                            timeline.add(message.timestamp, message.value)
+                    if tp.partition in remaining and messages[-1].offset + 1 >= remaining[tp.partition]:
+                        del remaining[tp.partition]
+                empty_polls = 0  # Reset counter when we get messages
+            else:
+                empty_polls += 1
+                logger.debug(f"Empty poll {empty_polls}/{max_idle_polls}")
+        return size
+    finally:
+        try:
+            consumer.close()
+        except Exception as e:
+            logger.debug(f"Error closing consumer: {e}")
+
+def partition_offsets(bootstrap_servers: str, topic: str) -> Dict[int, Tuple[int, int]]:
+    """(beginning, end) offsets of every partition of a topic, from metadata only"""
+    consumer = KafkaConsumer(bootstrap_servers=bootstrap_servers, enable_auto_commit=False)
+    try:
+        tps = [TopicPartition(topic, p) for p in sorted(consumer.partitions_for_topic(topic) or set())]
+        if not tps:
+            return {}
+        beginning = consumer.beginning_offsets(tps)
+        end = consumer.end_offsets(tps)
+        return {tp.partition: (beginning[tp], end[tp]) for tp in tps}
+    finally:
+        consumer.close()
+
+def record_bounds(bootstrap_servers: str, topic: str,
+                  offsets: Dict[int, Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    """Timestamps of the first and last record of a topic, reading two records per partition"""
+    consumer = KafkaConsumer(bootstrap_servers=bootstrap_servers, enable_auto_commit=False,
+                             max_poll_records=1)
+    first, last = None, None
+    try:
+        for partition, (begin, end) in offsets.items():
+            if end <= begin:
+                continue
+            tp = TopicPartition(topic, partition)
+            consumer.assign([tp])
+            for offset in (begin, end - 1):
+                consumer.seek(tp, offset)
+                records = consumer.poll(timeout_ms=5000, max_records=1).get(tp, [])
+                if records:
+                    timestamp = records[0].timestamp
+                    first = timestamp if first is None else min(first, timestamp)
+                    last = timestamp if last is None else max(last, timestamp)
+        return (first, last) if first is not None else None
+    finally:
+        consumer.close()
+
+def read_records(bootstrap_servers: str, topic: str, poll_timeout: float = 5.0,
+                 max_idle_polls: int = MAX_EMPTY_POLLS) -> Iterator[Tuple[int, int, Optional[bytes], Optional[bytes]]]:
+    """(partition, offset, key, value) of every record of a topic up to its current end offsets, in partition order"""
+    offsets = partition_offsets(bootstrap_servers, topic)
+    consumer = KafkaConsumer(bootstrap_servers=bootstrap_servers, enable_auto_commit=False,
+                             max_poll_records=2000)
+    try:
+        for partition, (begin, end) in sorted(offsets.items()):
+            if end <= begin:
+                continue
+            tp = TopicPartition(topic, partition)
+            consumer.assign([tp])
+            consumer.seek(tp, begin)
+            position, idle_polls = begin, 0
+            while position < end and idle_polls < max_idle_polls:
+                records = consumer.poll(timeout_ms=int(poll_timeout * 1000)).get(tp, [])
+                idle_polls = 0 if records else idle_polls + 1
+                for record in records:
+                    if record.offset >= end:
+                        break
+                    yield partition, record.offset, record.key, record.value
+                # The consumer position also moves past transaction markers, which are not returned as records
+                position = consumer.position(tp)
+            if position < end:
+                raise RuntimeError(f"Read {topic}/{partition} up to offset {position} of {end}")
+    finally:
+        consumer.close()
+
+def drain_offsets(bootstrap_servers: str, topic: str, poll_timeout: float, max_idle_polls: int,
+                  timeline: Optional[OutputTimeline] = None,
+                  end_offsets: Optional[Dict[int, int]] = None) -> int:
+    """Wait until the topic's end offsets stop moving, then count records without transferring them"""
+    idle_polls = max_idle_polls if end_offsets is not None else 0
+    offsets = partition_offsets(bootstrap_servers, topic)
+    while idle_polls < max_idle_polls:
+        time.sleep(poll_timeout)
+        current = partition_offsets(bootstrap_servers, topic)
+        idle_polls = idle_polls + 1 if current == offsets else 0
+        offsets = current
+
+    size = sum(end - begin for begin, end in offsets.values())
+    if timeline is not None and size:
+        bounds = record_bounds(bootstrap_servers, topic, offsets)
+        if bounds:
+            timeline.add_range(size, *bounds)
+    return size
+
+class PartitionFetcher:
+    """Fetches one partition with raw Fetch requests, counting records from batch headers.
+
+    Records are not decoded, except for the first record of each batch when a lag sample is wanted.
+    """
+
+    def __init__(self, bootstrap_servers: str, topic: str, partition: int, offset: int,
+                 max_bytes: int = 64 * 1024 * 1024, max_wait_ms: int = 1000, sample_lag: bool = False):
+        self.topic = topic
+        self.partition = partition
+        self.offset = offset
+        self.max_bytes = max_bytes
+        self.max_wait_ms = max_wait_ms
+        self.sample_lag = sample_lag
+        self.timeline = OutputTimeline()
+        self.client = KafkaClient(bootstrap_servers=bootstrap_servers, client_id=f'nexmark-drain-{partition}',
+                                  receive_buffer_bytes=8 * 1024 * 1024)
+        self.error: Optional[Exception] = None
+        self.node_id = None
+
+    def _leader(self) -> int:
+        future = self.client.set_topics([self.topic])
+        self.client.poll(future=future)
+        node_id = self.client.cluster.leader_for_partition(TopicPartition(self.topic, self.partition))
+        if node_id is None or node_id < 0:
+            raise RuntimeError(f"No leader for {self.topic}/{self.partition}")
+        deadline = time.monotonic() + 10
+        while not self.client.ready(node_id):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Broker {node_id} not ready for {self.topic}/{self.partition}")
+            self.client.poll(timeout_ms=100)
+        return node_id
+
+    def fetch_once(self) -> int:
+        """Issue one fetch, returning the number of records received"""
+        if self.node_id is None:
+            self.node_id = self._leader()
+
+        request = FetchRequest[4](
+            replica_id=-1,
+            max_wait_time=self.max_wait_ms,
+            min_bytes=1,
+            max_bytes=self.max_bytes,
+            isolation_level=0,
+            topics=[(self.topic, [(self.partition, self.offset, self.max_bytes)])]
+        )
+        future = self.client.send(self.node_id, request)
+        self.client.poll(future=future)
+        if future.failed():
+            self.node_id = None
+            raise future.exception
+
+        received = 0
+        for _, partitions in future.value.topics:
+            for partition_data in partitions:
+                error_code = partition_data[1]
+                if error_code != 0:
+                    self.node_id = None
+                    raise RuntimeError(f"Fetch error {error_code} on {self.topic}/{self.partition}")
+                received += self._consume(MemoryRecords(partition_data[-1]))
+        return received
+
+    def _consume(self, records: MemoryRecords) -> int:
+        received = 0
+        while True:
+            batch = records.next_batch()
+            if batch is None:
+                return received
+            if hasattr(batch, 'last_offset_delta'):
+                next_offset = batch.base_offset + batch.last_offset_delta + 1
+                if next_offset <= self.offset or getattr(batch, 'is_control_batch', False):
+                    self.offset = max(self.offset, next_offset)
+                    continue
+                # A batch may start before the fetch offset
+                count = next_offset - max(batch.base_offset, self.offset)
+                self.timeline.add_batch(batch.max_timestamp, count)
+                if self.sample_lag:
+                    first = next(iter(batch), None)
+                    if first is not None:
+                        self.timeline.add_lag_sample(batch.max_timestamp, first.value)
+                self.offset = next_offset
+                received += count
+            else:
+                # Legacy message sets carry no batch header with counts
+                for record in batch:
+                    if record.offset < self.offset:
+                        continue
+                    self.timeline.add(record.timestamp, record.value if self.sample_lag else None)
+                    self.offset = record.offset + 1
+                    received += 1
+
+    def close(self):
+        self.client.close()
+
+def drain_fetch(bootstrap_servers: str, topic: str, poll_timeout: float, max_idle_polls: int,
+                timeline: Optional[OutputTimeline] = None, max_bytes: int = 64 * 1024 * 1024,
+                end_offsets: Optional[Dict[int, int]] = None) -> int:
+    """Drain a topic with one fetcher thread per partition until every partition is idle, or reaches end_offsets"""
+    offsets = partition_offsets(bootstrap_servers, topic)
+    fetchers = [
+        PartitionFetcher(bootstrap_servers, topic, partition, begin, max_bytes=max_bytes,
+                         max_wait_ms=int(poll_timeout * 1000), sample_lag=timeline is not None)
+        for partition, (begin, _) in offsets.items()
+    ]
+
+    def run(fetcher: PartitionFetcher):
+        idle_polls = 0
+        target = end_offsets.get(fetcher.partition, 0) if end_offsets is not None else None
+        try:
+            while idle_polls < max_idle_polls:
+                if target is not None and fetcher.offset >= target:
+                    break
+                received = fetcher.fetch_once()
+                idle_polls = 0 if received else idle_polls + 1
+        except Exception as e:
+            fetcher.error = e
+        finally:
+            fetcher.close()
+
+    threads = [threading.Thread(target=run, args=(fetcher,), daemon=True) for fetcher in fetchers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    errors = [fetcher.error for fetcher in fetchers if fetcher.error]
+    if errors:
+        raise RuntimeError(f"Failed to drain {topic}: {errors[0]}")
+
+    size = sum(fetcher.timeline.count for fetcher in fetchers)
+    if timeline is not None:
+        for fetcher in fetchers:
+            timeline.merge(fetcher.timeline)
+    return size
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence, Tuple
+from container_stats import STAT_FIELDS
+from report_upload import (RESULT_COLUMNS, STATS_COLUMNS, TimeplusHttp, coerce, init_streams, result_stream_name,
+                           stats_stream_name)
+
+logger = logging.getLogger(__name__)
+
+STREAM_COLUMNS = {stats_stream_name: STATS_COLUMNS, result_stream_name: RESULT_COLUMNS}
+ATTEMPT_SEQ_SPAN = 10 ** 12  # seq numbers of each attempt of a resumed run, so an attempt never overwrites another's rows
+
+class LiveSink:
+    """Streams stats samples and test results to Timeplus while the benchmark runs.
+
+    Producers never block: rows go into a bounded queue, and once the queue is full, or the
+    sink is unreachable, they are appended to a local spool file to be replayed later.
+    """
+
+    def __init__(self, client: TimeplusHttp, report_time: str, spool_path: str, queue_size: int = 10000,
+                 batch_rows: int = 1000, flush_interval: float = 1.0, retry_interval: float = 30.0, attempt: int = 0):
+        self.client = client
+        self.report_time = report_time
+        self.spool_path = spool_path
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        first_seq = attempt * ATTEMPT_SEQ_SPAN
+        self.seq = {stats_stream_name: first_seq, result_stream_name: first_seq}
+        self.seq_lock = threading.Lock()
+        self.spool_lock = threading.Lock()
+        self.spooled = 0
+        self.sent = 0
+        self.available = True
+        self.last_failure = 0.0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True, name='live-sink')
+
+    def start(self):
+        try:
+            init_streams(self.client)
+        except Exception as e:
+            self._mark_unavailable(e)
+        self.thread.start()
+        logger.info(f"Streaming results live to Timeplus, spooling to {self.spool_path} when unavailable")
+
+    def _next_seq(self, stream: str, count: int) -> int:
+        with self.seq_lock:
+            first = self.seq[stream]
+            self.seq[stream] += count
+            return first
+
+    def _enqueue(self, stream: str, rows: List[Dict]):
+        first = self._next_seq(stream, len(rows))
+        for offset, row in enumerate(rows):
+            row.update(report_time=self.report_time, seq=first + offset)
+        try:
+            self.queue.put_nowait((stream, rows))
+        except queue.Full:
+            # Backpressure lands on the spool file, never on the sampler or the measured query
+            self._spool(stream, rows)
+
+    def write(self, case: str, platform: str, container_name: str, rows: Sequence[Tuple[float, ...]], node: str = ''):
+        """Stats writer interface: samples of one container, each a tuple in STAT_FIELDS order"""
+        if not rows:
+            return
+        self._enqueue(stats_stream_name, [
+            dict(zip(STAT_FIELDS, values), case=case, platform=platform, node=node, container_name=container_name,
+                 timestamp=datetime.fromtimestamp(values[0], timezone.utc))
+            for values in rows
+        ])
+
+    def send_result(self, row: Dict):
+        self._enqueue(result_stream_name, [dict(row)])
+
+    def _spool(self, stream: str, rows: List[Dict]):
+        lines = [json.dumps({'stream': stream, 'row': row}, default=str) + '\n' for row in rows]
+        with self.spool_lock:
+            with open(self.spool_path, 'a') as f:
+                f.writelines(lines)
+            self.spooled += len(rows)
+
+    def _mark_unavailable(self, error: Exception):
+        if self.available:
+            logger.warning(f"Live sink unavailable, spooling to {self.spool_path}: {error}")
+        self.available = False
+        self.last_failure = time.monotonic()
+
+    def _send(self, stream: str, rows: List[Dict]):
+        if not self.available and time.monotonic() - self.last_failure < self.retry_interval:
+            self._spool(stream, rows)
+            return
+        columns = STREAM_COLUMNS[stream]
+        body = ''.join(json.dumps({name: coerce(row.get(name), column_type) for name, column_type in columns}) + '\n'
+                       for row in rows).encode('utf-8')
+        try:
+            self.client.insert(stream, [name for name, _ in columns], body)
+            self.sent += len(rows)
+            if not self.available:
+                logger.info("Live sink available again")
+                self.available = True
+                self.replay()
+        except Exception as e:
+            self._mark_unavailable(e)
+            self._spool(stream, rows)
+
+    def _run(self):
+        pending: Dict[str, List[Dict]] = {stats_stream_name: [], result_stream_name: []}
+        last_flush = time.monotonic()
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            try:
+                stream, rows = self.queue.get(timeout=self.flush_interval)
+                pending[stream].extend(rows)
+            except queue.Empty:
+                pass
+            due = time.monotonic() - last_flush >= self.flush_interval
+            for stream, rows in pending.items():
+                if rows and (due or len(rows) >= self.batch_rows or self.stop_event.is_set()):
+                    self._send(stream, rows)
+                    pending[stream] = []
+            if due:
+                last_flush = time.monotonic()
+        for stream, rows in pending.items():
+            if rows:
+                self._send(stream, rows)
+
+    def replay(self) -> int:
+        """Send spooled rows; rows are keyed by (report_time, seq), so replaying twice does not duplicate them"""
+        with self.spool_lock:
+            if not os.path.exists(self.spool_path):
+                return 0
+            replay_path = f'{self.spool_path}.replay'
+            os.replace(self.spool_path, replay_path)
+            self.spooled = 0
+        try:
+            replayed = replay_spool(self.client, replay_path, self.batch_rows)
+        except Exception as e:
+            # Keep the rows for a later replay
+            with self.spool_lock, open(replay_path) as src, open(self.spool_path, 'a') as dst:
+                for line in src:
+                    dst.write(line)
+                    self.spooled += 1
+            self._mark_unavailable(e)
+            replayed = 0
+        os.remove(replay_path)
+        return replayed
+
+    def close(self):
+        """Drain the queue, replay the spool if Timeplus is reachable, and report what is left"""
+        self.stop_event.set()
+        self.thread.join()
+        if self.spooled and self.available:
+            self.replay()
+        logger.info(f"Live sink sent {self.sent} rows")
+        if self.spooled:
+            logger.warning(f"{self.spooled} rows left in {self.spool_path}; "
+                           f"replay them with: python report_upload.py --replay-spool {self.spool_path}")
+
+def replay_spool(client: TimeplusHttp, path: str, batch_rows: int = 1000) -> int:
+    """Insert the rows of a spool file, in batches per stream"""
+    pending: Dict[str, List[str]] = {}
+    replayed = 0
+
+    def send(stream: str):
+        nonlocal replayed
+        lines = pending.pop(stream, [])
+        if lines:
+            client.insert(stream, [name for name, _ in STREAM_COLUMNS[stream]], ''.join(lines).encode('utf-8'))
+            replayed += len(lines)
+
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            stream = entry['stream']
+            columns = STREAM_COLUMNS[stream]
+            row = {name: coerce(entry['row'].get(name), column_type) for name, column_type in columns}
+            pending.setdefault(stream, []).append(json.dumps(row) + '\n')
+            if len(pending[stream]) >= batch_rows:
+                send(stream)
+    for stream in list(pending):
+        send(stream)
+    logger.info(f"Replayed {replayed} rows from {path}")
+    return replayed
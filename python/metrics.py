@@ -0,0 +1,179 @@
+import json
+import random
+from datetime import datetime, timezone
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional, Tuple
+
+# Output fields carrying the event time of a result, in order of preference
+EVENT_TIME_FIELDS = ('date_time', 'dateTime', 'DATETIME', 'DATE_TIME', 'window_end', 'endtime', 'WINDOW_END')
+
+def parse_event_time(value) -> Optional[float]:
+    """Convert a JSON event time (epoch millis or an ISO/SQL timestamp string) to epoch millis, naive as UTC"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace(' ', 'T', 1))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp() * 1000
+
+def extract_event_time(value: Optional[bytes]) -> Optional[float]:
+    """Event time of a JSON output record, or None if it carries none"""
+    if not value:
+        return None
+    try:
+        record = json.loads(value)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    for name in EVENT_TIME_FIELDS:
+        if name in record:
+            return parse_event_time(record[name])
+    return None
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Linear interpolation percentile of an unsorted list, q in [0, 100]"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+class OutputTimeline:
+    """Accumulates output record timestamps into per-second buckets, with a bounded sample of processing lag"""
+
+    def __init__(self, track_lag: bool = True, lag_sample_size: int = 10000, seed: int = 0):
+        self.track_lag = track_lag
+        self.lag_sample_size = lag_sample_size
+        self.count = 0
+        self.first_timestamp: Optional[int] = None
+        self.last_timestamp: Optional[int] = None
+        self.buckets: Dict[int, int] = {}
+        self.lag_samples: List[float] = []
+        self.lag_count = 0
+        self.lag_max: Optional[float] = None
+        self._random = random.Random(seed)
+
+    def add(self, timestamp: int, value: Optional[bytes] = None):
+        """Record one output record by its Kafka timestamp (epoch millis)"""
+        self.add_timestamps([timestamp], 1)
+        if self.track_lag and value is not None:
+            self.add_lag_sample(timestamp, value)
+
+    def add_timestamps(self, timestamps: List[int], count: int):
+        """Record count output records given their timestamps"""
+        if not timestamps:
+            return
+        self.count += count
+        low = min(timestamps)
+        high = max(timestamps)
+        self.first_timestamp = low if self.first_timestamp is None else min(self.first_timestamp, low)
+        self.last_timestamp = high if self.last_timestamp is None else max(self.last_timestamp, high)
+        for timestamp in timestamps:
+            second = timestamp // 1000
+            self.buckets[second] = self.buckets.get(second, 0) + 1
+
+    def add_batch(self, timestamp: int, count: int):
+        """Record count output records sharing one timestamp, e.g. a log-append-time record batch"""
+        self.count += count
+        self.first_timestamp = timestamp if self.first_timestamp is None else min(self.first_timestamp, timestamp)
+        self.last_timestamp = timestamp if self.last_timestamp is None else max(self.last_timestamp, timestamp)
+        second = timestamp // 1000
+        self.buckets[second] = self.buckets.get(second, 0) + count
+
+    def add_range(self, count: int, first_timestamp: int, last_timestamp: int):
+        """Record count output records known only by their first and last timestamps"""
+        self.count += count
+        self.first_timestamp = first_timestamp if self.first_timestamp is None else min(self.first_timestamp, first_timestamp)
+        self.last_timestamp = last_timestamp if self.last_timestamp is None else max(self.last_timestamp, last_timestamp)
+
+    def add_lag_sample(self, timestamp: int, value: Optional[bytes]):
+        """Add the processing lag of one output record without counting it"""
+        event_time = extract_event_time(value)
+        if event_time is not None:
+            self._add_lag(timestamp - event_time)
+
+    def merge(self, other: 'OutputTimeline'):
+        """Fold another timeline, e.g. of a different partition, into this one"""
+        self.count += other.count
+        for timestamp in (other.first_timestamp, other.last_timestamp):
+            if timestamp is not None:
+                self.first_timestamp = timestamp if self.first_timestamp is None else min(self.first_timestamp, timestamp)
+                self.last_timestamp = timestamp if self.last_timestamp is None else max(self.last_timestamp, timestamp)
+        for second, records in other.buckets.items():
+            self.buckets[second] = self.buckets.get(second, 0) + records
+        for lag in other.lag_samples:
+            self._add_lag(lag)
+        self.lag_count += max(0, other.lag_count - len(other.lag_samples))
+        if other.lag_max is not None:
+            self.lag_max = other.lag_max if self.lag_max is None else max(self.lag_max, other.lag_max)
+
+    def _add_lag(self, lag: float):
+        # Reservoir sampling keeps an unbiased, fixed-size sample for the percentiles
+        self.lag_count += 1
+        self.lag_max = lag if self.lag_max is None else max(self.lag_max, lag)
+        if len(self.lag_samples) < self.lag_sample_size:
+            self.lag_samples.append(lag)
+        else:
+            slot = self._random.randrange(self.lag_count)
+            if slot < self.lag_sample_size:
+                self.lag_samples[slot] = lag
+
+    def rate_series(self) -> List[Tuple[int, int]]:
+        """(epoch second, records) for every second between the first and last output"""
+        if not self.buckets:
+            return []
+        first, last = min(self.buckets), max(self.buckets)
+        return [(second, self.buckets.get(second, 0)) for second in range(first, last + 1)]
+
+@dataclass
+class ThroughputMetrics:
+    """End-to-end metrics derived from Kafka record timestamps"""
+    first_output_time: Optional[float] = None  # seconds from query submission to the first output record
+    last_output_time: Optional[float] = None  # seconds from query submission to the last output record
+    input_events: int = 0
+    input_events_per_sec: Optional[float] = None  # input events over submission-to-last-output
+    output_records_per_sec: Optional[float] = None  # output records over first-to-last output
+    peak_output_records_per_sec: Optional[int] = None
+    median_output_records_per_sec: Optional[float] = None  # over full seconds of the output series
+    lag_p50_ms: Optional[float] = None  # output append time minus the record's event time
+    lag_p99_ms: Optional[float] = None
+    lag_max_ms: Optional[float] = None
+
+METRIC_FIELDS = [f.name for f in fields(ThroughputMetrics)]
+
+def compute_metrics(timeline: OutputTimeline, query_start_ms: float, input_events: int) -> ThroughputMetrics:
+    """Derive throughput and latency metrics from an output timeline"""
+    metrics = ThroughputMetrics(input_events=input_events)
+    if timeline.count == 0:
+        return metrics
+
+    metrics.first_output_time = (timeline.first_timestamp - query_start_ms) / 1000
+    metrics.last_output_time = (timeline.last_timestamp - query_start_ms) / 1000
+    if metrics.last_output_time > 0:
+        metrics.input_events_per_sec = input_events / metrics.last_output_time
+
+    output_span = (timeline.last_timestamp - timeline.first_timestamp) / 1000
+    if output_span > 0:
+        metrics.output_records_per_sec = timeline.count / output_span
+
+    # Without per-second buckets (count-only drains) only the bounds are known
+    series = [records for _, records in timeline.rate_series()]
+    if series:
+        metrics.peak_output_records_per_sec = max(series)
+        # The first and last seconds are partial
+        full_seconds = series[1:-1] or series
+        metrics.median_output_records_per_sec = percentile(full_seconds, 50)
+
+    if timeline.lag_samples:
+        metrics.lag_p50_ms = percentile(timeline.lag_samples, 50)
+        metrics.lag_p99_ms = percentile(timeline.lag_samples, 99)
+        metrics.lag_max_ms = timeline.lag_max
+    return metrics
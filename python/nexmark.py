@@ -1,18 +1,46 @@
 import os
 import time
+import math
 import csv
 import threading
 import json
 import docker
-import requests
 import click
 import logging
 import signal
 import sys
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Tuple, Optional
+import re
+import shutil
+from dataclasses import dataclass, asdict, field
+from typing import Callable, List, Dict, Tuple, Optional
 from datetime import datetime
-from kafka import KafkaConsumer
+from kafka import KafkaConsumer, TopicPartition
+from kafka.admin import KafkaAdminClient
+from dataset_cache import DatasetCache
+from images import resolve_images
+from readiness import Readiness
+from metrics import METRIC_FIELDS, OutputTimeline, ThroughputMetrics, compute_metrics
+from kafka_drain import MAX_EMPTY_POLLS, drain_consumer, drain_fetch, drain_offsets, read_records
+from container_stats import (CgroupReader, ContainerSeries, ContainerStream, IntervalTicker, UsageTotals,
+                             node_platform)
+from stats_store import STATS_EXTENSIONS, CheckpointStatsWriter, TeeStatsWriter, merge_stats
+from engine_metrics import ENGINE_LABEL_FIELDS, ENGINE_METRIC_FIELDS, EngineMetricsCollector
+from run_journal import RunJournal, replacing
+from trials import TrialPolicy, summary_rows
+from throughput_search import SEARCH_FIELDS, RateProbe, RateSearch
+from scaling import SCALING_FIELDS, ScalingPoint, add_speedup, point_rows, scaling_grid
+from nexmark_generator import GeneratorSpec, generate_to_kafka, start_generator
+from live_sink import LiveSink
+from verification import APPEND, VERIFICATION_FIELDS, capture_output, compare_golden, compare_outputs
+from reference import golden_path, load_golden, store_golden
+from sql_session import split_script
+from platforms import NODE_LABEL, PLATFORMS, JobContext
+from cases import get_case
+from report_upload import TimeplusHttp, timeplus_host, timeplus_password, timeplus_port, timeplus_user
+from completion import (Completion, CompletionDetector, CompletionWatcher, EngineProgressDetector,
+                        ExpectedCountDetector, StableWatermarkDetector)
+from scheduler import (AdmissionController, Allocation, Job, ParallelScheduler, cores_for_quota,
+                       format_cpuset, host_cpus, host_memory_bytes, parse_cpuset, parse_memory)
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +53,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+INPUT_TOPICS = ['nexmark-auction', 'nexmark-person', 'nexmark-bid']
+OUTPUT_TOPIC_CONFIGS = {'message.timestamp.type': 'LogAppendTime'}
+
 @dataclass
 class PerformanceConfig:
     """Configuration for performance-related settings"""
@@ -43,35 +74,155 @@ class PerformanceConfig:
     
     # Kafka settings
     kafka_image: str = "docker.redpanda.com/redpandadata/redpanda:v23.1.3"
+    kafka_admin_image: str = "docker.redpanda.com/redpandadata/redpanda:v23.3.14"  # rpk for topic administration
     kafka_timeout: int = 5  # timeout in seconds
     kafka_bootstrap_servers: str = "localhost:19092"
-    kafka_partitions: int = 1
+    kafka_partitions: int = 1  # partitions of the input and output topics
+    kafka_smp: int = 0  # Redpanda cores (--smp), 0 to match kafka_partitions
+    output_drain: str = "consumer"  # 'consumer', 'fetch' (raw per-partition fetchers) or 'offsets' (count only)
+    output_fetch_max_bytes: int = 64 * 1024 * 1024
+    
+    # Completion detection settings
+    completion_detector: str = "idle"  # 'idle' (empty polls), 'watermark', 'engine' or 'expected'
+    completion_stable_ms: int = 2000  # output high watermark unchanged this long means the query is done
+    completion_settle_ms: int = 200  # with 'engine', output must also be unchanged this long
+    completion_poll_interval: float = 0.1
+    completion_empty_timeout: float = 60.0  # a query with no output at all is done after this long
+    completion_deadline: float = 3600.0
+    expected_output_counts: Dict[str, int] = field(default_factory=dict)  # case -> output records, for 'expected'
+    timeplus_progress_query: str = ""  # SQL returning the unconsumed input records, for 'engine' on Timeplus
     
     # Flink settings
     flink_image: str = "flink:1.18.1-scala_2.12-java8"
     flink_cli_image: str = "timeplus/flinksql:9c341db_1.18"
     flink_taskmanager_slots: int = 1
+    flink_sql_gateway_port: int = 8083  # SQL Gateway REST port, with query_submission 'session'
+    flink_taskmanagers: int = 1  # each with flink_taskmanager_memory, cpu_quota_cores and its own cores when pinned
     flink_port: int = 8081
     flink_health_check_interval: int = 5
-    flink_max_health_checks: int = 20
+    flink_max_health_checks: int = 20  # with the interval, bounds the Flink readiness deadline
     
     # Timeplus settings
     timeplusd_image: str = "timeplus/timeplusd:latest"
+    timeplusd_user: str = "proton"  # HTTP user of the engine, with query_submission 'session'
+    timeplusd_password: str = "timeplus@t+"
+    
+    # ksqlDB settings
+    ksqldb_image: str = "confluentinc/ksqldb-server:0.29.0"
+    ksqldb_nodes: int = 1  # servers sharing one service id, each with ksqldb_memory and cpu_quota_cores
     
     # Data generation settings
+    generator_image: str = "ghcr.io/risingwavelabs/nexmark-bench:test-7"
     default_data_size: int = 10000000
     default_event_rate: int = 300000
     default_num_generators: int = 3
+    generator: str = "container"  # 'container' (generator_image) or 'native' (in-process, nexmark_generator.py)
+    generator_seed: int = 0  # native generator seed, the same seed and parameters give the same events
+    generator_base_time_ms: int = 0  # event time of the first native event, 0 for the current time
+    generator_out_of_order_group: int = 1  # native events are emitted shuffled within groups of this many
+    generator_processes: int = 0  # native generator worker processes, 0 for one per CPU
+    generator_options: Dict[str, int] = field(default_factory=dict)  # other GeneratorSpec fields, e.g. hot_auction_ratio
+    shared_input: bool = False  # generate input once per run and reuse it across cases
+    warm_engines: bool = False  # keep engine servers up across cases, resetting them in between
+    
+    # Dataset cache settings
+    dataset_cache_enabled: bool = False
+    dataset_cache_dir: str = "~/.cache/nexmark/datasets"
+    dataset_cache_max_bytes: int = 20 * 1024 ** 3  # disk budget before LRU eviction
+    
+    # Parallel scheduling settings
+    parallel_jobs: int = 1  # (case, platform) jobs run at once, 1 keeps the serial path
+    parallel_reserved_cpus: str = "0-1"  # host CPUs kept for Kafka and the orchestrator
+    parallel_memory_reserve: str = "2g"  # host memory kept outside of job admission
+    parallel_port_stride: int = 100  # host port offset between concurrent job slots
+    
+    # Query submission settings
+    query_submission: str = "session"  # 'session' (one SQL session per engine) or 'cli' (a SQL client per query)
+    
+    # Output verification settings
+    verify_output: bool = False  # decode, normalize and compare the output of every platform of a case
+    verify_float_digits: int = 3  # decimals floats are rounded to before comparing
+    verify_sort_buffer: int = 100000  # rows sorted in memory before a sorted run is spilled to disk
+    verify_diff_samples: int = 5  # differing rows sampled per platform on a mismatch
+    verify_golden: bool = True  # also compare with the reference evaluator's golden result, kept in the dataset cache
+    verify_processes: int = 0  # processes of the reference evaluator, 0 for one per CPU
+    
+    # Image settings
+    image_pull_policy: str = "missing"  # 'missing' (pull images not present locally) or 'always' (re-pull tags)
+    image_pull_concurrency: int = 4
     
     # Container settings
+    stats_backend: str = "docker"  # 'docker' (stats API streams) or 'cgroup' (cgroup v2 files, for 10-100 Hz)
     stats_collection_interval: float = 1.0
+    stats_ring_capacity: int = 0  # samples kept per container until flushed, 0 for four flush intervals of samples
+    stats_format: str = "parquet"  # 'parquet' (columnar, written during collection) or 'json' (legacy)
+    stats_flush_interval: float = 10.0  # seconds between writes of collected samples to the stats file
     health_check_timeout: int = 3
     health_check_retries: int = 5
     
+    # Engine metrics settings
+    engine_metrics_enabled: bool = False  # scrape the engines' own metrics next to the container stats
+    engine_metrics_interval: float = 1.0  # a multiple of stats_collection_interval samples on container stats ticks
+    timeplus_metrics_query: str = ("SELECT query_id, read_rows, written_rows, memory_usage FROM system.processes "
+                                   "WHERE query NOT LIKE '%system.processes%' FORMAT TSV")  # scope, records in and out, memory bytes per row
+    
+    # Trial settings
+    trials: int = 1  # measured trials per (case, platform), the minimum with adaptive repetition
+    warmup_trials: int = 0  # trials run first, recorded but left out of the summaries
+    trial_ci_target: float = 0.0  # repeat until the median CI half-width of trial_metric is within this fraction of the median, 0 to run exactly `trials`
+    trial_max: int = 20  # measured trials at most with adaptive repetition
+    trial_time_budget: float = 0.0  # seconds of trials per (case, platform) with adaptive repetition, 0 for no limit
+    trial_metric: str = "input_events_per_sec"
+    trial_confidence: float = 0.95
+    trial_bootstrap_resamples: int = 2000
+    
+    # Throughput search settings
+    search_min_rate: int = 10000  # input events/s the search starts above
+    search_max_rate: int = 2000000
+    search_precision: float = 0.1  # stop once the sustained and unsustained rates are this fraction apart
+    search_max_steps: int = 10
+    search_step_seconds: float = 60.0  # measured window of one probe
+    search_warmup_seconds: float = 15.0  # ramp-up before each probe's measured window
+    search_sample_interval: float = 1.0
+    search_lag_growth_tolerance: float = 0.01  # lag may grow by this fraction of the input rate
+    search_max_lag_seconds: float = 10.0  # lag may not exceed this many seconds of input
+    search_drain_timeout: float = 120.0
+    
+    # Scaling settings
+    engine_parallelism: int = 0  # Flink parallelism and slots, Timeplus max_threads, ksqlDB stream threads; 0 to match kafka_partitions
+    scaling_partitions: List[int] = field(default_factory=lambda: [1, 2, 4])  # partition counts of a scaling sweep
+    scaling_cores: List[float] = field(default_factory=lambda: [1.0, 2.0, 4.0])  # CPU cores of a scaling sweep
+    
+    # Live sink settings, Timeplus connection from TIMEPLUS_HOST/PORT/USER/PASSWORD as for report_upload.py
+    live_sink_enabled: bool = False  # stream stats and results to Timeplus during the run
+    live_sink_queue_size: int = 10000  # batches buffered before overflowing to the spool file
+    live_sink_batch_rows: int = 1000
+    live_sink_flush_interval: float = 1.0
+    
+    # Readiness settings
+    readiness_deadline: float = 120.0  # overall deadline of one readiness wait, in seconds
+    readiness_initial_backoff: float = 0.05
+    readiness_max_backoff: float = 2.0
+    
     @property
     def cpu_quota(self) -> int:
         """Calculate CPU quota from cores"""
         return int(self.cpu_quota_cores * self.cpu_period)
+    
+    @property
+    def redpanda_smp(self) -> int:
+        """Redpanda cores, one per partition unless set, at most the host's CPUs"""
+        return max(1, min(self.kafka_smp or self.kafka_partitions, len(host_cpus())))
+    
+    @property
+    def stats_ring_size(self) -> int:
+        """Samples kept per container, enough to hold the samples between two flushes"""
+        return self.stats_ring_capacity or max(16, math.ceil(4 * self.stats_flush_interval / self.stats_collection_interval))
+    
+    @property
+    def parallelism(self) -> int:
+        """Engine parallelism, one task per partition unless set"""
+        return max(1, self.engine_parallelism or self.kafka_partitions)
 
 @dataclass
 class TestResult:
@@ -81,7 +232,33 @@ class TestResult:
     execution_time: float
     output_size: int
     error: Optional[str] = None
-    stats: Optional[List[Dict]] = None
+    readiness_time: float = 0  # time spent waiting for containers, endpoints and topics to be ready
+    metrics: Optional[ThroughputMetrics] = None  # derived from input and output record timestamps
+    engine_mode: str = 'cold'  # 'cold' for a freshly started engine, 'warm' for a reused one
+    startup_time: float = 0  # time to start (cold) or reset (warm) the engine before the query
+    completion_detector: str = 'idle'
+    cpu_seconds: float = 0  # CPU time of the engine containers while collecting stats
+    peak_memory_bytes: float = 0  # peak of the engine containers' summed memory usage
+    completion_time: Optional[float] = None  # seconds from query submission to the detected completion
+    detection_delay: Optional[float] = None  # seconds between the completion and its detection
+    trial: int = 0  # index of the trial of the (case, platform) pair, counting warm-up trials
+    warmup: bool = False  # warm-up trials are reported but left out of the summaries
+    nodes: int = 0  # engine containers of the test
+    node_usage: Optional[Dict[str, Dict[str, float]]] = None  # resource usage of each labelled node
+
+@dataclass(frozen=True)
+class InputDatasetKey:
+    """Parameters that identify a generated input dataset"""
+    data_size: int
+    event_rate: int
+    partitions: int
+    generators: int
+
+@dataclass
+class InputDataset:
+    """Input dataset loaded into Kafka, with the offsets recorded after generation"""
+    key: InputDatasetKey
+    offsets: Dict[str, Dict[int, Tuple[int, int]]]
 
 class NexmarkTestError(Exception):
     """Custom exception for Nexmark test errors"""
@@ -93,9 +270,10 @@ class ContainerManager:
     def __init__(self, docker_client: docker.DockerClient):
         self.client = docker_client
         self.containers = []
+        self.infrastructure = []  # containers kept across cases (e.g. Kafka in shared input mode)
         self.networks = []
         
-    def create_container(self, **kwargs) -> docker.models.containers.Container:
+    def create_container(self, infrastructure: bool = False, **kwargs) -> docker.models.containers.Container:
         """Create and track a container"""
         try:
             # For non-detached containers, don't track them as they auto-remove
@@ -106,6 +284,8 @@ class ContainerManager:
             else:
                 container = self.client.containers.run(**kwargs)
                 self.containers.append(container)
+                if infrastructure:
+                    self.infrastructure.append(container)
                 logger.info(f"Created container: {container.name} ({container.id[:12]})")
                 return container
         except docker.errors.ContainerError as e:
@@ -129,15 +309,36 @@ class ContainerManager:
             logger.error(f"Failed to create network {name}: {e}")
             raise NexmarkTestError(f"Network creation failed: {e}")
     
-    def cleanup(self):
-        """Clean up all tracked containers and networks"""
-        logger.info("Starting cleanup...")
-        
-        # Stop and remove containers
-        containers_to_remove = self.containers.copy()
-        self.containers.clear()  # Clear the list to avoid double cleanup
-        
-        for container in containers_to_remove:
+    def remove_network(self, network: docker.models.networks.Network):
+        """Disconnect all containers from a tracked network and remove it"""
+        try:
+            network.reload()
+            for container in network.containers:
+                try:
+                    network.disconnect(container, force=True)
+                except docker.errors.DockerException as e:
+                    logger.debug(f"Failed to disconnect {container.name} from {network.name}: {e}")
+            network.remove()
+            logger.info(f"Removed network: {network.name}")
+        except docker.errors.NotFound:
+            logger.debug(f"Network {network.name} already removed")
+        except Exception as e:
+            logger.warning(f"Failed to remove network {network.name}: {e}")
+        finally:
+            if network in self.networks:
+                self.networks.remove(network)
+
+    def stop(self, container: docker.models.containers.Container):
+        """Stop a tracked container and stop tracking it"""
+        self._stop_containers([container])
+        if container in self.containers:
+            self.containers.remove(container)
+        if container in self.infrastructure:
+            self.infrastructure.remove(container)
+
+    def _stop_containers(self, containers: List[docker.models.containers.Container]):
+        """Stop the given containers, ignoring ones that are already gone"""
+        for container in containers:
             try:
                 container.reload()  # Refresh container state
                 if container.status in ['running', 'paused']:
@@ -149,6 +350,32 @@ class ContainerManager:
                 logger.debug(f"Container {container.name} already removed")
             except Exception as e:
                 logger.warning(f"Failed to stop container {container.name}: {e}")
+
+    def keep(self, container: docker.models.containers.Container):
+        """Keep a container running across cases"""
+        if container not in self.infrastructure:
+            self.infrastructure.append(container)
+
+    def release(self, container: docker.models.containers.Container):
+        """Stop keeping a container across cases, so the next engine cleanup stops it"""
+        if container in self.infrastructure:
+            self.infrastructure.remove(container)
+
+    def cleanup_engines(self):
+        """Stop tracked engine containers, keeping infrastructure containers and networks"""
+        engines = [c for c in self.containers if c not in self.infrastructure]
+        self.containers = [c for c in self.containers if c in self.infrastructure]
+        self._stop_containers(engines)
+
+    def cleanup(self):
+        """Clean up all tracked containers and networks"""
+        logger.info("Starting cleanup...")
+        
+        # Stop and remove containers
+        containers_to_remove = self.containers.copy()
+        self.containers.clear()  # Clear the list to avoid double cleanup
+        self.infrastructure.clear()
+        self._stop_containers(containers_to_remove)
         
         # Remove networks
         networks_to_remove = self.networks.copy()
@@ -175,12 +402,22 @@ class ContainerManager:
 class ContainerStatsCollector:
     """Collects container statistics in a separate thread"""
     
-    def __init__(self, docker_client: docker.DockerClient, case: str, config: PerformanceConfig):
+    def __init__(self, docker_client: docker.DockerClient, case: str, config: PerformanceConfig,
+                 name_suffix: str = '', platform: str = '', writer=None):
         self.docker_client = docker_client
         self.case = case
+        self.platform = platform
         self.config = config
-        self.container_stats = []
+        self.name_suffix = name_suffix  # only collect containers of one parallel job
+        self.writer = writer  # stats writer the samples are flushed to while collecting
+        self.sources: Dict[str, object] = {}  # ContainerStream or CgroupReader per container id
+        self.series: Dict[str, ContainerSeries] = {}
+        # Resource usage accumulated while sampling, of all containers, the platform's nodes and each node
+        self.usage = UsageTotals()
+        self.platform_usage = UsageTotals()
+        self.node_totals: Dict[str, UsageTotals] = {}
         self.collecting_thread = None
+        self.discovery_thread = None
         self.stop_event = threading.Event()
 
     def start_collection(self):
@@ -190,53 +427,104 @@ class ContainerStatsCollector:
             return
             
         self.stop_event.clear()
+        self.discovery_thread = threading.Thread(target=self._discover_containers, daemon=True)
+        self.discovery_thread.start()
         self.collecting_thread = threading.Thread(target=self._collect_stats, daemon=True)
         self.collecting_thread.start()
         logger.info("Started container stats collection")
 
-    def _collect_stats(self):
-        """Internal method to collect stats"""
+    def _discover_containers(self):
+        """Open one stats source per new container of this job, and periodically flush samples"""
+        last_flush = time.monotonic()
         while not self.stop_event.is_set():
             try:
-                containers = self.docker_client.containers.list()
-                
-                for container in containers:
-                    if self.stop_event.is_set():
-                        break
-                        
-                    try:
-                        stats = container.stats(stream=False)
-                        stats['timestamp'] = datetime.now().isoformat()
-                        stats['case'] = self.case
-                        stats['container_name'] = container.name
-                        self.container_stats.append(stats)
-                    except docker.errors.NotFound:
-                        logger.debug(f"Container {container.id[:12]} removed during collection")
-                    except docker.errors.APIError as e:
-                        logger.warning(f"Docker API error for {container.id[:12]}: {e}")
-                    except Exception as e:
-                        logger.error(f"Unexpected error collecting stats for {container.id[:12]}: {e}")
-                        
+                for container in self.docker_client.containers.list():
+                    if container.id in self.sources or not container.name.endswith(self.name_suffix):
+                        continue
+                    self.series[container.id] = ContainerSeries(container.name, self.config.stats_ring_size,
+                                                                node=container.labels.get(NODE_LABEL, ''))
+                    self.sources[container.id] = self._open_source(container)
             except Exception as e:
                 logger.error(f"Error in stats collection loop: {e}")
-            finally:
-                if not self.stop_event.is_set():
-                    time.sleep(self.config.stats_collection_interval)
+            if time.monotonic() - last_flush >= self.config.stats_flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+            # Listing containers is an API call, so high-frequency sampling does not speed up discovery
+            self.stop_event.wait(max(self.config.stats_collection_interval, 1.0))
+
+    def _flush(self):
+        """Hand samples taken since the previous flush to the stats writer"""
+        if self.writer is None:
+            return
+        for series in list(self.series.values()):
+            try:
+                self.writer.write(self.case, self.platform, series.name, series.unflushed(), series.node)
+            except Exception as e:
+                logger.error(f"Failed to write stats of {series.name}: {e}")
+
+    def _open_source(self, container: docker.models.containers.Container):
+        """Read the container's cgroup files when configured and readable, else its stats stream"""
+        if self.config.stats_backend == 'cgroup':
+            reader = CgroupReader.open(container)
+            if reader is not None:
+                return reader
+            logger.info(f"cgroup v2 files of {container.name} are not readable, using the Docker stats API")
+        stream = ContainerStream(container, self.stop_event)
+        stream.start()
+        return stream
+
+    def _collect_stats(self):
+        """Snapshot the latest sample of every source on a fixed schedule"""
+        ticker = IntervalTicker(self.config.stats_collection_interval, align=True)
+        while True:
+            timestamp = time.time()
+            for container_id, source in list(self.sources.items()):
+                latest = source.read() if source.is_alive() else None
+                if latest is not None:
+                    series = self.series[container_id]
+                    self._account(series.node, series.sample(timestamp, latest))
+            if not ticker.wait(self.stop_event):
+                break
+        for source in self.sources.values():
+            if isinstance(source, CgroupReader):
+                source.close()
+
+    def _account(self, node: str, values: List[float]):
+        self.usage.add(values)
+        if node:
+            self.node_totals.setdefault(node, UsageTotals()).add(values)
+            if node_platform(node) == self.platform:
+                self.platform_usage.add(values)
 
-    def stop_collection(self) -> List[Dict]:
-        """Stop collecting and return collected stats"""
+    def resource_usage(self) -> Dict[str, float]:
+        """CPU-seconds and peak memory of the test, summing containers at each tick.
+
+        With a platform, only the nodes of that platform count, so Kafka and the generator are left out;
+        without node labels all containers count.
+        """
+        if self.platform and self.node_totals:
+            return self.platform_usage.usage()
+        return self.usage.usage()
+
+    def node_usage(self) -> Dict[str, Dict[str, float]]:
+        """resource_usage of each labelled node of the test"""
+        return {node: totals.usage() for node, totals in sorted(self.node_totals.items())}
+
+    def stop_collection(self):
+        """Stop collecting and flush the samples not written yet"""
         if not self.collecting_thread:
-            return []
+            return
             
         self.stop_event.set()
         self.collecting_thread.join(timeout=5)
+        self.discovery_thread.join(timeout=5)
         
         if self.collecting_thread.is_alive():
             logger.warning("Stats collection thread did not stop gracefully")
         else:
             logger.info("Stopped container stats collection")
-            
-        return self.container_stats.copy()
+        # Stream threads end with their next stats document, at most a second later
+        self._flush()
 
 class NexmarkBenchmark:
     """Main benchmark orchestrator"""
@@ -246,7 +534,39 @@ class NexmarkBenchmark:
         self.current_path = os.getcwd()
         self.client = docker.from_env()
         self.container_manager = ContainerManager(self.client)
+        self.readiness = Readiness(
+            self.client,
+            deadline=config.readiness_deadline,
+            initial_backoff=config.readiness_initial_backoff,
+            max_backoff=config.readiness_max_backoff
+        )
         self.network_name = "network_nexmark"
+        self.input_dataset: Optional[InputDataset] = None
+        self.kafka_container = None
+        self.kafka_cpuset: Optional[str] = None
+        self.warm_pool: Dict[str, List[docker.models.containers.Container]] = {}
+        self.stats_writer = None  # set for the duration of run_tests
+        self.stats_parts: Optional[CheckpointStatsWriter] = None
+        self.engine_parts: Optional[CheckpointStatsWriter] = None  # engine metrics, with engine_metrics_enabled
+        self.journal: Optional[RunJournal] = None
+        self.trial_policy = TrialPolicy(
+            trials=config.trials,
+            warmup=config.warmup_trials,
+            ci_target=config.trial_ci_target,
+            max_trials=config.trial_max,
+            time_budget=config.trial_time_budget,
+            metric=config.trial_metric,
+            confidence=config.trial_confidence,
+            resamples=config.trial_bootstrap_resamples
+        )
+        self.live_sink: Optional[LiveSink] = None
+        self.golden: Optional[Dict] = None  # golden result of the dataset in the input topics
+        self.sql_sessions: Dict[Tuple[str, str], Tuple[str, object]] = {}  # (platform, job id) -> (engine id, session)
+        self.images: Dict[str, str] = {}  # image config field -> digest-pinned reference, set by preflight_images
+        self.platforms = {name: platform(self) for name, platform in PLATFORMS.items()}
+        self.dataset_cache = None
+        if config.dataset_cache_enabled:
+            self.dataset_cache = DatasetCache(config.dataset_cache_dir, config.dataset_cache_max_bytes)
         
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -256,81 +576,51 @@ class NexmarkBenchmark:
         """Handle shutdown signals"""
         logger.info(f"Received signal {signum}, shutting down...")
         self.container_manager.cleanup()
+        if self.journal is not None:
+            # Finished pairs are already durable in the journal
+            logger.info(f"Resume the run with: python nexmark.py --resume {self.journal.run_id}")
         sys.exit(0)
 
     def wait_for_health(self, container: docker.models.containers.Container, 
-                       max_attempts: int = None) -> bool:
+                       deadline: float = None) -> bool:
         """Wait for container to become healthy"""
-        max_attempts = max_attempts or self.config.flink_max_health_checks
-        
-        for attempt in range(max_attempts):
-            try:
-                container.reload()
-                
-                # Check if container is still running
-                if container.status in ['exited', 'dead']:
-                    logger.error(f"Container {container.name} has exited with status: {container.status}")
-                    # Get container logs for debugging
-                    try:
-                        logs = container.logs(tail=50).decode('utf-8')
-                        logger.error(f"Container {container.name} logs:\n{logs}")
-                    except Exception as e:
-                        logger.warning(f"Could not retrieve logs for {container.name}: {e}")
-                    return False
-                
-                health_status = container.attrs.get('State', {}).get('Health', {}).get('Status')
-                
-                if health_status == 'healthy':
-                    logger.info(f"Container {container.name} is healthy")
-                    return True
-                elif health_status == 'unhealthy':
-                    logger.error(f"Container {container.name} is unhealthy")
-                    # Get container logs for debugging
-                    try:
-                        logs = container.logs(tail=50).decode('utf-8')
-                        logger.error(f"Container {container.name} logs:\n{logs}")
-                    except Exception as e:
-                        logger.warning(f"Could not retrieve logs for {container.name}: {e}")
-                    return False
-                elif health_status is None:
-                    # Container might not have health check configured, check if it's running
-                    if container.status == 'running':
-                        logger.info(f"Container {container.name} is running (no health check configured)")
-                        return True
-                    
-                logger.debug(f"Container {container.name} health: {health_status}, status: {container.status} (attempt {attempt + 1})")
-                time.sleep(self.config.health_check_timeout)
-                
-            except docker.errors.NotFound:
-                logger.error(f"Container {container.name} was removed or does not exist")
-                return False
-            except Exception as e:
-                logger.warning(f"Error checking health for {container.name}: {e}")
-                time.sleep(self.config.health_check_timeout)
-        
-        logger.error(f"Container {container.name} failed to become healthy after {max_attempts} attempts")
-        return False
+        return self.readiness.wait_for_container(container, deadline or self.config.readiness_deadline)
 
-    def wait_for_http_endpoint(self, url: str, max_attempts: int = None) -> bool:
+    def wait_for_http_endpoint(self, url: str, deadline: float = None) -> bool:
         """Wait for HTTP endpoint to become available"""
-        max_attempts = max_attempts or self.config.flink_max_health_checks
-        
-        for attempt in range(max_attempts):
-            try:
-                response = requests.get(url, timeout=5)
-                if response.status_code == 200:
-                    logger.info(f"HTTP endpoint {url} is available")
-                    return True
-            except requests.RequestException as e:
-                logger.debug(f"HTTP endpoint {url} not ready (attempt {attempt + 1}): {e}")
-            
-            time.sleep(self.config.flink_health_check_interval)
-        
-        logger.error(f"HTTP endpoint {url} failed to become available")
-        return False
+        return self.readiness.wait_for_http(url, deadline or self.config.readiness_deadline)
+
+    def image(self, name: str) -> str:
+        """Image of a config field, pinned by digest once preflight_images has run"""
+        return self.images.get(name) or getattr(self.config, name)
+
+    def required_images(self, platforms: List[str]) -> Dict[str, str]:
+        """Image config fields the platforms need, with their references"""
+        names = ['kafka_image', 'kafka_admin_image']
+        if self.config.generator == 'container':
+            names.append('generator_image')
+        for platform in platforms:
+            names += self.platforms[platform].images
+        # Images pinned by an earlier attempt of a resumed run stay pinned
+        return {name: self.image(name) for name in names}
+
+    def preflight_images(self, platforms: List[str]):
+        """Pull every image the platforms need concurrently and pin it by digest, before any infrastructure starts"""
+        images = self.required_images(platforms)
+        logger.info(f"Resolving {len(images)} images with pull policy '{self.config.image_pull_policy}'")
+        start = time.time()
+        try:
+            self.images = resolve_images(self.client, images, self.config.image_pull_policy,
+                                         self.config.image_pull_concurrency)
+        except Exception as e:
+            raise NexmarkTestError(f"Image preflight failed: {e}")
+        for name, reference in sorted(self.images.items()):
+            logger.info(f"Pinned {name}: {reference}")
+        logger.info(f"Images ready in {time.time() - start:.1f}s")
 
-    def initialize_infrastructure(self, data_size: int, event_rate: int) -> docker.models.containers.Container:
-        """Initialize the test infrastructure"""
+    def initialize_infrastructure(self, data_size: int, event_rate: int,
+                                  load_input: bool = True) -> docker.models.containers.Container:
+        """Initialize the test infrastructure, with empty input topics unless load_input"""
         logger.info("Initializing test infrastructure...")
         
         try:
@@ -339,12 +629,14 @@ class NexmarkBenchmark:
             
             # Start Kafka
             kafka_container = self._start_kafka()
+            self.kafka_container = kafka_container
             
             # Initialize Kafka topics
-            self._init_kafka_topics(['nexmark-auction', 'nexmark-person', 'nexmark-bid'])
+            self._init_kafka_topics(INPUT_TOPICS)
             
-            # Generate test data
-            self._generate_data(data_size, event_rate)
+            # Load test data, from the dataset cache when possible
+            if load_input:
+                self._load_input_data(data_size, event_rate)
             
             logger.info("Infrastructure initialization completed")
             return kafka_container
@@ -354,12 +646,82 @@ class NexmarkBenchmark:
             self.container_manager.cleanup()
             raise
 
+    def ensure_shared_input(self, data_size: int, event_rate: int) -> InputDataset:
+        """Initialize Kafka and the input dataset once, reusing it while it is still intact"""
+        key = InputDatasetKey(
+            data_size=data_size,
+            event_rate=event_rate,
+            partitions=self.config.kafka_partitions,
+            generators=self.config.default_num_generators
+        )
+        
+        if self.input_dataset is not None:
+            if self.input_dataset.key == key and self._verify_input_offsets(self.input_dataset):
+                logger.info(f"Reusing shared input dataset: {key}")
+                return self.input_dataset
+            logger.warning("Shared input dataset is stale, regenerating...")
+            self.input_dataset = None
+            self.container_manager.cleanup()
+        
+        self.initialize_infrastructure(data_size, event_rate)
+        self.input_dataset = InputDataset(key=key, offsets=self._get_topic_offsets(INPUT_TOPICS))
+        logger.info(f"Shared input dataset ready: {self.input_dataset.offsets}")
+        return self.input_dataset
+
+    def _get_topic_offsets(self, topics: List[str]) -> Dict[str, Dict[int, Tuple[int, int]]]:
+        """Get (beginning, end) offsets for every partition of the given topics"""
+        consumer = KafkaConsumer(
+            bootstrap_servers=self.config.kafka_bootstrap_servers,
+            enable_auto_commit=False
+        )
+        
+        try:
+            offsets = {}
+            for topic in topics:
+                partitions = consumer.partitions_for_topic(topic) or set()
+                topic_partitions = [TopicPartition(topic, p) for p in sorted(partitions)]
+                beginning = consumer.beginning_offsets(topic_partitions)
+                end = consumer.end_offsets(topic_partitions)
+                offsets[topic] = {tp.partition: (beginning[tp], end[tp]) for tp in topic_partitions}
+            return offsets
+        finally:
+            consumer.close()
+
+    def _verify_input_offsets(self, dataset: InputDataset) -> bool:
+        """Check the input topics still hold exactly the offsets recorded after generation"""
+        try:
+            current = self._get_topic_offsets(list(dataset.offsets.keys()))
+        except Exception as e:
+            logger.warning(f"Failed to read input topic offsets: {e}")
+            return False
+        
+        if current != dataset.offsets:
+            logger.warning(f"Input topic offsets changed: expected {dataset.offsets}, got {current}")
+            return False
+        
+        return True
+
+    def cleanup_case(self, case: str):
+        """Remove per-case state while keeping Kafka and the input topics"""
+        logger.info(f"Cleaning up case {case}, keeping shared input")
+        self.container_manager.cleanup_engines()
+        
+        # Output topics, plus the topics and consumer groups the engines leave behind, which would
+        # otherwise be replayed by the next engine sharing this Kafka
+        ctx = self.default_context()
+        topics = ['^NEXMARK_.*']
+        for name, platform in self.platforms.items():
+            topics += [f'^{re.escape(topic)}$' for topic in platform.case_topics(case, ctx)]
+            topics += platform.state_topics(ctx, warm=name in self.warm_pool)
+        self._delete_kafka_topics(topics, regex=True)
+        self._delete_consumer_groups()
+
     def _start_kafka(self) -> docker.models.containers.Container:
         """Start Kafka container"""
         logger.info("Starting Kafka container...")
         
         container_config = {
-            'image': self.config.kafka_image,
+            'image': self.image('kafka_image'),
             'name': 'kafka',
             'command': [
                 'redpanda', 'start',
@@ -370,7 +732,7 @@ class NexmarkBenchmark:
                 '--schema-registry-addr', 'internal://0.0.0.0:8081,external://0.0.0.0:18081',
                 '--rpc-addr', 'kafka:33145',
                 '--advertise-rpc-addr', 'kafka:33145',
-                '--smp', '1',
+                '--smp', str(self.config.redpanda_smp),
                 '--memory', self.config.kafka_memory,
                 '--mode', 'dev-container',
                 '--default-log-level=info'
@@ -382,6 +744,8 @@ class NexmarkBenchmark:
                 '19644/tcp': 19644
             },
             'network': self.network_name,
+            'labels': {NODE_LABEL: 'kafka/broker'},
+            **({'cpuset_cpus': self.kafka_cpuset} if self.kafka_cpuset else {}),
             'healthcheck': {
                 'test': ["CMD-SHELL", "rpk cluster health | grep -E 'Healthy:.+true' || exit 1"],
                 'interval': 15 * 1000000000,
@@ -393,32 +757,33 @@ class NexmarkBenchmark:
             'auto_remove': True
         }
 
-        container = self.container_manager.create_container(**container_config)
+        container = self.container_manager.create_container(infrastructure=True, **container_config)
         
-        if not self.wait_for_health(container):
-            raise NexmarkTestError("Kafka container failed to become healthy")
-        
-        # Give Kafka a bit more time to be fully ready for topic operations
-        logger.info("Waiting for Kafka to be fully ready...")
-        time.sleep(10)  # Increased wait time
+        # Probe the broker directly rather than waiting for the next Docker health check
+        if not self.readiness.wait_for_kafka(self.config.kafka_bootstrap_servers):
+            raise NexmarkTestError("Kafka container failed to become ready")
         
         return container
 
-    def _init_kafka_topics(self, topics: List[str]):
+    def _init_kafka_topics(self, topics: List[str], ctx: Optional[JobContext] = None,
+                           configs: Optional[Dict[str, str]] = None):
         """Initialize Kafka topics"""
+        ctx = ctx or self.default_context()
         logger.info(f"Initializing Kafka topics: {topics}")
         
         # Use the exact same approach as the original working code
         # Original: command = ['--brokers=kafka:9092', 'topic', 'create'] + topics
-        command = ['--brokers=kafka:9092', 'topic', 'create']
+        command = ['--brokers=kafka:9092', 'topic', 'create', '-p', str(self.config.kafka_partitions)]
+        for key, value in (configs or {}).items():
+            command.extend(['-c', f'{key}={value}'])
         for topic in topics:
             command.append(topic)
         
         config = {
-            'image': 'docker.redpanda.com/redpandadata/redpanda:v23.3.14',
+            'image': self.image('kafka_admin_image'),
             'command': command,
-            'name': 'init_kafka_topic',
-            'network': self.network_name,
+            'name': ctx.name('init_kafka_topic'),
+            'network': ctx.network,
             'detach': False,
             'auto_remove': True
         }
@@ -426,6 +791,8 @@ class NexmarkBenchmark:
         try:
             result = self.client.containers.run(**config)
             logger.info(f"Successfully created Kafka topics: {topics}")
+            if not self.readiness.wait_for_kafka(self.config.kafka_bootstrap_servers, topics):
+                logger.warning(f"Kafka topics {topics} not visible in metadata yet")
         except docker.errors.ContainerError as e:
             # Check if topics already exist (this is often acceptable)
             stderr_output = e.stderr.decode() if e.stderr else str(e)
@@ -447,24 +814,27 @@ class NexmarkBenchmark:
             # Be more lenient here too
             logger.warning("Continuing despite topic creation error - this might be due to timing issues")
 
-    def _delete_kafka_topics(self, topics: List[str]):
+    def _delete_kafka_topics(self, topics: List[str], regex: bool = False, ctx: Optional[JobContext] = None):
         """Delete Kafka topics"""
         if not topics:
             return
+        ctx = ctx or self.default_context()
             
         logger.info(f"Deleting Kafka topics: {topics}")
         
         # Use the exact same approach as the original working code
         # Original: command = ['--brokers=kafka:9092', 'topic', 'delete'] + topics
         command = ['--brokers=kafka:9092', 'topic', 'delete']
+        if regex:
+            command.append('--regex')
         for topic in topics:
             command.append(topic)
         
         config = {
-            'image': 'docker.redpanda.com/redpandadata/redpanda:v23.3.14',
+            'image': self.image('kafka_admin_image'),
             'command': command,
-            'name': 'delete_kafka_topic',
-            'network': self.network_name,
+            'name': ctx.name('delete_kafka_topic'),
+            'network': ctx.network,
             'detach': False,
             'auto_remove': True
         }
@@ -472,8 +842,10 @@ class NexmarkBenchmark:
         try:
             result = self.client.containers.run(**config)
             logger.info(f"Successfully deleted Kafka topics: {topics}")
-            # Give Kafka a moment to process the deletion
-            time.sleep(2)
+            # Wait until the deletion is visible in the broker metadata
+            patterns = topics if regex else [re.escape(topic) for topic in topics]
+            if not self.readiness.wait_for_kafka(self.config.kafka_bootstrap_servers, patterns, absent=True):
+                logger.warning(f"Kafka topics {topics} still visible in metadata")
         except docker.errors.ContainerError as e:
             # It's OK if topics don't exist
             stderr_output = e.stderr.decode() if e.stderr else str(e)
@@ -484,18 +856,109 @@ class NexmarkBenchmark:
         except Exception as e:
             logger.warning(f"Failed to delete Kafka topics: {e}")
 
-    def _generate_data(self, data_size: int, event_rate: int):
-        """Generate test data"""
-        logger.info(f'Generating test data: size={data_size}, rate={event_rate}')
+    def _delete_consumer_groups(self, prefix: str = ''):
+        """Delete consumer groups (all, or those starting with prefix) so engines do not resume from earlier offsets"""
+        admin = None
+        try:
+            admin = KafkaAdminClient(bootstrap_servers=self.config.kafka_bootstrap_servers)
+            groups = [group_id for group_id, _ in admin.list_consumer_groups() if group_id.startswith(prefix)]
+            if groups:
+                admin.delete_consumer_groups(groups)
+                logger.info(f"Deleted consumer groups: {groups}")
+        except Exception as e:
+            logger.warning(f"Failed to delete consumer groups: {e}")
+        finally:
+            if admin:
+                admin.close()
+
+    def _dataset_params(self, data_size: int, event_rate: int) -> Dict:
+        """Parameters that determine the generated dataset, used as the dataset cache key"""
+        if self.config.generator == 'native':
+            return {
+                'generator': 'native',
+                'data_size': data_size,
+                'event_rate': event_rate,
+                'partitions': self.config.kafka_partitions,
+                'seed': self.config.generator_seed,
+                'base_time_ms': self.config.generator_base_time_ms,
+                'out_of_order_group': self.config.generator_out_of_order_group,
+                **self.config.generator_options
+            }
+        # The digest-pinned reference, so a retagged generator image does not restore stale datasets
+        return {
+            'image': self.image('generator_image'),
+            'data_size': data_size,
+            'event_rate': event_rate,
+            'partitions': self.config.kafka_partitions,
+            'generators': self.config.default_num_generators
+        }
+
+    def _load_input_data(self, data_size: int, event_rate: int):
+        """Fill the input topics, restoring from the dataset cache instead of regenerating on a hit"""
+        if not self.dataset_cache:
+            self._generate_data(data_size, event_rate)
+            return
         
-        config = {
-            'image': 'ghcr.io/risingwavelabs/nexmark-bench:test-7',
+        params = self._dataset_params(data_size, event_rate)
+        key = DatasetCache.key_for(**params)
+        
+        try:
+            if self.dataset_cache.restore(key, self.config.kafka_bootstrap_servers):
+                self._load_golden(data_size, event_rate)
+                return
+        except Exception as e:
+            # A partially restored dataset cannot be reused, start again from empty topics
+            logger.warning(f"Failed to restore dataset cache entry {key}, regenerating: {e}")
+            self._delete_kafka_topics(INPUT_TOPICS)
+            self._init_kafka_topics(INPUT_TOPICS)
+        
+        self._generate_data(data_size, event_rate)
+        
+        try:
+            self.dataset_cache.store(key, params, self.config.kafka_bootstrap_servers, INPUT_TOPICS)
+        except Exception as e:
+            logger.warning(f"Failed to store dataset cache entry {key}: {e}")
+        self._load_golden(data_size, event_rate)
+
+    def _golden_path(self, data_size: int, event_rate: int) -> Optional[str]:
+        """Path of the golden result next to the dataset's cache entry, None without a cache entry"""
+        if not self.dataset_cache:
+            return None
+        directory = self.dataset_cache.entry_dir(DatasetCache.key_for(**self._dataset_params(data_size, event_rate)))
+        return golden_path(directory, self.config.verify_float_digits) if directory else None
+
+    def _load_golden(self, data_size: int, event_rate: int):
+        """Load the golden result of the dataset, evaluating it from the input topics when the cache entry has none"""
+        self.golden = None
+        if not self.config.verify_golden or not (self.config.verify_output or self.config.completion_detector == 'expected'):
+            return
+        path = self._golden_path(data_size, event_rate)
+        if path is None:
+            logger.info("No dataset cache entry to keep a golden result in, skipping the reference evaluation")
+            return
+        self.golden = load_golden(path)
+        if self.golden is not None:
+            return
+        
+        logger.info(f"Evaluating the golden result of the dataset into {path}")
+        bootstrap_servers, timeout = self.config.kafka_bootstrap_servers, self.config.kafka_timeout
+        read_topic = lambda topic: (value for _, _, _, value in read_records(bootstrap_servers, topic, timeout))
+        try:
+            self.golden = store_golden(path, read_topic, self.config.verify_float_digits, self.config.verify_processes)
+        except Exception as e:
+            logger.warning(f"Failed to evaluate the golden result: {e}")
+
+    def _generator_config(self, data_size: int, event_rate: int) -> Dict:
+        """Container arguments of the Nexmark generator writing to the input topics"""
+        return {
+            'image': self.image('generator_image'),
             'command': [
                 f'--max-events={data_size}',
                 f'--num-event-generators={self.config.default_num_generators}',
                 f'--event-rate={event_rate}'
             ],
             'name': 'generate_data',
+            'labels': {NODE_LABEL: 'generator/nexmark-bench'},
             'environment': {
                 'KAFKA_HOST': 'kafka:9092',
                 'AUCTION_TOPIC': 'nexmark-auction',
@@ -509,547 +972,738 @@ class NexmarkBenchmark:
             'auto_remove': True
         }
 
+    def _generator_spec(self, data_size: int, event_rate: int, paced: bool = False, first_event: int = 0,
+                        base_time_ms: int = 0) -> GeneratorSpec:
+        """Parameters of the native generator writing to the input topics"""
+        return GeneratorSpec(
+            events=data_size,
+            event_rate=event_rate,
+            seed=self.config.generator_seed,
+            base_time_ms=base_time_ms or self.config.generator_base_time_ms or int(time.time() * 1000),
+            first_event=first_event,
+            out_of_order_group=self.config.generator_out_of_order_group,
+            paced=paced,
+            **self.config.generator_options
+        )
+
+    def _generate_data(self, data_size: int, event_rate: int):
+        """Generate test data"""
+        logger.info(f'Generating test data: size={data_size}, rate={event_rate}, generator={self.config.generator}')
+        
         try:
-            self.container_manager.create_container(**config)
+            if self.config.generator == 'native':
+                generate_to_kafka(self._generator_spec(data_size, event_rate), self.config.kafka_bootstrap_servers,
+                                  processes=self.config.generator_processes)
+            else:
+                self.container_manager.create_container(**self._generator_config(data_size, event_rate))
             logger.info("Data generation completed")
         except Exception as e:
             logger.error(f"Failed to generate data: {e}")
             raise NexmarkTestError(f"Data generation failed: {e}")
 
-    def test_flink(self, case: str) -> TestResult:
-        """Test Flink platform"""
-        logger.info(f"Testing Flink with case: {case}")
+    def default_context(self) -> JobContext:
+        """Job context of the serial path: shared network, default ports and names"""
+        return JobContext(network=self.network_name)
+
+    def network_config(self, ctx: JobContext, alias: str) -> Dict:
+        """Network arguments giving a job container a fixed hostname on its job network"""
+        if not ctx.job_id:
+            return {'network': ctx.network}
+        return {
+            'network': ctx.network,
+            'networking_config': {ctx.network: self.client.api.create_endpoint_config(aliases=[alias])}
+        }
+
+    def script_dir(self, platform: str, case: str, ctx: JobContext) -> str:
+        """Script directory to mount, with output topics renamed into the job's namespace"""
+        script_path = os.path.join(self.current_path, 'scripts', get_case(case).script(platform))
+        scripts_dir = os.path.dirname(script_path)
+        if not ctx.job_id:
+            return scripts_dir
         
-        collector = ContainerStatsCollector(self.client, f"flink_{case}", self.config)
+        job_dir = os.path.join(self.current_path, '.jobs', ctx.job_id, platform)
+        os.makedirs(job_dir, exist_ok=True)
+        with open(script_path, 'r') as f:
+            script = f.read()
         
-        try:
-            collector.start_collection()
-            
-            # Create case-specific topic
-            case_topic = f'nexmark_{case}'.upper()
-            self._init_kafka_topics([case_topic])
-            
-            # Start Flink cluster
-            jobmanager, taskmanager = self._start_flink_cluster()
-            
-            # Run query and measure time
-            start_time = time.time()
-            self._run_flink_query(case)
-            size = self._read_from_kafka(case)
-            end_time = time.time()
-            
-            elapsed_time = end_time - start_time - self.config.kafka_timeout
-            
-            stats = collector.stop_collection()
-            
-            return TestResult(
-                case=case,
-                platform='flink',
-                execution_time=elapsed_time,
-                output_size=size,
-                stats=stats
-            )
-            
-        except Exception as e:
-            logger.error(f"Flink test failed for case {case}: {e}")
-            return TestResult(
-                case=case,
-                platform='flink',
-                execution_time=0,
-                output_size=0,
-                error=str(e)
-            )
-        finally:
-            collector.stop_collection()
-            
-            jobmanager.stop()
-            taskmanager.stop()
-            
-            # Clean up case-specific topic
-            try:
-                case_topic = f'nexmark_{case}'.upper()
-                self._delete_kafka_topics([case_topic])
-            except Exception as e:
-                logger.warning(f"Failed to cleanup topic for Flink test: {e}")
+        # Rename output topics and ksqlDB intermediate streams, keeping the case of each match
+        def namespace(match):
+            suffix = ctx.job_id.upper() if match.group(0).isupper() else ctx.job_id
+            return f'{match.group(0)}_{suffix}'
+        script = re.sub(r'\bnexmark_(?:q\d+|base)\b', namespace, script, flags=re.IGNORECASE)
+        script = re.sub(r'\bprocessing_stream\b', namespace, script, flags=re.IGNORECASE)
+        
+        with open(os.path.join(job_dir, f'{case}.sql'), 'w') as f:
+            f.write(script)
+        return job_dir
 
-    def test_timeplus(self, case: str) -> TestResult:
-        """Test Timeplus platform"""
-        logger.info(f"Testing Timeplus with case: {case}")
+    def _acquire_engine(self, platform: str, ctx: JobContext,
+                        start) -> Tuple[List[docker.models.containers.Container], str]:
+        """Return the engine containers and 'cold' or 'warm', reusing a warm engine when enabled"""
+        # Parallel jobs each have their own network and ports, so only the serial path keeps engines warm
+        if not self.config.warm_engines or ctx.job_id:
+            return start(), 'cold'
         
-        collector = ContainerStatsCollector(self.client, f"timeplus_{case}", self.config)
+        containers = self.warm_pool.get(platform)
+        if containers and all(self._is_running(c) for c in containers):
+            logger.info(f"Reusing warm {platform} engine")
+            return containers, 'warm'
+        if containers:
+            logger.warning(f"Warm {platform} engine is no longer running, starting a new one")
+            self._evict_warm_engine(platform)
         
-        try:
-            collector.start_collection()
-            
-            # Create case-specific topic
-            case_topic = f'nexmark_{case}'.upper()
-            self._init_kafka_topics([case_topic])
-            
-            # Start Timeplus
-            timeplus_container = self._start_timeplus()
-            
-            # Run query and measure time
-            start_time = time.time()
-            self._run_timeplus_query(case, timeplus_container)
-            size = self._read_from_kafka(case)
-            end_time = time.time()
-            
-            elapsed_time = end_time - start_time - self.config.kafka_timeout
-            
-            stats = collector.stop_collection()
-            
-            return TestResult(
-                case=case,
-                platform='timeplus',
-                execution_time=elapsed_time,
-                output_size=size,
-                stats=stats
-            )
-            
-        except Exception as e:
-            logger.error(f"Timeplus test failed for case {case}: {e}")
-            return TestResult(
-                case=case,
-                platform='timeplus',
-                execution_time=0,
-                output_size=0,
-                error=str(e)
-            )
-        finally:
-            collector.stop_collection()
-            
-            timeplus_container.stop()
-            # Clean up case-specific topic
+        containers = start()
+        for container in containers:
+            self.container_manager.keep(container)
+        self.warm_pool[platform] = containers
+        return containers, 'cold'
+
+    def _release_engine(self, platform: str, ctx: JobContext, containers: List[docker.models.containers.Container]):
+        """Reset a warm engine for the next case, or stop a cold one"""
+        if self.warm_pool.get(platform) is containers:
             try:
-                case_topic = f'nexmark_{case}'.upper()
-                self._delete_kafka_topics([case_topic])
+                self.platforms[platform].reset(containers, ctx)
+                logger.info(f"Reset warm {platform} engine")
+                return
             except Exception as e:
-                logger.warning(f"Failed to cleanup topic for Timeplus test: {e}")
-
-    def test_ksqldb(self, case: str) -> TestResult:
-        """Test KsqlDB platform"""
-        logger.info(f"Testing KsqlDB with case: {case}")
+                logger.warning(f"Failed to reset warm {platform} engine, stopping it: {e}")
+                self._evict_warm_engine(platform)
         
-        # Skip unsupported cases
-        unsupported_cases = ['q5', 'q7', 'q8', 'q9', 'q15', 'q16', 'q17', 'q18', 'q19']
-        if case in unsupported_cases:
-            logger.warning(f"KsqlDB does not support case: {case}")
-            return TestResult(
-                case=case,
-                platform='ksqldb',
-                execution_time=0,
-                output_size=0,
-                error=f"Unsupported case: {case}"
-            )
+        self.platforms[platform].stop(containers)
+
+    def _evict_warm_engine(self, platform: str):
+        for container in self.warm_pool.pop(platform, []):
+            self.container_manager.release(container)
+            try:
+                container.stop()
+            except Exception as e:
+                logger.debug(f"Failed to stop container {container.name}: {e}")
+
+    def _is_running(self, container: docker.models.containers.Container) -> bool:
+        try:
+            container.reload()
+            return container.status == 'running'
+        except docker.errors.NotFound:
+            return False
+
+    def test_case(self, case: str, platform: str, ctx: Optional[JobContext] = None) -> TestResult:
+        """Run a case on a platform's engine and measure it"""
+        engine = self.platforms[platform]
+        logger.info(f"Testing {engine.label} with case: {case}")
+        ctx = ctx or self.default_context()
         
-        collector = ContainerStatsCollector(self.client, f"ksqldb_{case}", self.config)
+        collector = ContainerStatsCollector(self.client, case, self.config, name_suffix=ctx.name(''),
+                                            platform=platform, writer=self.stats_writer)
+        containers = []
+        engine_metrics = None
+        waits = self.readiness.open_scope()
         
         try:
             collector.start_collection()
             
-            # Create case-specific topic
-            case_topic = f'nexmark_{case}'.upper()
-            self._init_kafka_topics([case_topic])
+            # Create case-specific topic, stamped with broker append time for the output metrics
+            self._init_kafka_topics([ctx.topic(case)], ctx=ctx, configs=OUTPUT_TOPIC_CONFIGS)
             
-            # Start KsqlDB
-            ksqldb_container = self._start_ksqldb()
+            # Start the engine, or reuse the warm one
+            startup_start = time.time()
+            containers, engine_mode = self._acquire_engine(platform, ctx, lambda: engine.start(case, ctx))
+            startup_time = time.time() - startup_start
+            engine_metrics = self._engine_metrics(case, platform, ctx, containers)
             
             # Run query and measure time
-            start_time = time.time()
-            self._run_ksqldb_query(case, ksqldb_container)
-            size = self._read_from_kafka(case)
+            timeline = OutputTimeline()
+            start_time = self._submit_query(case, platform, ctx, containers)
+            completion = self._wait_for_completion(case, platform, ctx, containers, start_time)
+            size = self._read_from_kafka(case, ctx, timeline, completion)
             end_time = time.time()
             
-            elapsed_time = end_time - start_time - self.config.kafka_timeout
+            metrics = compute_metrics(timeline, start_time * 1000, self._input_event_count())
             
-            stats = collector.stop_collection()
+            collector.stop_collection()
+            if engine_metrics:
+                engine_metrics.stop()
             
-            return TestResult(
+            measured = dict(
                 case=case,
-                platform='ksqldb',
-                execution_time=elapsed_time,
+                platform=platform,
                 output_size=size,
-                stats=stats
+                **collector.resource_usage(),
+                node_usage=collector.node_usage(),
+                nodes=len(containers),
+                readiness_time=sum(wait.duration for wait in waits),
+                metrics=metrics,
+                engine_mode=engine_mode,
+                startup_time=startup_time
+            )
+            if completion is not None and completion.timed_out:
+                # A hung query or an unreached expected count is a failed trial, its output is incomplete
+                return TestResult(execution_time=0, completion_detector=completion.detector,
+                                  error=f"Completion not detected within {self.config.completion_deadline}s",
+                                  **measured)
+            
+            self._capture_output(case, platform, ctx)
+            return TestResult(
+                execution_time=self._execution_time(start_time, end_time, completion),
+                **measured,
+                **self._completion_fields(completion, start_time)
             )
             
         except Exception as e:
-            logger.error(f"KsqlDB test failed for case {case}: {e}")
+            logger.error(f"{engine.label} test failed for case {case}: {e}")
             return TestResult(
                 case=case,
-                platform='ksqldb',
+                platform=platform,
                 execution_time=0,
                 output_size=0,
                 error=str(e)
             )
         finally:
             collector.stop_collection()
+            if engine_metrics:
+                engine_metrics.stop()
+            self.readiness.close_scope(waits)
             
-            ksqldb_container.stop()
+            # A failed start leaves no engine to release, its containers are stopped with the case
+            if containers:
+                self._release_engine(platform, ctx, containers)
             
-            # Clean up case-specific topics
+            # Clean up the case-specific topics
             try:
-                case_topic = f'nexmark_{case}'.upper()
-                self._delete_kafka_topics([case_topic])
-                self._delete_kafka_topics(['PROCESSING_STREAM'])  # KsqlDB specific cleanup
+                self._delete_kafka_topics([ctx.topic(case)] + engine.case_topics(case, ctx), ctx=ctx)
             except Exception as e:
-                logger.warning(f"Failed to cleanup topics for KsqlDB test: {e}")
+                logger.warning(f"Failed to cleanup topics for {engine.label} test: {e}")
 
-    def _start_flink_cluster(self) -> Tuple[docker.models.containers.Container, docker.models.containers.Container]:
-        """Start Flink cluster"""
-        logger.info("Starting Flink cluster...")
-        
-        # JobManager
-        jm_config = {
-            'image': self.config.flink_image,
-            'ports': {f'{self.config.flink_port}/tcp': self.config.flink_port},
-            'name': 'flink-jobmanager',
-            'command': 'jobmanager',
-            'environment': [
-                'FLINK_PROPERTIES=jobmanager.rpc.address: flink-jobmanager'
-            ],
-            'mem_limit': self.config.flink_jobmanager_memory,
-            'cpu_period': self.config.cpu_period,
-            'cpu_quota': self.config.cpu_quota,
-            'network': self.network_name,
-            'detach': True,
-            'auto_remove': True
-        }
+    def _engine_metrics(self, case: str, platform: str, ctx: JobContext,
+                        containers: List[docker.models.containers.Container]) -> Optional[EngineMetricsCollector]:
+        """Start scraping the engine's own metrics, when enabled, on the ticks of the container stats"""
+        if not self.config.engine_metrics_enabled or not containers:
+            return None
+        engine = self.platforms[platform]
+        collector = EngineMetricsCollector(
+            lambda: engine.scrape_metrics(ctx, containers),
+            case,
+            platform,
+            node=containers[0].labels.get(NODE_LABEL, ''),
+            writer=self.engine_parts,
+            interval=self.config.engine_metrics_interval,
+            flush_interval=self.config.stats_flush_interval
+        )
+        collector.start()
+        return collector
 
-        jobmanager = self.container_manager.create_container(**jm_config)
-
-        # TaskManager
-        tm_config = {
-            'image': self.config.flink_image,
-            'name': 'flink-taskmanager',
-            'command': 'taskmanager',
-            'environment': [
-                f'FLINK_PROPERTIES=jobmanager.rpc.address: flink-jobmanager\n'
-                f'taskmanager.numberOfTaskSlots: {self.config.flink_taskmanager_slots}\n'
-                f'taskmanager.memory.flink.size: {self.config.flink_taskmanager_flink_memory}\n'
-                f'taskmanager.memory.process.size: {self.config.flink_taskmanager_process_memory}'
-            ],
-            'mem_limit': self.config.flink_taskmanager_memory,
-            'cpu_period': self.config.cpu_period,
-            'cpu_quota': self.config.cpu_quota,
-            'network': self.network_name,
-            'detach': True,
-            'auto_remove': True
-        }
+    def _unsupported(self, case: str, platform: str) -> TestResult:
+        """Report a pair without an implementation in the case manifest, without running it"""
+        logger.warning(f"{self.platforms[platform].label} does not support case: {case}")
+        result = TestResult(case=case, platform=platform, execution_time=0, output_size=0,
+                            error=f"Unsupported case: {case}", trial=len(self.journal.trial_rows(case, platform)))
+        self._publish(result)
+        self.journal.record_done(case, platform)
+        return result
 
-        taskmanager = self.container_manager.create_container(**tm_config)
+    def _read_script(self, platform: str, case: str, ctx: JobContext) -> str:
+        with open(os.path.join(self.script_dir(platform, case, ctx), f'{case}.sql'), 'r') as f:
+            return f.read()
 
-        # Wait for cluster to be ready
-        overview_url = f'http://localhost:{self.config.flink_port}/overview'
-        if not self.wait_for_http_endpoint(overview_url):
-            raise NexmarkTestError("Flink cluster failed to start")
+    def _sql_session(self, platform: str, ctx: JobContext, containers: List[docker.models.containers.Container]):
+        """The SQL session of an engine, opened on first use and kept while the engine runs"""
+        key = (platform, ctx.job_id)
+        engine_id = containers[0].id
+        current = self.sql_sessions.get(key)
+        if current and current[0] == engine_id:
+            return current[1]
+        if current:
+            # The engine was restarted, its session is gone with it
+            current[1].close()
+        session = self.platforms[platform].session(ctx)
+        self.sql_sessions[key] = (engine_id, session)
+        return session
 
-        # Verify taskmanager is registered
-        for attempt in range(self.config.flink_max_health_checks):
-            try:
-                response = requests.get(overview_url, timeout=5)
-                if response.status_code == 200:
-                    cluster_status = response.json()
-                    if cluster_status.get('taskmanagers', 0) >= 1:
-                        logger.info("Flink cluster is ready")
-                        return jobmanager, taskmanager
-            except Exception as e:
-                logger.debug(f"Waiting for Flink cluster (attempt {attempt + 1}): {e}")
-            
-            time.sleep(self.config.flink_health_check_interval)
+    def _close_sql_sessions(self):
+        for _, session in self.sql_sessions.values():
+            session.close()
+        self.sql_sessions.clear()
 
-        raise NexmarkTestError("Flink cluster failed to register taskmanager")
+    def _submit_query(self, case: str, platform: str, ctx: JobContext,
+                      containers: List[docker.models.containers.Container]) -> float:
+        """Submit the case's script and return the time the query clock started.
 
-    def _run_flink_query(self, case: str):
-        """Run Flink SQL query"""
-        logger.info(f"Running Flink query for case: {case}")
+        In a session, the DDL before the first statement that starts processing runs before the clock starts.
+        """
+        if self.config.query_submission == 'cli':
+            start_time = time.time()
+            try:
+                self.platforms[platform].run_script(case, ctx, containers)
+            except Exception as e:
+                raise NexmarkTestError(str(e))
+            return start_time
         
-        config = {
-            'image': self.config.flink_cli_image,
-            'name': 'run_flink_query',
-            'entrypoint': [
-                '/opt/flink/bin/sql-client.sh',
-                'embedded',
-                '-l', '/opt/sql-client/lib',
-                '-f', f'/home/scripts/{case}.sql'
-            ],
-            'volumes': {f'{self.current_path}/scripts/flink': {'bind': '/home/scripts', 'mode': 'rw'}},
-            'network': self.network_name,
-            'detach': False,
-            'auto_remove': True
-        }
-
+        setup, processing = split_script(self._read_script(platform, case, ctx))
+        logger.info(f"Submitting {case}.sql to {platform}: {len(setup)} setup and {len(processing)} processing statements")
+        session = self._sql_session(platform, ctx, containers)
         try:
-            self.container_manager.create_container(**config)
-            logger.info(f"Flink query {case}.sql completed")
+            for statement in setup:
+                session.execute(statement)
+            start_time = time.time()
+            for statement in processing:
+                session.execute(statement)
         except Exception as e:
-            logger.error(f"Flink query failed: {e}")
-            raise NexmarkTestError(f"Flink query execution failed: {e}")
+            logger.error(f"{platform} query {case}.sql failed: {e}")
+            raise NexmarkTestError(f"{platform} query execution failed: {e}")
+        logger.info(f"{platform} query {case}.sql submitted in {time.time() - start_time:.3f}s")
+        return start_time
 
-    def _start_timeplus(self) -> docker.models.containers.Container:
-        """Start Timeplus container"""
-        logger.info("Starting Timeplus container...")
-        
-        config = {
-            'image': self.config.timeplusd_image,
-            'ports': {
-                '3218/tcp': 3218,  # HTTP Streaming
-                '8123/tcp': 8123,  # HTTP Snapshot
-                '8463/tcp': 8463   # TCP Streaming
-            },
-            'name': 'timeplus',
-            'mem_limit': self.config.timeplus_memory,
-            'cpu_period': self.config.cpu_period,
-            'cpu_quota': self.config.cpu_quota,
-            'network': self.network_name,
-            'volumes': {f'{self.current_path}/scripts/timeplus': {'bind': '/home/scripts', 'mode': 'rw'}},
-            'healthcheck': {
-                'test': ["CMD", "curl", "http://localhost:3218/timeplus/ping"],
-                'interval': 2 * 1000000000,
-                'timeout': self.config.health_check_timeout * 1000000000,
-                'retries': self.config.health_check_retries,
-                'start_period': 10 * 1000000000
-            },
-            'detach': True,
-            'auto_remove': True
-        }
+    def _input_event_count(self) -> int:
+        """Number of records in the input topics"""
+        if self.input_dataset is not None:
+            offsets = self.input_dataset.offsets
+        else:
+            offsets = self._get_topic_offsets(INPUT_TOPICS)
+        return sum(end - begin for partitions in offsets.values() for begin, end in partitions.values())
 
-        container = self.container_manager.create_container(**config)
-        
-        if not self.wait_for_health(container):
-            raise NexmarkTestError("Timeplus container failed to become healthy")
-        
-        return container
+    def input_end_offsets(self) -> Dict[TopicPartition, int]:
+        """End offset of every input partition, which an engine has consumed all input at"""
+        if self.input_dataset is not None:
+            offsets = self.input_dataset.offsets
+        else:
+            offsets = self._get_topic_offsets(INPUT_TOPICS)
+        return {TopicPartition(topic, partition): end
+                for topic, partitions in offsets.items() for partition, (_, end) in partitions.items()}
 
-    def _run_timeplus_query(self, case: str, timeplus_container: docker.models.containers.Container):
-        """Run Timeplus query"""
-        logger.info(f"Running Timeplus query for case: {case}")
+    def _completion_detector(self, case: str, platform: str, ctx: JobContext,
+                             containers: List[docker.models.containers.Container]) -> Optional[CompletionDetector]:
+        """Detector configured for this job, or None to fall back to idle polls while draining"""
+        mode = self.config.completion_detector
+        if mode == 'idle':
+            return None
         
-        cmd = [
-            'timeplusd',
-            'client',
-            '--multiquery',
-            '--queries-file',
-            f'/home/scripts/{case}.sql'
-        ]
+        watermark = StableWatermarkDetector(self.config.completion_stable_ms, self.config.completion_empty_timeout)
+        if mode == 'engine':
+            engine = self.platforms[platform]
+            if engine.has_progress():
+                return EngineProgressDetector(lambda: engine.pending_records(ctx, containers),
+                                              self.config.completion_settle_ms, watermark)
+            logger.info(f"No engine progress available for {platform}, detecting completion by watermark")
+        elif mode == 'expected':
+            expected = self.config.expected_output_counts.get(case)
+            if expected is None:
+                expected = self._golden_output_count(case, platform, ctx)
+            if expected is not None:
+                return ExpectedCountDetector(expected)
+            logger.info(f"No expected output count for {case}, detecting completion by watermark")
         
-        try:
-            exit_code, output = timeplus_container.exec_run(cmd)
-            if exit_code != 0:
-                raise NexmarkTestError(f"Timeplus query failed with exit code {exit_code}: {output}")
-            logger.info(f"Timeplus query {case}.sql completed successfully")
-        except Exception as e:
-            logger.error(f"Timeplus query execution failed: {e}")
-            raise NexmarkTestError(f"Timeplus query execution failed: {e}")
+        return watermark
 
-    def _start_ksqldb(self) -> docker.models.containers.Container:
-        """Start KsqlDB container"""
-        logger.info("Starting KsqlDB container...")
-        
-        # Match your working docker-compose configuration exactly
-        ksqldb_config = {
-            'image': 'confluentinc/ksqldb-server:0.29.0',
-            'ports': {'8088/tcp': 8088},
-            'name': 'ksqldb',
-            'mem_limit': self.config.ksqldb_memory,
-            'cpu_period': self.config.cpu_period,
-            'cpu_quota': self.config.cpu_quota,
-            'network': self.network_name,
-            'environment': {
-                'KSQL_BOOTSTRAP_SERVERS': 'kafka:9092',
-                'KSQL_LISTENERS': 'http://0.0.0.0:8088/',
-                'KSQL_KSQL_SERVICE_ID': 'ksql_service_'
-            },
-            'volumes': {f'{self.current_path}/scripts/ksqldb': {'bind': '/home/scripts', 'mode': 'rw'}},
-            'healthcheck': {
-                'test': ["CMD", "curl", "http://localhost:8088/info"],
-                'interval': 2 * 1000000000,  # 2 seconds in nanoseconds
-                'timeout': 10 * 1000000000,    # 10 seconds in nanoseconds
-                'retries': 3,
-                'start_period': 10 * 1000000000  # 10 seconds in nanoseconds
-            },
-            'detach': True,  # Run container in detached mode
-            'auto_remove': True
-        }
+    def _golden_output_count(self, case: str, platform: str, ctx: JobContext) -> Optional[int]:
+        """Output records of a case from the golden result, which follows the Flink scripts.
+
+        Only Flink's append outputs write one record per expected row.
+        """
+        golden_case = (self.golden or {}).get('cases', {}).get(case)
+        if golden_case is None or platform != 'flink' or get_case(case).output_mode(platform) != APPEND:
+            return None
+        return golden_case['rows']
+
+    def _wait_for_completion(self, case: str, platform: str, ctx: JobContext,
+                             containers: List[docker.models.containers.Container],
+                             start_time: float) -> Optional[Completion]:
+        """Wait until the query's output is complete, if a completion detector is configured"""
+        detector = self._completion_detector(case, platform, ctx, containers)
+        if detector is None:
+            return None
+        watcher = CompletionWatcher(
+            self.config.kafka_bootstrap_servers,
+            ctx.topic(case),
+            detector,
+            poll_interval=self.config.completion_poll_interval,
+            deadline=self.config.completion_deadline
+        )
+        return watcher.wait(start_time)
+
+    def _execution_time(self, start_time: float, end_time: float, completion: Optional[Completion]) -> float:
+        """Query execution time, up to the detected completion or, with idle polls, minus the idle tail"""
+        if completion is not None:
+            return completion.completed_at - start_time
+        return end_time - start_time - self.config.kafka_timeout
 
-        ksqldb_container = self.client.containers.run(**ksqldb_config)
-        self.container_manager.containers.append(ksqldb_container)
-        logger.info(f"ksqldb container started: {ksqldb_container.id}")
+    def _output_capture_path(self, case: str, platform: str) -> str:
+        return os.path.join(self.journal.directory, 'outputs', f'{case}_{platform}')
 
-        for i in range(100):
+    def _capture_output(self, case: str, platform: str, ctx: JobContext):
+        """Keep the normalized output of the first trial of a (case, platform) for verification, outside of the timing"""
+        if not self.config.verify_output or self.journal is None:
+            return
+        path = self._output_capture_path(case, platform)
+        if os.path.exists(path):
+            return
+        try:
+            mode = get_case(case).output_mode(platform)
+            records = read_records(self.config.kafka_bootstrap_servers, ctx.topic(case), self.config.kafka_timeout)
+            meta = capture_output(platform, mode, records, path, self.config.verify_float_digits,
+                                  self.config.verify_sort_buffer)
+            logger.info(f"Captured {meta['rows']} {mode} rows of {case} on {platform} from {meta['records']} records")
+        except Exception as e:
+            # Verification never fails the measured test
+            logger.warning(f"Failed to capture the output of {case} on {platform}: {e}")
+
+    def verify_outputs(self, timestamp: str):
+        """Compare the captured outputs of each case across its platforms and with the golden result, and save the report"""
+        params = self.journal.params
+        path = self._golden_path(params['data_size'], params['event_rate']) if self.config.verify_golden else None
+        golden = load_golden(path) if path else None
+        rows = []
+        for case in params['cases']:
+            captures = {platform: self._output_capture_path(case, platform) for platform in params['platforms']
+                        if os.path.exists(self._output_capture_path(case, platform))}
+            golden_case = golden['cases'].get(case) if golden else None
             try:
-                c = self.client.containers.get(ksqldb_container.id)
-                
-                # Check if container exited
-                if c.status in ['exited', 'dead']:
-                    logger.error(f"KsqlDB container has exited with status: {c.status}")
-                    exit_code = c.attrs['State'].get('ExitCode', 'unknown')
-                    logger.error(f"KsqlDB container exit code: {exit_code}")
-                    
-                    # Get the logs to see why it crashed
-                    try:
-                        logs = c.logs().decode('utf-8')
-                        logger.error(f"KsqlDB container logs:\n{logs}")
-                    except Exception as log_e:
-                        logger.warning(f"Could not retrieve logs: {log_e}")
-                    
-                    raise NexmarkTestError(f"KsqlDB container crashed with exit code: {exit_code}")
-                
-                health_status = c.attrs['State']['Health']['Status']
-                logger.info(f"ksqldb container health status: {health_status}")
-                if health_status == 'healthy':
-                    break
-                time.sleep(3)
-            except docker.errors.NotFound:
-                logger.error(f"KsqlDB container {ksqldb_container.id} was removed (likely crashed)")
-                raise NexmarkTestError("KsqlDB container was removed during startup")
+                case_rows = []
+                if len(captures) >= 2:
+                    case_rows += compare_outputs(case, captures, self.config.verify_diff_samples,
+                                                 self.config.verify_sort_buffer)
+                if captures and golden_case:
+                    case_rows += compare_golden(case, captures, golden_case)
             except Exception as e:
-                logger.error(f"Error during ksqldb health check: {e}")
-                break
+                logger.error(f"Failed to verify the output of {case}: {e}")
+                continue
+            for row in case_rows:
+                if row['status'] != 'mismatch':
+                    continue
+                if row['reference'] == 'golden':
+                    logger.warning(f"Output of {case} on {row['platform']} differs from the golden result: "
+                                   f"{row['rows']} rows, {golden_case['rows']} expected")
+                else:
+                    logger.warning(f"Output of {case} on {row['platform']} differs from {row['reference']}: "
+                                   f"{row['missing']} rows missing, {row['unexpected']} unexpected")
+            rows += case_rows
+        if not rows:
+            return
         
-        return ksqldb_container
+        report_file = f'verification_{timestamp}.csv'
+        logger.info(f"Saving output verification to {report_file}")
+        with replacing(report_file) as tmp_file, open(tmp_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=VERIFICATION_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
 
-    def _run_ksqldb_query(self, case: str, ksqldb_container: docker.models.containers.Container):
-        """Run KsqlDB query"""
-        logger.info(f"Running KsqlDB query for case: {case}")
-        
-        cmd = [
-            'ksql',
-            'http://localhost:8088',
-            '--file',
-            f'/home/scripts/{case}.sql'
-        ]
-        
-        try:
-            exit_code, output = ksqldb_container.exec_run(cmd)
-            if exit_code != 0:
-                raise NexmarkTestError(f"KsqlDB query failed with exit code {exit_code}: {output}")
-            logger.info(f"KsqlDB query {case}.sql completed successfully")
-        except Exception as e:
-            logger.error(f"KsqlDB query execution failed: {e}")
-            raise NexmarkTestError(f"KsqlDB query execution failed: {e}")
+    def _completion_fields(self, completion: Optional[Completion], start_time: float) -> Dict:
+        if completion is None:
+            return {}
+        return {
+            'completion_detector': completion.detector,
+            'completion_time': completion.completed_at - start_time,
+            'detection_delay': completion.detection_delay
+        }
 
-    def _read_from_kafka(self, case: str) -> int:
+    def _read_from_kafka(self, case: str, ctx: Optional[JobContext] = None,
+                         timeline: Optional[OutputTimeline] = None,
+                         completion: Optional[Completion] = None) -> int:
         """Read results from Kafka topic"""
-        topic = f'nexmark_{case}'.upper()
+        topic = (ctx or self.default_context()).topic(case)
         logger.info(f"Reading from Kafka topic: {topic}")
-        
-        # Configure consumer to reduce connection issues
-        consumer = KafkaConsumer(
-            topic,
-            bootstrap_servers=self.config.kafka_bootstrap_servers,
-            auto_offset_reset='earliest',
-            enable_auto_commit=False,
-            consumer_timeout_ms=self.config.kafka_timeout * 1000,
-            fetch_min_bytes=1,  # Don't wait for large batches
-            fetch_max_wait_ms=1000,  # Reduce wait time
-            max_poll_records=500,  # Reasonable batch size
-            session_timeout_ms=30000,  # Longer session timeout
-            heartbeat_interval_ms=10000,  # Regular heartbeats
-            request_timeout_ms=40000  # Longer request timeout
-        )
+        # A detected completion bounds the drain, so no idle polls are needed at the end
+        end_offsets = completion.end_offsets if completion is not None else None
         
         try:
-            size = 0
-            empty_polls = 0
-            max_empty_polls = 3  # Allow a few empty polls before giving up
-            
-            while empty_polls < max_empty_polls:
-                message_batch = consumer.poll(timeout_ms=self.config.kafka_timeout * 1000)
-                if message_batch:
-                    for tp, messages in message_batch.items():
-                        size += len(messages)
-                    empty_polls = 0  # Reset counter when we get messages
-                else:
-                    empty_polls += 1
-                    logger.debug(f"Empty poll {empty_polls}/{max_empty_polls}")
+            if self.config.output_drain == 'offsets':
+                size = drain_offsets(self.config.kafka_bootstrap_servers, topic, self.config.kafka_timeout,
+                                     MAX_EMPTY_POLLS, timeline, end_offsets=end_offsets)
+            elif self.config.output_drain == 'fetch':
+                size = drain_fetch(self.config.kafka_bootstrap_servers, topic, self.config.kafka_timeout,
+                                   MAX_EMPTY_POLLS, timeline, max_bytes=self.config.output_fetch_max_bytes,
+                                   end_offsets=end_offsets)
+            else:
+                size = drain_consumer(self.config.kafka_bootstrap_servers, topic, self.config.kafka_timeout,
+                                      MAX_EMPTY_POLLS, timeline, end_offsets=end_offsets)
             
             logger.info(f"Read {size} messages from {topic}")
             return size
         except Exception as e:
             logger.error(f"Failed to read from Kafka: {e}")
             return 0
-        finally:
-            try:
-                consumer.close()
-            except Exception as e:
-                logger.debug(f"Error closing consumer: {e}")
 
-    def save_results(self, results: List[TestResult], stats_file: str, report_file: str):
-        """Save test results and statistics"""
-        logger.info(f"Saving results to {report_file} and stats to {stats_file}")
+    def _result_row(self, result: TestResult) -> Dict:
+        """One report row of a test result"""
+        metrics = asdict(result.metrics) if result.metrics else {}
+        return {
+            **metrics,
+            'case': result.case,
+            'platform': result.platform,
+            'trial': result.trial,
+            'warmup': result.warmup,
+            'execution_time': result.execution_time,
+            'output_size': result.output_size,
+            'error': result.error,
+            'readiness_time': result.readiness_time,
+            'engine_mode': result.engine_mode,
+            'nodes': result.nodes,
+            'startup_time': result.startup_time,
+            'completion_detector': result.completion_detector,
+            'completion_time': result.completion_time,
+            'detection_delay': result.detection_delay,
+            'cpu_seconds': result.cpu_seconds,
+            'peak_memory_bytes': result.peak_memory_bytes
+        }
+
+    def _result_from_row(self, row: Dict) -> TestResult:
+        """Test result of a journaled report row"""
+        metrics = None
+        if all(name in row for name in METRIC_FIELDS):
+            metrics = ThroughputMetrics(**{name: row[name] for name in METRIC_FIELDS})
+        return TestResult(metrics=metrics, **{key: value for key, value in row.items() if key not in METRIC_FIELDS})
+
+    def _publish(self, result: TestResult) -> TestResult:
+        """Checkpoint a finished test result in the run journal and stream it live, when a live sink is running"""
+        row = self._result_row(result)
+        if self.journal is not None:
+            # Stats first, so a journaled result always has its stats committed
+            self.stats_parts.commit(result.case, result.platform, result.trial)
+            if self.engine_parts is not None:
+                self.engine_parts.commit(result.case, result.platform, result.trial)
+            self.journal.record_result(row)
+        if self.live_sink is not None:
+            self.live_sink.send_result(row)
+        return result
+
+    def _run_trials(self, case: str, platform: str, run: Callable[[], TestResult],
+                    reset: Callable[[], None]) -> List[TestResult]:
+        """Run the trials of a pair on the same infrastructure, resetting it in between, until the trial policy is met"""
+        rows = self.journal.trial_rows(case, platform)
+        results = []
+        start = time.time()
+        while not self.trial_policy.done(rows, time.time() - start):
+            if results:
+                reset()
+            trial = len(rows)
+            result = run()
+            result.trial = trial
+            result.warmup = trial < self.trial_policy.warmup
+            for node, usage in (result.node_usage or {}).items():
+                logger.info(f"{case} on {platform} trial {trial}, {node}: {usage['cpu_seconds']:.1f} CPU-seconds, "
+                            f"peak memory {usage['peak_memory_bytes'] / 1024 ** 2:.0f} MiB")
+            rows.append(self._result_row(self._publish(result)))
+            results.append(result)
+        if len(rows) > 1:
+            relative = self.trial_policy.relative_ci(rows)
+            logger.info(f"Finished {len(rows)} trials of {case} on {platform}"
+                        + (f", {self.trial_policy.metric} CI within {relative:.1%} of the median" if relative else ""))
+        self.journal.record_done(case, platform)
+        return results
+
+    def save_results(self, results: List[TestResult], report_file: str, summaries: Optional[List[Dict]] = None):
+        """Save test results, replacing the report file atomically; statistics are written while collecting"""
+        logger.info(f"Saving results to {report_file}")
         
         try:
-            # Save statistics
-            with open(stats_file, 'w') as f:
-                for result in results:
-                    if result.stats:
-                        for stat in result.stats:
-                            f.write(json.dumps(stat) + '\n')
-            
             # Save results
-            with open(report_file, 'w', newline='') as f:
+            with replacing(report_file) as tmp_file, open(tmp_file, 'w', newline='') as f:
                 if results:
-                    writer = csv.DictWriter(f, fieldnames=['case', 'platform', 'execution_time', 'output_size', 'error'])
+                    writer = csv.DictWriter(f, fieldnames=['case', 'platform', 'trial', 'warmup', 'statistic',
+                                                           'execution_time', 'output_size', 'error',
+                                                           'readiness_time', 'engine_mode', 'nodes', 'startup_time',
+                                                           'completion_detector', 'completion_time',
+                                                           'detection_delay', 'cpu_seconds',
+                                                           'peak_memory_bytes'] + METRIC_FIELDS)
                     writer.writeheader()
                     for result in results:
-                        writer.writerow({
-                            'case': result.case,
-                            'platform': result.platform,
-                            'execution_time': result.execution_time,
-                            'output_size': result.output_size,
-                            'error': result.error
-                        })
+                        writer.writerow(self._result_row(result))
+                    # Summary rows carry a statistic of each summarized metric over the measured trials
+                    writer.writerows(summaries or [])
             
             logger.info("Results saved successfully")
             
         except Exception as e:
             logger.error(f"Failed to save results: {e}")
 
-    def run_tests(self, cases: List[str], platforms: List[str], data_size: int, event_rate: int) -> List[TestResult]:
-        """Run the complete test suite"""
-        logger.info(f"Starting tests for cases: {cases}, platforms: {platforms}")
+    def finalize_run(self, timestamp: str):
+        """Rebuild the report and stats files of the run from its journal"""
+        rows = self.journal.result_rows()
+        summaries = summary_rows(rows, self.trial_policy.confidence, self.trial_policy.resamples)
+        self.save_results([self._result_from_row(row) for row in rows], f'report_{timestamp}.csv', summaries)
         
-        results = []
-        now = datetime.now()
-        timestamp = now.strftime("%Y%m%d%H%M%S")
+        extension = STATS_EXTENSIONS[self.config.stats_format]
+        self._merge_parts(self.stats_parts, rows, f'stats_report_{timestamp}.{extension}', 'stats samples')
+        if self.engine_parts is not None:
+            self._merge_parts(self.engine_parts, rows, f'engine_metrics_{timestamp}.{extension}', 'engine metrics samples')
+        
+        if self.config.verify_output:
+            self.verify_outputs(timestamp)
+
+    def _merge_parts(self, parts: CheckpointStatsWriter, rows: List[Dict], path: str, what: str):
+        """Merge the committed files of the journaled trials into one file of the run"""
+        paths = [parts.committed_path(row['case'], row['platform'], row.get('trial', 0)) for row in rows]
+        try:
+            with replacing(path) as tmp_file:
+                samples = merge_stats([part for part in paths if os.path.exists(part)], parts.stats_format, tmp_file,
+                                      parts.fields, parts.labels)
+            logger.info(f"Saved {samples} {what} to {path}")
+        except Exception as e:
+            logger.error(f"Failed to save {what}: {e}")
+
+    def _run_parallel(self, cases: List[str], platforms: List[str], data_size: int, event_rate: int) -> List[TestResult]:
+        """Run (case, platform) jobs concurrently, each pinned to its own CPUs, network, ports and topics"""
+        reserved_cpus = parse_cpuset(self.config.parallel_reserved_cpus)
+        job_cpus = [cpu for cpu in host_cpus() if cpu not in reserved_cpus]
+        job_memory = (host_memory_bytes() - parse_memory(self.config.kafka_memory)
+                      - parse_memory(self.config.parallel_memory_reserve))
+        admission = AdmissionController(job_cpus, job_memory, slots=self.config.parallel_jobs)
+        
+        # Kafka stays off the job CPUs so it cannot steal cycles from the engines
+        self.kafka_cpuset = format_cpuset(reserved_cpus) if reserved_cpus else None
+        self.ensure_shared_input(data_size, event_rate)
+        
+        cores_per_container = cores_for_quota(self.config.cpu_quota_cores)
+        jobs = []
+        for case in cases:
+            for platform in PLATFORMS:
+                if platform not in platforms or self.journal.completed(case, platform):
+                    continue
+                if not get_case(case).supports(platform):
+                    self._unsupported(case, platform)
+                    continue
+                containers, memory = self.platforms[platform].requirements()
+                jobs.append(Job(index=len(jobs), case=case, platform=platform,
+                                cores=containers * cores_per_container, memory=memory))
         
+        logger.info(f"Scheduling {len(jobs)} jobs on cpus {format_cpuset(job_cpus)}, "
+                    f"{self.config.parallel_jobs} at a time")
+        scheduler = ParallelScheduler(admission, max_workers=self.config.parallel_jobs)
+        job_results = scheduler.run(jobs, self._run_job, on_error=self._failed_job)
+        return [result for results in job_results for result in results]
+
+    def _failed_job(self, job: Job, error: Exception) -> List[TestResult]:
+        """Report a job that failed outside of its test, ending its trials"""
+        result = TestResult(case=job.case, platform=job.platform, execution_time=0, output_size=0, error=str(error),
+                            trial=len(self.journal.trial_rows(job.case, job.platform)))
+        self._publish(result)
+        self.journal.record_done(job.case, job.platform)
+        return [result]
+
+    def _clean_job(self, platform: str, ctx: JobContext):
+        """Remove the internal topics and consumer groups a job's engine left in Kafka"""
+        engine = self.platforms[platform]
+        self._delete_kafka_topics(engine.state_topics(ctx), regex=True, ctx=ctx)
+        prefix = engine.consumer_group_prefix(ctx)
+        if prefix:
+            self._delete_consumer_groups(prefix)
+
+    def _run_job(self, job: Job, allocation: Allocation) -> List[TestResult]:
+        """Run one scheduled job on its own network, with Kafka attached as 'kafka'"""
+        ctx = JobContext(
+            job_id=f'j{job.index}',
+            network=f'{self.network_name}_j{job.index}',
+            port_offset=allocation.slot * self.config.parallel_port_stride,
+            cpus=allocation.cpus,
+            cores_per_container=cores_for_quota(self.config.cpu_quota_cores)
+        )
+        
+        network = self.container_manager.create_network(ctx.network, driver="bridge")
         try:
-            for case in cases:
-                logger.info(f"Running test case: {case}")
-                
+            network.connect(self.kafka_container, aliases=['kafka'])
+            # Each test tears down its engine and output topics, only engine state in Kafka is left for the next trial
+            return self._run_trials(job.case, job.platform, lambda: self.test_case(job.case, job.platform, ctx),
+                                    lambda: self._clean_job(job.platform, ctx))
+        finally:
+            self._clean_job(job.platform, ctx)
+            self.container_manager.remove_network(network)
+            shutil.rmtree(os.path.join(self.current_path, '.jobs', ctx.job_id), ignore_errors=True)
+
+    def _run_serial(self, cases: List[str], platforms: List[str], data_size: int, event_rate: int) -> List[TestResult]:
+        """Run cases one after another, each platform in turn"""
+        results = []
+        for case in cases:
+            # Pairs finished before the run was interrupted are not rerun
+            pending = [platform for platform in platforms if not self.journal.completed(case, platform)]
+            if not pending:
+                logger.info(f"Skipping test case {case}, finished in the journaled run")
+                continue
+            logger.info(f"Running test case: {case}")
+            
+            if self.config.shared_input:
+                # Reuse Kafka and the input topics, regenerating only if they changed
+                self.ensure_shared_input(data_size, event_rate)
+            else:
                 # Initialize infrastructure for each case
-                kafka_container = self.initialize_infrastructure(data_size, event_rate)
+                self.initialize_infrastructure(data_size, event_rate)
+            
+            # Trials reuse Kafka, the input and warm engines, removing only per-case state in between
+            reset = lambda: self.cleanup_case(case)
+            try:
+                for platform in PLATFORMS:
+                    if platform not in pending:
+                        continue
+                    if not get_case(case).supports(platform):
+                        results.append(self._unsupported(case, platform))
+                        continue
+                    results += self._run_trials(case, platform, lambda: self.test_case(case, platform), reset)
                 
-                try:
-                    if 'flink' in platforms:
-                        result = self.test_flink(case)
-                        results.append(result)
-                    
-                    if 'timeplus' in platforms:
-                        result = self.test_timeplus(case)
-                        results.append(result)
-                    
-                    if 'ksqldb' in platforms:
-                        result = self.test_ksqldb(case)
-                        results.append(result)
-                    
-                except Exception as e:
-                    logger.error(f"Failed to run test case {case}: {e}")
-                    results.append(TestResult(
-                        case=case,
-                        platform='unknown',
-                        execution_time=0,
-                        output_size=0,
-                        error=str(e)
-                    ))
-                finally:
-                    # Clean up after each case
+            except Exception as e:
+                logger.error(f"Failed to run test case {case}: {e}")
+                results.append(self._publish(TestResult(
+                    case=case,
+                    platform='unknown',
+                    execution_time=0,
+                    output_size=0,
+                    error=str(e)
+                )))
+            finally:
+                # Clean up after each case
+                if self.config.shared_input:
+                    self.cleanup_case(case)
+                else:
                     self.container_manager.cleanup()
+        
+        return results
+
+    def run_tests(self, cases: List[str], platforms: List[str], data_size: int, event_rate: int,
+                  journal: Optional[RunJournal] = None) -> List[TestResult]:
+        """Run the complete test suite, or the unfinished part of a resumed run's journal"""
+        logger.info(f"Starting tests for cases: {cases}, platforms: {platforms}")
+        
+        if journal is None:
+            now = datetime.now()
+            timestamp = now.strftime("%Y%m%d%H%M%S")
+            journal = RunJournal.create(timestamp, {
+                'cases': cases,
+                'platforms': platforms,
+                'data_size': data_size,
+                'event_rate': event_rate,
+                'config': asdict(self.config),
+                'images': dict(self.images)
+            })
+        else:
+            timestamp = journal.run_id
+        self.journal = journal
+        logger.info(f"Journaling results to {journal.directory}, resume with --resume {journal.run_id}")
+        
+        self.stats_parts = CheckpointStatsWriter(journal.stats_dir, self.config.stats_format)
+        self.stats_writer = self.stats_parts
+        if self.config.engine_metrics_enabled:
+            self.engine_parts = CheckpointStatsWriter(journal.stats_dir, self.config.stats_format, ENGINE_METRIC_FIELDS,
+                                                      ENGINE_LABEL_FIELDS, prefix='engine_')
+        if self.config.live_sink_enabled:
+            self.live_sink = LiveSink(
+                TimeplusHttp(timeplus_host, timeplus_port, timeplus_user, timeplus_password, pool_size=1, retries=2),
+                timestamp,
+                spool_path=f'live_spool_{timestamp}.jsonl',
+                queue_size=self.config.live_sink_queue_size,
+                batch_rows=self.config.live_sink_batch_rows,
+                flush_interval=self.config.live_sink_flush_interval,
+                attempt=journal.attempt
+            )
+            self.live_sink.start()
+            self.stats_writer = TeeStatsWriter(self.stats_parts, self.live_sink)
+        
+        try:
+            results = [self._result_from_row(row) for row in journal.result_rows()]
+            if results:
+                logger.info(f"Resuming run {timestamp} with {len(results)} journaled results")
+            if self.config.parallel_jobs > 1:
+                results += self._run_parallel(cases, platforms, data_size, event_rate)
+            else:
+                results += self._run_serial(cases, platforms, data_size, event_rate)
             
-            # Save results
-            stats_file = f'stats_report_{timestamp}.json'
-            report_file = f'report_{timestamp}.csv'
-            self.save_results(results, stats_file, report_file)
+            waited = sum(wait.duration for wait in self.readiness.waits)
+            logger.info(f"Readiness waits: {len(self.readiness.waits)} totalling {waited:.2f}s")
             
             return results
             
@@ -1057,7 +1711,155 @@ class NexmarkBenchmark:
             logger.error(f"Test suite failed: {e}")
             raise
         finally:
+            self.input_dataset = None
+            self.warm_pool.clear()
+            self._close_sql_sessions()
             self.container_manager.cleanup()
+            # Closing the tee also drains the live sink
+            self.stats_writer.close()
+            if self.engine_parts is not None:
+                self.engine_parts.close()
+            # Reports are rebuilt from the journal, also when the run was interrupted
+            self.finalize_run(timestamp)
+            journal.close()
+            self.stats_writer = None
+            self.stats_parts = None
+            self.engine_parts = None
+            self.live_sink = None
+            self.journal = None
+
+    def _start_query(self, case: str, platform: str, ctx: JobContext) -> List[docker.models.containers.Container]:
+        """Start a cold engine and submit the case's query, returning the engine containers"""
+        if not get_case(case).supports(platform):
+            raise NexmarkTestError(f"Unsupported case: {case}")
+        containers = self.platforms[platform].start(case, ctx)
+        self._submit_query(case, platform, ctx, containers)
+        return containers
+
+    def _input_lag(self, platform: str, ctx: JobContext,
+                   containers: List[docker.models.containers.Container]) -> Callable[[], Optional[float]]:
+        """Function returning the input records the engine has not consumed yet, from the engine's own progress"""
+        engine = self.platforms[platform]
+        if not engine.has_progress():
+            raise NexmarkTestError(f"No input lag available for {platform}, set timeplus_progress_query")
+        return lambda: engine.pending_records(ctx, containers)
+
+    def _input_record_count(self) -> int:
+        """Records appended to the input topics so far"""
+        return sum(end for partitions in self._get_topic_offsets(INPUT_TOPICS).values() for _, end in partitions.values())
+
+    def _paced_input(self) -> Callable[[int], Callable[[], None]]:
+        """Function starting a search's input at a rate in the background, returning a function that stops it.
+
+        The input is always the native generator, paced in 10 ms slices: the container generator neither paces
+        below a second nor continues a sequence. Each probe continues the event ids after the previous probe's,
+        with event times from the wall clock, so the query never sees an id or an event time twice.
+        """
+        if self.config.generator != 'native':
+            logger.info("Throughput search produces its input with the native generator")
+        started = time.time()
+        base_time_ms = self.config.generator_base_time_ms or int(started * 1000)
+        next_event = 0
+
+        def start_input(rate: int) -> Callable[[], None]:
+            nonlocal next_event
+            # Enough events to outlast a probe, the generator is stopped when the probe ends
+            max_events = int(rate * (self.config.search_warmup_seconds + self.config.search_step_seconds) * 2)
+            spec = self._generator_spec(max_events, rate, paced=True, first_event=next_event,
+                                        base_time_ms=base_time_ms + int((time.time() - started) * 1000))
+            # The probe stops the generator anywhere in the spec, the next one starts after all its ids
+            next_event = spec.next_event
+            return start_generator(spec, self.config.kafka_bootstrap_servers, processes=self.config.generator_processes)
+
+        return start_input
+
+    def _search_pair(self, case: str, platform: str) -> List[Dict]:
+        """Search the highest input rate one (case, platform) sustains, one report row per probe"""
+        logger.info(f"Searching the sustainable throughput of {case} on {platform}")
+        ctx = self.default_context()
+        labels = {'case': case, 'platform': platform, 'cpu_quota_cores': self.config.cpu_quota_cores}
+        
+        # Input starts empty and is produced while the query runs
+        self.initialize_infrastructure(0, 0, load_input=False)
+        try:
+            self._init_kafka_topics([ctx.topic(case)], ctx=ctx, configs=OUTPUT_TOPIC_CONFIGS)
+            containers = self._start_query(case, platform, ctx)
+            probe = RateProbe(
+                start_input=self._paced_input(),
+                input_offset=self._input_record_count,
+                lag=self._input_lag(platform, ctx, containers),
+                duration=self.config.search_step_seconds,
+                warmup=self.config.search_warmup_seconds,
+                sample_interval=self.config.search_sample_interval,
+                growth_tolerance=self.config.search_lag_growth_tolerance,
+                max_lag_seconds=self.config.search_max_lag_seconds,
+                drain_timeout=self.config.search_drain_timeout
+            )
+            search = RateSearch(self.config.search_min_rate, self.config.search_max_rate,
+                                self.config.search_precision, self.config.search_max_steps)
+            while not search.done:
+                search.record(probe.run(search.next_rate()))
+            
+            logger.info(f"Sustainable throughput of {case} on {platform} with {self.config.cpu_quota_cores} cores: "
+                        f"{search.best if search.best is not None else 'below ' + str(self.config.search_min_rate)} events/s")
+            return [{**labels, **asdict(step), 'step': index, 'sustainable_rate': search.best}
+                    for index, step in enumerate(search.steps)]
+        except Exception as e:
+            logger.error(f"Throughput search failed for {case} on {platform}: {e}")
+            return [{**labels, 'error': str(e)}]
+        finally:
+            self.container_manager.cleanup()
+
+    def search_throughput(self, cases: List[str], platforms: List[str]) -> List[Dict]:
+        """Search the sustainable input rate of every (case, platform), writing throughput_<timestamp>.csv"""
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        report_file = f'throughput_{timestamp}.csv'
+        rows = []
+        try:
+            for case in cases:
+                for platform in PLATFORMS:
+                    if platform in platforms:
+                        rows += self._search_pair(case, platform)
+            return rows
+        finally:
+            self._close_sql_sessions()
+            self.container_manager.cleanup()
+            logger.info(f"Saving throughput search results to {report_file}")
+            with replacing(report_file) as tmp_file, open(tmp_file, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=SEARCH_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+
+    def scaling_sweep(self, cases: List[str], platforms: List[str], data_size: int, event_rate: int,
+                      points: List[ScalingPoint]) -> List[Dict]:
+        """Run the cases at every (partitions, cores) point, writing speedup and efficiency to scaling_<timestamp>.csv"""
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        report_file = f'scaling_{timestamp}.csv'
+        rows = []
+        for point in points:
+            logger.info(f"Scaling point {point.label}: {point.partitions} partitions, {point.cores} cores")
+            # Each point is a run of its own, on a Kafka started with the point's partitions and cores
+            self.config.kafka_partitions = point.partitions
+            self.config.cpu_quota_cores = point.cores
+            run_id = f'{timestamp}_{point.label}'
+            journal = RunJournal.create(run_id, {
+                'cases': cases,
+                'platforms': platforms,
+                'data_size': data_size,
+                'event_rate': event_rate,
+                'config': asdict(self.config),
+                'images': dict(self.images)
+            })
+            results = self.run_tests(cases, platforms, data_size, event_rate, journal)
+            rows = add_speedup(rows + point_rows(point, run_id, [self._result_row(result) for result in results]))
+            
+            # Rewritten after every point, so an interrupted sweep keeps the finished points
+            with replacing(report_file) as tmp_file, open(tmp_file, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=SCALING_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+        logger.info(f"Scaling results saved to {report_file}")
+        return rows
 
 @click.command()
 @click.option('--cases', default='base', help='Test cases to run (comma-separated)')
@@ -1067,7 +1869,52 @@ class NexmarkBenchmark:
 @click.option('--config-file', help='Path to performance configuration file')
 @click.option('--cpu-cores', default=2.0, help='Number of CPU cores to allocate')
 @click.option('--memory-limit', default='4g', help='Memory limit for containers')
-def main(cases, platforms, data_size, event_rate, config_file, cpu_cores, memory_limit):
+@click.option('--shared-input', is_flag=True, help='Generate input data once and reuse it across cases')
+@click.option('--generator', type=click.Choice(['container', 'native']),
+              help='Input generator: the nexmark-bench container or the in-process native generator')
+@click.option('--dataset-cache', is_flag=True, help='Restore input data from the on-disk dataset cache when available')
+@click.option('--parallel-jobs', default=1, help='Number of (case, platform) jobs to run at once on isolated CPU sets')
+@click.option('--warm-engines', is_flag=True, help='Keep engine servers running across cases (implies --shared-input)')
+@click.option('--output-drain', type=click.Choice(['consumer', 'fetch', 'offsets']),
+              help='How output topics are drained: consumer, fetch (per-partition fetchers) or offsets (count only)')
+@click.option('--completion', type=click.Choice(['idle', 'watermark', 'engine', 'expected']),
+              help='How query completion is detected: idle polls, a stable output watermark, engine progress '
+                   'or an expected output count')
+@click.option('--completion-stable-ms', type=int, help='Milliseconds the output watermark must be stable for')
+@click.option('--stats-backend', type=click.Choice(['docker', 'cgroup']),
+              help='Read container stats from the Docker stats API or directly from cgroup v2 files')
+@click.option('--stats-interval', type=float, help='Seconds between container stats samples')
+@click.option('--stats-format', type=click.Choice(['parquet', 'json']),
+              help='Container stats file format: parquet (columnar) or json (legacy JSON lines)')
+@click.option('--engine-metrics', is_flag=True,
+              help='Scrape the engines\' own metrics (Flink REST, Timeplus system tables, ksqlDB) next to the container stats')
+@click.option('--live', is_flag=True, help='Stream stats and results to the Timeplus report streams during the run')
+@click.option('--trials', type=int, help='Measured trials per (case, platform), the minimum with --trial-ci-target')
+@click.option('--warmup-trials', type=int, help='Trials run before the measured ones, reported but not summarized')
+@click.option('--trial-ci-target', type=float,
+              help='Repeat trials until the median CI half-width of the throughput is within this fraction of the median')
+@click.option('--trial-time-budget', type=float, help='Seconds of trials per (case, platform) with --trial-ci-target')
+@click.option('--search-throughput', is_flag=True,
+              help='Search the highest input rate each (case, platform) sustains instead of timing a fixed dataset')
+@click.option('--search-min-rate', type=int, help='Lowest input rate of the throughput search, in events/s')
+@click.option('--search-max-rate', type=int, help='Highest input rate of the throughput search, in events/s')
+@click.option('--scaling-sweep', is_flag=True,
+              help='Run the cases at every combination of --scaling-partitions and --scaling-cores')
+@click.option('--scaling-partitions', help='Partition counts of the scaling sweep (comma-separated)')
+@click.option('--scaling-cores', help='CPU cores of the scaling sweep (comma-separated)')
+@click.option('--pull', 'pull_policy', type=click.Choice(['missing', 'always']),
+              help='Pull only images missing locally, or pull every image tag again before the run')
+@click.option('--query-submission', type=click.Choice(['session', 'cli']),
+              help='Submit queries over one SQL session per engine, or start a SQL client per query')
+@click.option('--verify', 'verify_output', is_flag=True,
+              help='Verify that the platforms of each case produce the same output, after the measured run')
+@click.option('--resume', 'resume_run', metavar='RUN_ID',
+              help='Resume an interrupted run from its journal, skipping finished (case, platform) pairs')
+def main(cases, platforms, data_size, event_rate, config_file, cpu_cores, memory_limit, shared_input, generator,
+         dataset_cache, parallel_jobs, warm_engines, output_drain, completion, completion_stable_ms, stats_backend, stats_interval,
+         stats_format, engine_metrics, live, trials, warmup_trials, trial_ci_target, trial_time_budget,
+         search_throughput, search_min_rate, search_max_rate, scaling_sweep, scaling_partitions, scaling_cores,
+         pull_policy, query_submission, verify_output, resume_run):
     """Nexmark performance benchmark tool"""
     
     # Load configuration
@@ -1086,32 +1933,162 @@ def main(cases, platforms, data_size, event_rate, config_file, cpu_cores, memory
     
     # Override with command line arguments
     config.cpu_quota_cores = cpu_cores
-    config.flink_jobmanager_memory = memory_limit
-    config.flink_taskmanager_memory = memory_limit
-    config.timeplus_memory = memory_limit
-    config.ksqldb_memory = memory_limit
+    for platform in PLATFORMS.values():
+        for setting in platform.memory_settings:
+            setattr(config, setting, memory_limit)
+    if shared_input:
+        config.shared_input = True
+    if generator:
+        config.generator = generator
+    if dataset_cache:
+        config.dataset_cache_enabled = True
+    if parallel_jobs > 1:
+        config.parallel_jobs = parallel_jobs
+    if warm_engines:
+        config.warm_engines = True
+    if output_drain:
+        config.output_drain = output_drain
+    if completion:
+        config.completion_detector = completion
+    if completion_stable_ms:
+        config.completion_stable_ms = completion_stable_ms
+    if stats_backend:
+        config.stats_backend = stats_backend
+    if stats_interval:
+        config.stats_collection_interval = stats_interval
+    if stats_format:
+        config.stats_format = stats_format
+    if engine_metrics:
+        config.engine_metrics_enabled = True
+    if live:
+        config.live_sink_enabled = True
+    if trials:
+        config.trials = trials
+    if warmup_trials:
+        config.warmup_trials = warmup_trials
+    if trial_ci_target:
+        config.trial_ci_target = trial_ci_target
+    if trial_time_budget:
+        config.trial_time_budget = trial_time_budget
+    if search_min_rate:
+        config.search_min_rate = search_min_rate
+    if search_max_rate:
+        config.search_max_rate = search_max_rate
+    if pull_policy:
+        config.image_pull_policy = pull_policy
+    if query_submission:
+        config.query_submission = query_submission
+    if verify_output:
+        config.verify_output = True
+    if scaling_partitions:
+        config.scaling_partitions = [int(p) for p in scaling_partitions.split(',')]
+    if scaling_cores:
+        config.scaling_cores = [float(c) for c in scaling_cores.split(',')]
+    if config.warm_engines and not config.shared_input:
+        # Warm engines need Kafka to outlive the case
+        logger.info("Warm engines enabled, enabling shared input")
+        config.shared_input = True
     
     # Parse input arguments
     case_list = [case.strip() for case in cases.split(',')]
     platform_list = [platform.strip() for platform in platforms.split(',')]
+    unknown = [platform for platform in platform_list if platform not in PLATFORMS]
+    if unknown:
+        logger.error(f"Unknown platforms: {unknown}, available: {list(PLATFORMS)}")
+        sys.exit(1)
+    try:
+        for case in case_list:
+            get_case(case)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    
+    journal = None
+    if resume_run:
+        # A resumed run keeps the parameters and configuration it was started with
+        try:
+            journal = RunJournal.resume(resume_run)
+        except Exception as e:
+            logger.error(f"Failed to resume run {resume_run}: {e}")
+            sys.exit(1)
+        case_list = journal.params['cases']
+        platform_list = journal.params['platforms']
+        data_size = journal.params['data_size']
+        event_rate = journal.params['event_rate']
+        for key, value in journal.params['config'].items():
+            if hasattr(config, key):
+                setattr(config, key, value)
+        if not config.dataset_cache_enabled:
+            logger.info("Resuming, enabling the dataset cache to reuse the input data")
+            config.dataset_cache_enabled = True
     
     logger.info(f"Configuration: {asdict(config)}")
     
     # Run tests
     benchmark = NexmarkBenchmark(config)
+    if journal is not None:
+        benchmark.images = journal.params.get('images', {})
     
     try:
-        results = benchmark.run_tests(case_list, platform_list, data_size, event_rate)
+        # Every image is present and pinned before anything starts, so no pull lands in a measured step
+        benchmark.preflight_images(platform_list)
+        
+        if search_throughput:
+            rows = benchmark.search_throughput(case_list, platform_list)
+            
+            print("\n" + "="*60)
+            print("SUSTAINABLE THROUGHPUT")
+            print("="*60)
+            print(f"{'Case':<10} {'Platform':<10} {'Cores':>5} {'Events/s':>10} {'Probes':>6} {'Status'}")
+            print("-" * 52)
+            pairs = {}
+            for row in rows:
+                pairs.setdefault((row['case'], row['platform']), []).append(row)
+            for (case, platform), pair_rows in pairs.items():
+                last = pair_rows[-1]
+                rate = last.get('sustainable_rate')
+                status = "FAILED" if last.get('error') else ("LIMITED" if last.get('generator_limited') else "DONE")
+                print(f"{case:<10} {platform:<10} {last['cpu_quota_cores']:>5} {rate if rate is not None else '-':>10} "
+                      f"{len(pair_rows) if not last.get('error') else 0:>6} {status}")
+            if any(row.get('error') for row in rows):
+                sys.exit(1)
+            return
+        
+        if scaling_sweep:
+            points = scaling_grid(config.scaling_partitions, config.scaling_cores)
+            rows = benchmark.scaling_sweep(case_list, platform_list, data_size, event_rate, points)
+            
+            print("\n" + "="*60)
+            print("SCALING SWEEP")
+            print("="*60)
+            print(f"{'Case':<10} {'Platform':<10} {'Parts':>5} {'Cores':>5} {'Events/s':>10} {'Speedup':>7} "
+                  f"{'Effic.':>6} {'Status'}")
+            print("-" * 66)
+            for row in rows:
+                rate = row['input_events_per_sec']
+                speedup = row.get('speedup')
+                efficiency = row.get('efficiency')
+                print(f"{row['case']:<10} {row['platform']:<10} {row['partitions']:>5} {row['cpu_quota_cores']:>5} "
+                      f"{f'{rate:.0f}' if rate is not None else '-':>10} "
+                      f"{f'{speedup:.2f}' if speedup is not None else '-':>7} "
+                      f"{f'{efficiency:.2f}' if efficiency is not None else '-':>6} "
+                      f"{'FAILED' if row['error'] else 'DONE'}")
+            if any(row['error'] for row in rows):
+                sys.exit(1)
+            return
+        
+        results = benchmark.run_tests(case_list, platform_list, data_size, event_rate, journal)
         
         # Print summary
         print("\n" + "="*60)
         print("TEST RESULTS SUMMARY")
         print("="*60)
-        print(f"{'Case':<10} {'Platform':<10} {'Time':>9} {'Output_Size':>11} {'Status'}")
-        print("-" * 50)
+        print(f"{'Case':<10} {'Platform':<10} {'Trial':>5} {'Time':>9} {'Output_Size':>11} {'Engine':<6} {'Status'}")
+        print("-" * 63)
         for result in results:
             status = "PASSED" if result.error is None else "FAILED"
-            print(f"{result.case:<10} {result.platform:<10} {result.execution_time:>8.2f}s {result.output_size:>11} {status}")    
+            trial = f"w{result.trial}" if result.warmup else str(result.trial)
+            print(f"{result.case:<10} {result.platform:<10} {trial:>5} {result.execution_time:>8.2f}s {result.output_size:>11} {result.engine_mode:<6} {status}")    
         if any(result.error for result in results):
             sys.exit(1)
             
@@ -0,0 +1,538 @@
+import os
+import json
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import click
+import numpy as np
+from kafka import KafkaConsumer, KafkaProducer, TopicPartition
+
+logger = logging.getLogger(__name__)
+
+# Nexmark event mix and id spaces, as in the Beam Nexmark generator
+PERSON_PROPORTION = 1
+AUCTION_PROPORTION = 3
+BID_PROPORTION = 46
+TOTAL_PROPORTION = PERSON_PROPORTION + AUCTION_PROPORTION + BID_PROPORTION
+FIRST_PERSON_ID = 1000
+FIRST_AUCTION_ID = 1000
+FIRST_CATEGORY_ID = 10
+NUM_CATEGORIES = 5
+PERSON_ID_LEAD = 10
+AUCTION_ID_LEAD = 10
+CHANNELS_NUMBER = 10000
+HOT_CHANNELS = ['Google', 'Facebook', 'Baidu', 'Apple']
+FIRST_NAMES = ['Peter', 'Paul', 'Luke', 'John', 'Saul', 'Vicky', 'Kate', 'Julie', 'Sarah', 'Deiter', 'Walter']
+LAST_NAMES = ['Shultz', 'Abrams', 'Spencer', 'White', 'Bartels', 'Walton', 'Smith', 'Jones', 'Noris']
+US_STATES = ['AZ', 'CA', 'ID', 'OR', 'WA', 'WY']
+US_CITIES = ['Phoenix', 'Los Angeles', 'San Francisco', 'Boise', 'Portland', 'Bend', 'Redmond', 'Seattle', 'Kent',
+             'Cheyenne']
+
+TOPICS = {'person': 'nexmark-person', 'auction': 'nexmark-auction', 'bid': 'nexmark-bid'}
+
+# Events are generated in fixed chunks of ids, each with its own random stream and written to partition
+# chunk % partitions, so the records of a seed do not depend on how chunks are spread over processes
+CHUNK_EVENTS = 1 << 16
+# Paced production releases the events of this many seconds at once
+PACE_SECONDS = 0.01
+
+@dataclass(frozen=True)
+class GeneratorSpec:
+    """Everything that determines the generated events: the same spec always produces the same records"""
+    events: int
+    event_rate: int  # events per second of event time, and of wall time when paced
+    seed: int = 0
+    base_time_ms: int = 0  # event time of the first event
+    first_event: int = 0  # id of the first event, a multiple of CHUNK_EVENTS, to continue an earlier spec's ids
+    active_people: int = 1000
+    in_flight_auctions: int = 100
+    hot_auction_ratio: int = 2  # all but 1 in this many bids go to a hot auction
+    hot_bidder_ratio: int = 4
+    hot_seller_ratio: int = 4
+    hot_channel_ratio: int = 100
+    avg_person_bytes: int = 200
+    avg_auction_bytes: int = 500
+    avg_bid_bytes: int = 100
+    out_of_order_group: int = 1  # events are emitted shuffled within groups of this many
+    paced: bool = False  # produce at event_rate instead of as fast as possible
+
+    def __post_init__(self):
+        if self.first_event % CHUNK_EVENTS:
+            raise ValueError(f"first_event {self.first_event} is not a multiple of {CHUNK_EVENTS}")
+
+    @property
+    def chunks(self) -> int:
+        return -(-self.events // CHUNK_EVENTS)
+
+    @property
+    def next_event(self) -> int:
+        """First event id a spec continuing this one can start at"""
+        return self.first_event + self.chunks * CHUNK_EVENTS
+
+class Column:
+    """Byte strings of a batch of records, as the rows of a byte matrix and a mask of the bytes each string uses"""
+
+    def __init__(self, text: np.ndarray, mask: np.ndarray, lengths: np.ndarray):
+        self.text = text  # uint8, one row per record
+        self.mask = mask
+        self.lengths = lengths  # bytes in the mask of each row
+
+    @classmethod
+    def left_aligned(cls, text: np.ndarray, lengths: np.ndarray) -> 'Column':
+        return cls(text, np.arange(text.shape[1]) < lengths[:, None], lengths)
+
+    @classmethod
+    def full(cls, text: np.ndarray) -> 'Column':
+        return cls(text, np.ones(text.shape, dtype=bool), np.full(len(text), text.shape[1], dtype=np.int64))
+
+    def where(self, mask: np.ndarray) -> 'Column':
+        """The strings of the records in mask, empty for the others"""
+        return Column(self.text, self.mask & mask[:, None], self.lengths * mask)
+
+class EncodedBatch:
+    """JSON records of one topic, encoded into one preallocated buffer with record boundaries in an offsets array.
+
+    The parts are laid side by side in a preallocated byte matrix with a row per record, whose masked bytes
+    are then taken into the buffer in one pass.
+    """
+
+    def __init__(self, parts: List, n: int):
+        widths = [len(part) if isinstance(part, bytes) else part.text.shape[1] for part in parts]
+        text = np.empty((n, sum(widths)), dtype=np.uint8)
+        mask = np.ones((n, sum(widths)), dtype=bool)
+        column = 0
+        for part, width in zip(parts, widths):
+            if isinstance(part, bytes):
+                text[:, column:column + width] = np.frombuffer(part, dtype=np.uint8)
+            else:
+                text[:, column:column + width] = part.text
+                mask[:, column:column + width] = part.mask
+            column += width
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(record_lengths(parts, n), out=self.offsets[1:])
+        self.data = text[mask].tobytes()
+        self.positions = np.arange(n)  # positions of the records' events in their chunk, set by generate_chunk
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """Records of the events at chunk positions start to end"""
+        first, last = np.searchsorted(self.positions, [start, end])
+        return int(first), int(last)
+
+    def records(self, first: int = 0, last: Optional[int] = None):
+        """Record values, sliced from the buffer"""
+        data = self.data
+        offsets = self.offsets[first:len(self) + 1 if last is None else last + 1].tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end]
+
+def record_lengths(parts: List, n: int) -> np.ndarray:
+    lengths = np.zeros(n, dtype=np.int64)
+    for part in parts:
+        lengths += len(part) if isinstance(part, bytes) else part.lengths
+    return lengths
+
+def last_base0_person(ids: np.ndarray) -> np.ndarray:
+    """Base-0 id of the last person created at or before each event"""
+    epoch, offset = np.divmod(ids, TOTAL_PROPORTION)
+    return epoch * PERSON_PROPORTION + np.minimum(offset, PERSON_PROPORTION - 1)
+
+def last_base0_auction(ids: np.ndarray) -> np.ndarray:
+    """Base-0 id of the last auction created at or before each event"""
+    epoch, offset = np.divmod(ids, TOTAL_PROPORTION)
+    before = offset < PERSON_PROPORTION
+    epoch = np.where(before, epoch - 1, epoch)
+    offset = np.where(before | (offset >= PERSON_PROPORTION + AUCTION_PROPORTION),
+                      AUCTION_PROPORTION - 1, offset - PERSON_PROPORTION)
+    return np.maximum(epoch * AUCTION_PROPORTION + offset, 0)
+
+def next_base0_person(spec: GeneratorSpec, ids: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """A random recently created person, or one a little ahead of the last"""
+    people = last_base0_person(ids) + 1
+    active = np.minimum(people, spec.active_people)
+    return people - active + rng.integers(0, active + PERSON_ID_LEAD)
+
+def next_base0_auction(spec: GeneratorSpec, ids: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """A random in-flight auction, or one a little ahead of the last"""
+    last = last_base0_auction(ids)
+    first = np.maximum(last - spec.in_flight_auctions, 0)
+    return first + rng.integers(0, last - first + 1 + AUCTION_ID_LEAD)
+
+def hot_or(ratio: int, hot: np.ndarray, other: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Pick the hot id for all but one in ratio events"""
+    return np.where(rng.integers(0, ratio, len(hot)) > 0, hot, other)
+
+def next_price(rng: np.random.Generator, n: int) -> np.ndarray:
+    return np.round(10.0 ** (rng.random(n) * 6.0) * 100.0).astype(np.int64)
+
+def letters(rng: np.random.Generator, lengths: np.ndarray) -> Column:
+    """Random lowercase strings of the given lengths, cut from one random buffer"""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    column = Column.left_aligned(np.empty((len(lengths), int(lengths.max(initial=0))), dtype=np.uint8), lengths)
+    column.text[column.mask] = rng.integers(97, 123, int(lengths.sum()), dtype=np.uint8)
+    return column
+
+def random_strings(rng: np.random.Generator, n: int, max_length: int) -> Column:
+    return letters(rng, 3 + rng.integers(0, max(1, max_length - 3), n))
+
+def fixed(values: np.ndarray) -> Column:
+    """Column of a fixed-width bytes array, whose strings are padded with NULs"""
+    text = np.ascontiguousarray(values).view(np.uint8).reshape(len(values), values.dtype.itemsize)
+    mask = text != 0
+    return Column(text, mask, np.count_nonzero(mask, axis=1))
+
+def constant(value: bytes, n: int) -> Column:
+    return Column.full(np.broadcast_to(np.frombuffer(value, dtype=np.uint8), (n, len(value))))
+
+def integers(values: np.ndarray) -> Column:
+    """Decimal strings of non-negative integers"""
+    values = np.asarray(values, dtype=np.int64)
+    width = len(str(int(values.max()))) if len(values) else 1
+    lengths = np.ones(len(values), dtype=np.int64)
+    for power in range(1, width):
+        lengths += values >= 10 ** power
+    # Right-aligned, the most significant digit first
+    return Column(digits(values, width)[:, ::-1], np.arange(width) >= width - lengths[:, None], lengths)
+
+def choice_of(values: List[str], indices: np.ndarray) -> Column:
+    return fixed(np.array(values, dtype='S')[indices])
+
+def choice(rng: np.random.Generator, values: List[str], n: int) -> Column:
+    return choice_of(values, rng.integers(0, len(values), n))
+
+def format_times(timestamps_ms: np.ndarray) -> Column:
+    """'YYYY-MM-DD HH:MM:SS.mmm' strings, the format the engines' JSON timestamps expect"""
+    n = len(timestamps_ms)
+    days, millis = np.divmod(timestamps_ms, 86400000)
+    # A chunk spans few days, only their dates are formatted one by one
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    dates = np.frombuffer(''.join(np.datetime_as_string(unique_days.astype('datetime64[D]'))).encode('ascii'),
+                          dtype=np.uint8).reshape(-1, 10)
+    text = np.empty((n, 23), dtype=np.uint8)
+    text[:, :10] = dates[day_index.reshape(-1)]
+    text[:, 10:] = np.frombuffer(b' 00:00:00.000', dtype=np.uint8)
+    for column, value in ((11, millis // 3600000), (14, millis // 60000 % 60), (17, millis // 1000 % 60)):
+        text[:, column:column + 2] = digits(value, 2)[:, ::-1]
+    text[:, 20:23] = digits(millis % 1000, 3)[:, ::-1]
+    return Column.full(text)
+
+def digits(values: np.ndarray, width: int) -> np.ndarray:
+    """ASCII digits of each value, the least significant first, as rows of width bytes"""
+    text = np.empty((len(values), width), dtype=np.uint8)
+    # Division by a scalar, which numpy does without a hardware divide
+    values = np.array(values, dtype=np.int64)
+    for column in range(width):
+        values, text[:, column] = np.divmod(values, 10)
+    text += ord('0')
+    return text
+
+def credit_cards(groups: np.ndarray) -> Column:
+    """'%04d %04d %04d %04d' of each row of four groups"""
+    n = len(groups)
+    text = np.full((n, 4, 5), ord(' '), dtype=np.uint8)
+    text[:, :, :4] = digits(groups.reshape(-1), 4)[:, ::-1].reshape(n, 4, 4)
+    return Column.full(text.reshape(n, 20)[:, :19])
+
+def reversed_numbers(values: np.ndarray, width: int) -> Column:
+    """str(value)[::-1] of each value below 10 ** width"""
+    return Column.left_aligned(digits(values, width), integers(values).lengths)
+
+def with_extra(head: List, n: int, avg_bytes: int, rng: np.random.Generator) -> EncodedBatch:
+    """Close each record with an 'extra' payload bringing the average record size to avg_bytes"""
+    sizes = record_lengths(head, n) + 2
+    desired = np.maximum(avg_bytes - sizes, 0)
+    delta = np.round(desired * 0.2).astype(np.int64)
+    lengths = desired - delta + rng.integers(0, 2 * delta + 1)
+    return EncodedBatch(head + [letters(rng, lengths), b'"}'], n)
+
+def persons(spec: GeneratorSpec, ids: np.ndarray, timestamps: np.ndarray, rng: np.random.Generator) -> EncodedBatch:
+    n = len(ids)
+    first_names, last_names = choice(rng, FIRST_NAMES, n), choice(rng, LAST_NAMES, n)
+    users, domains = random_strings(rng, n, 7), random_strings(rng, n, 5)
+    cards = credit_cards(rng.integers(0, 10000, (n, 4)))
+    head = [b'{"id":', integers(FIRST_PERSON_ID + last_base0_person(ids)), b',"name":"', first_names, b' ', last_names,
+            b'","emailAddress":"', users, b'@', domains, b'.com","creditCard":"', cards,
+            b'","city":"', choice(rng, US_CITIES, n), b'","state":"', choice(rng, US_STATES, n),
+            b'","date_time":"', format_times(timestamps), b'","extra":"']
+    return with_extra(head, n, spec.avg_person_bytes, rng)
+
+def auctions(spec: GeneratorSpec, ids: np.ndarray, timestamps: np.ndarray, rng: np.random.Generator) -> EncodedBatch:
+    n = len(ids)
+    initial_bids = next_price(rng, n)
+    reserves = initial_bids + next_price(rng, n)
+    # Auctions last up to twice the time it takes to create in_flight_auctions more auctions
+    horizon_ms = spec.in_flight_auctions * TOTAL_PROPORTION // AUCTION_PROPORTION * 1000 // spec.event_rate
+    expires = timestamps + 1 + rng.integers(0, max(horizon_ms * 2, 1), n)
+    hot_sellers = last_base0_person(ids) // spec.hot_seller_ratio * spec.hot_seller_ratio
+    sellers = FIRST_PERSON_ID + hot_or(spec.hot_seller_ratio, hot_sellers, next_base0_person(spec, ids, rng), rng)
+    categories = FIRST_CATEGORY_ID + rng.integers(0, NUM_CATEGORIES, n)
+    head = [b'{"id":', integers(FIRST_AUCTION_ID + last_base0_auction(ids)),
+            b',"itemName":"', random_strings(rng, n, 20), b'","description":"', random_strings(rng, n, 100),
+            b'","initialBid":', integers(initial_bids), b',"reserve":', integers(reserves),
+            b',"date_time":"', format_times(timestamps), b'","expires":"', format_times(expires),
+            b'","seller":', integers(sellers), b',"category":', integers(categories), b',"extra":"']
+    return with_extra(head, n, spec.avg_auction_bytes, rng)
+
+def channel_urls(rng: np.random.Generator, n: int, hot_ratio: int) -> Tuple[List, List]:
+    """Mostly one of the hot channels, otherwise one of CHANNELS_NUMBER channels identified in the URL"""
+    paths = [random_strings(rng, n, 5), random_strings(rng, n, 5), random_strings(rng, n, 5)]
+    hot = rng.integers(0, hot_ratio, n) > 0
+    hot_index = rng.integers(0, len(HOT_CHANNELS), n)
+    channel_number = rng.integers(0, CHANNELS_NUMBER, n)
+    other = ~hot
+    channels = [choice_of(HOT_CHANNELS, hot_index).where(hot), constant(b'channel-', n).where(other),
+                integers(channel_number).where(other)]
+    urls = [b'https://www.nexmark.com/', paths[0], b'/', paths[1], b'/', paths[2], b'/item.htm?query=1',
+            constant(b'&channel_id=', n).where(other),
+            reversed_numbers(channel_number, len(str(CHANNELS_NUMBER))).where(other)]
+    return channels, urls
+
+def bids(spec: GeneratorSpec, ids: np.ndarray, timestamps: np.ndarray, rng: np.random.Generator) -> EncodedBatch:
+    n = len(ids)
+    hot_auctions = last_base0_auction(ids) // spec.hot_auction_ratio * spec.hot_auction_ratio
+    auction_ids = FIRST_AUCTION_ID + hot_or(spec.hot_auction_ratio, hot_auctions,
+                                            next_base0_auction(spec, ids, rng), rng)
+    hot_bidders = last_base0_person(ids) // spec.hot_bidder_ratio * spec.hot_bidder_ratio + 1
+    bidders = FIRST_PERSON_ID + hot_or(spec.hot_bidder_ratio, hot_bidders, next_base0_person(spec, ids, rng), rng)
+    channels, urls = channel_urls(rng, n, spec.hot_channel_ratio)
+    head = ([b'{"auction":', integers(auction_ids), b',"bidder":', integers(bidders),
+             b',"price":', integers(next_price(rng, n)), b',"channel":"'] + channels + [b'","url":"'] + urls
+            + [b'","date_time":"', format_times(timestamps), b'","extra":"'])
+    return with_extra(head, n, spec.avg_bid_bytes, rng)
+
+def generate_chunk(spec: GeneratorSpec, chunk: int) -> Dict[str, EncodedBatch]:
+    """Encoded records of one chunk of event ids, per event type"""
+    # Random streams follow the chunk's ids, so a continued spec draws what one long spec would
+    rng = np.random.default_rng([spec.seed, spec.first_event // CHUNK_EVENTS + chunk])
+    ids = spec.first_event + np.arange(chunk * CHUNK_EVENTS, min((chunk + 1) * CHUNK_EVENTS, spec.events),
+                                       dtype=np.int64)
+    if spec.out_of_order_group > 1:
+        whole = len(ids) // spec.out_of_order_group * spec.out_of_order_group
+        ids[:whole] = rng.permuted(ids[:whole].reshape(-1, spec.out_of_order_group), axis=1).ravel()
+    timestamps = spec.base_time_ms + (ids - spec.first_event) * 1000 // spec.event_rate
+    offset = ids % TOTAL_PROPORTION
+    is_person = offset < PERSON_PROPORTION
+    is_auction = ~is_person & (offset < PERSON_PROPORTION + AUCTION_PROPORTION)
+    is_bid = ~(is_person | is_auction)
+    batches = {
+        'person': persons(spec, ids[is_person], timestamps[is_person], rng),
+        'auction': auctions(spec, ids[is_auction], timestamps[is_auction], rng),
+        'bid': bids(spec, ids[is_bid], timestamps[is_bid], rng)
+    }
+    for batch, mask in zip(batches.values(), (is_person, is_auction, is_bid)):
+        batch.positions = np.flatnonzero(mask)
+    return batches
+
+def produce_shard(spec: GeneratorSpec, bootstrap_servers: str, shard: int, shards: int,
+                  topics: Dict[str, str]) -> Dict[str, int]:
+    """Produce every shards-th chunk, starting at shard, each to its partition of the input topics.
+
+    Paced, a chunk is released in slices of PACE_SECONDS of events, each once its first event is due.
+    """
+    producer = KafkaProducer(
+        bootstrap_servers=bootstrap_servers,
+        acks=1,
+        linger_ms=20,
+        batch_size=1024 * 1024,
+        buffer_memory=256 * 1024 * 1024
+    )
+    counts = dict.fromkeys(topics, 0)
+    try:
+        partitions = {kind: sorted(producer.partitions_for(topic)) for kind, topic in topics.items()}
+        started = time.monotonic()
+        for chunk in range(shard, spec.chunks, shards):
+            batches = generate_chunk(spec, chunk)
+            events = min(CHUNK_EVENTS, spec.events - chunk * CHUNK_EVENTS)
+            step = max(1, int(spec.event_rate * PACE_SECONDS)) if spec.paced else events
+            for start in range(0, events, step):
+                if spec.paced:
+                    delay = (chunk * CHUNK_EVENTS + start) / spec.event_rate - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                for kind, batch in batches.items():
+                    topic = topics[kind]
+                    partition = partitions[kind][(spec.first_event // CHUNK_EVENTS + chunk) % len(partitions[kind])]
+                    first, last = batch.span(start, start + step)
+                    for record in batch.records(first, last):
+                        producer.send(topic, value=record, partition=partition)
+                    counts[kind] += last - first
+        producer.flush()
+    finally:
+        producer.close()
+    return counts
+
+def generate_to_kafka(spec: GeneratorSpec, bootstrap_servers: str, topics: Dict[str, str] = TOPICS,
+                      processes: int = 0) -> Dict[str, int]:
+    """Generate the spec's events into the input topics, one shard per process, returning records per type"""
+    workers = max(1, min(spec.chunks, processes or os.cpu_count() or 1))
+    started = time.time()
+    totals = dict.fromkeys(topics, 0)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(produce_shard, spec, bootstrap_servers, shard, workers, topics)
+                   for shard in range(workers)]
+        for future in futures:
+            for kind, count in future.result().items():
+                totals[kind] += count
+    elapsed = time.time() - started
+    logger.info(f"Generated {spec.events} events in {elapsed:.2f}s ({spec.events / max(elapsed, 1e-9):.0f} events/s) "
+                f"with {workers} processes: {totals}")
+    return totals
+
+def start_generator(spec: GeneratorSpec, bootstrap_servers: str, topics: Dict[str, str] = TOPICS,
+                    processes: int = 0) -> Callable[[], None]:
+    """Generate in background processes, one per shard, returning a function that stops them"""
+    workers = max(1, min(spec.chunks, processes or os.cpu_count() or 1))
+    shards = [multiprocessing.Process(target=produce_shard, args=(spec, bootstrap_servers, shard, workers, topics),
+                                      daemon=True)
+              for shard in range(workers)]
+    for process in shards:
+        process.start()
+
+    def stop():
+        for process in shards:
+            process.terminate()
+        for process in shards:
+            process.join()
+    return stop
+
+# Cross-check against the reference generator
+
+def ks_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Two-sample Kolmogorov-Smirnov statistic"""
+    a, b = np.sort(a), np.sort(b)
+    values = np.concatenate([a, b])
+    return float(np.max(np.abs(np.searchsorted(a, values, side='right') / len(a)
+                               - np.searchsorted(b, values, side='right') / len(b))))
+
+def tv_distance(a: List, b: List) -> float:
+    """Total variation distance between the value frequencies of two samples"""
+    keys = set(a) | set(b)
+    return 0.5 * sum(abs(a.count(key) / len(a) - b.count(key) / len(b)) for key in keys)
+
+def top_share(values: List, fraction: float = 0.01) -> float:
+    """Share of the records that carry the most frequent values, which make up fraction of the distinct values"""
+    _, counts = np.unique(np.array(values), return_counts=True)
+    top = max(1, int(len(counts) * fraction))
+    return float(np.sort(counts)[::-1][:top].sum() / len(values))
+
+def parse_time(text: str) -> float:
+    return np.datetime64(text.replace(' ', 'T'), 'ms').astype(np.int64)
+
+def profile(records: Dict[str, List[bytes]]) -> Dict[str, object]:
+    """Distribution features of a sample of events, keyed by feature name"""
+    person = [json.loads(r) for r in records['person']]
+    auction = [json.loads(r) for r in records['auction']]
+    bid = [json.loads(r) for r in records['bid']]
+    bid_times = np.array([parse_time(r['date_time']) for r in bid])
+    return {
+        'bid.price': np.array([r['price'] for r in bid], dtype=np.float64),
+        'bid.bytes': np.array([len(r) for r in records['bid']], dtype=np.float64),
+        'bid.hot_auction_share': top_share([r['auction'] for r in bid]),
+        'bid.hot_bidder_share': top_share([r['bidder'] for r in bid]),
+        'bid.hot_channel_share': sum(r['channel'] in HOT_CHANNELS for r in bid) / len(bid),
+        'bid.out_of_order_share': float(np.mean(np.diff(bid_times) < 0)) if len(bid) > 1 else 0.0,
+        'auction.initial_bid': np.array([r['initialBid'] for r in auction], dtype=np.float64),
+        'auction.bytes': np.array([len(r) for r in records['auction']], dtype=np.float64),
+        'auction.category': [r['category'] for r in auction],
+        'auction.hot_seller_share': top_share([r['seller'] for r in auction]),
+        'person.bytes': np.array([len(r) for r in records['person']], dtype=np.float64),
+        'person.state': [r['state'] for r in person]
+    }
+
+def compare_profiles(reference: Dict[str, object], native: Dict[str, object]) -> List[Tuple[str, str, float]]:
+    """(feature, distance measure, distance) for every feature"""
+    rows = []
+    for name, ref in reference.items():
+        ours = native[name]
+        if isinstance(ref, np.ndarray):
+            rows.append((name, 'ks', ks_distance(ref, ours)))
+        elif isinstance(ref, list):
+            rows.append((name, 'tv', tv_distance(ref, ours)))
+        else:
+            rows.append((name, 'abs', abs(ref - ours)))
+    return rows
+
+def read_sample(bootstrap_servers: str, topics: Dict[str, str], sample: int) -> Dict[str, List[bytes]]:
+    """The first sample records of each input topic"""
+    records = {}
+    for kind, topic in topics.items():
+        consumer = KafkaConsumer(bootstrap_servers=bootstrap_servers, enable_auto_commit=False,
+                                 auto_offset_reset='earliest', consumer_timeout_ms=10000)
+        try:
+            partitions = [TopicPartition(topic, p) for p in sorted(consumer.partitions_for_topic(topic) or [])]
+            consumer.assign(partitions[:1])
+            consumer.seek_to_beginning()
+            values = []
+            for message in consumer:
+                values.append(message.value)
+                if len(values) >= sample:
+                    break
+            records[kind] = values
+        finally:
+            consumer.close()
+    return records
+
+def generate_sample(spec: GeneratorSpec, sample: int) -> Dict[str, List[bytes]]:
+    """The first sample records of each event type, generated in-process without Kafka"""
+    records = {kind: [] for kind in TOPICS}
+    for chunk in range(spec.chunks):
+        for kind, batch in generate_chunk(spec, chunk).items():
+            records[kind].extend(batch.records())
+        if all(len(values) >= sample for values in records.values()):
+            break
+    return {kind: values[:sample] for kind, values in records.items()}
+
+@click.group()
+def cli():
+    """Native Nexmark event generator"""
+
+@cli.command()
+@click.option('--bootstrap', default='localhost:19092', help='Kafka holding input topics of the reference generator')
+@click.option('--sample', default=10000, help='Records of each event type to compare')
+@click.option('--event-rate', default=300000, help='Event rate the reference data was generated at')
+@click.option('--seed', default=0, help='Seed of the native sample')
+@click.option('--tolerance', default=0.1, help='Largest accepted distance of any feature')
+def compare(bootstrap, sample, event_rate, seed, tolerance):
+    """Compare the distributions of the native generator with reference generator output in Kafka"""
+    reference = read_sample(bootstrap, TOPICS, sample)
+    if not all(reference.values()):
+        raise SystemExit(f"Reference topics hold no data: { {kind: len(v) for kind, v in reference.items()} }")
+    smallest = min(len(values) for values in reference.values())
+    # Enough events for the requested number of persons, the rarest event type
+    spec = GeneratorSpec(events=smallest * TOTAL_PROPORTION // PERSON_PROPORTION + CHUNK_EVENTS,
+                         event_rate=event_rate, seed=seed)
+    native = generate_sample(spec, smallest)
+    reference = {kind: values[:smallest] for kind, values in reference.items()}
+
+    failed = False
+    print(f"Compared {smallest} records of each event type")
+    print(f"{'Feature':<28} {'Measure':<8} {'Distance':>9} {'Status'}")
+    for name, measure, distance in compare_profiles(profile(reference), profile(native)):
+        status = 'OK' if distance <= tolerance else 'DIFFERS'
+        failed |= distance > tolerance
+        print(f"{name:<28} {measure:<8} {distance:>9.4f} {status}")
+    if failed:
+        raise SystemExit(1)
+
+@cli.command()
+@click.option('--events', default=1000000, help='Events to generate')
+@click.option('--processes', default=0, help='Worker processes, 0 for one per CPU')
+def bench(events, processes):
+    """Measure generation and encoding rate without Kafka"""
+    spec = GeneratorSpec(events=events, event_rate=300000)
+    workers = processes or os.cpu_count() or 1
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        encoded = sum(sum(len(batch.data) for batch in batches.values())
+                      for batches in pool.map(generate_chunk, [spec] * spec.chunks, range(spec.chunks)))
+    elapsed = time.time() - started
+    print(f"Encoded {events} events ({encoded / 1e6:.1f} MB) in {elapsed:.2f}s with {workers} processes: "
+          f"{events / elapsed:.0f} events/s")
+
+if __name__ == '__main__':
+    cli()
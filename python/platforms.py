@@ -0,0 +1,610 @@
+import math
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import docker
+import requests
+from kafka.admin import KafkaAdminClient
+from engine_metrics import ksql_query_metrics
+from report_upload import TimeplusHttp
+from scheduler import format_cpuset, parse_memory
+from sql_session import FlinkGatewaySession, KsqlSession, TimeplusSession
+
+logger = logging.getLogger(__name__)
+
+NODE_LABEL = 'nexmark.node'  # '<platform>/<role>' of a container, attributing its stats to a logical node
+
+Container = docker.models.containers.Container
+
+@dataclass
+class JobContext:
+    """Isolation settings for one (case, platform) job, the defaults are the serial path"""
+    job_id: str = ''
+    network: str = 'network_nexmark'
+    port_offset: int = 0
+    cpus: List[int] = field(default_factory=list)
+    cores_per_container: int = 0
+
+    def name(self, base: str) -> str:
+        """Container name, unique per job"""
+        return f'{base}-{self.job_id}' if self.job_id else base
+
+    def port(self, port: int) -> int:
+        """Host port mapped for a container port"""
+        return port + self.port_offset
+
+    def namespaced(self, name: str) -> str:
+        """Kafka topic or stream name, unique per job"""
+        return f'{name}_{self.job_id.upper()}' if self.job_id else name
+
+    def topic(self, case: str) -> str:
+        """Output topic of a case"""
+        return self.namespaced(f'nexmark_{case}'.upper())
+
+    def cpu_pinning(self, index: int = 0) -> Dict:
+        """Docker cpuset arguments for the index-th container of the job, empty when not pinned"""
+        if not self.cpus:
+            return {}
+        n = self.cores_per_container
+        cpus = self.cpus[index * n:(index + 1) * n] or self.cpus
+        return {'cpuset_cpus': format_cpuset(cpus)}
+
+class Platform(ABC):
+    """Engine plugin: how the benchmark starts, resets, submits to, observes, stops and sizes one engine.
+
+    The benchmark passes itself as host, for its config, Docker client, container manager, readiness waits
+    and image, network_config, script_dir and input_end_offsets.
+    """
+    name = ''
+    label = ''  # name in logs and reports
+    images: Tuple[str, ...] = ()  # image config fields the engine needs
+    memory_settings: Tuple[str, ...] = ()  # memory config fields of its containers, set by --memory-limit
+
+    def __init__(self, host):
+        self.host = host
+        self.config = host.config
+
+    @abstractmethod
+    def start(self, case: str, ctx: JobContext) -> List[Container]:
+        """Start a cold engine and wait until it accepts queries"""
+
+    @abstractmethod
+    def reset(self, containers: List[Container], ctx: JobContext):
+        """Remove every query and stream of a warm engine, so the next case starts from a clean engine"""
+
+    @abstractmethod
+    def session(self, ctx: JobContext):
+        """SQL session of a started engine, with execute(statement) and close()"""
+
+    @abstractmethod
+    def run_script(self, case: str, ctx: JobContext, containers: List[Container]):
+        """Run the case's script with the engine's SQL client, for query_submission 'cli'"""
+
+    def has_progress(self) -> bool:
+        """Whether pending_records is available"""
+        return True
+
+    @abstractmethod
+    def pending_records(self, ctx: JobContext, containers: List[Container]) -> Optional[float]:
+        """Input records the running queries have not consumed, None before the engine reports it"""
+
+    def scrape_metrics(self, ctx: JobContext, containers: List[Container]) -> Dict[str, Dict[str, float]]:
+        """The engine's own metrics of its running queries, per scope, named as in ENGINE_METRIC_FIELDS"""
+        return {}
+
+    def stop(self, containers: List[Container]):
+        """Stop a cold engine after its case"""
+        for container in containers:
+            try:
+                container.stop()
+            except Exception as e:
+                logger.warning(f"Failed to stop container {container.name}: {e}")
+
+    @abstractmethod
+    def requirements(self) -> Tuple[int, int]:
+        """Number of engine containers and total memory limit"""
+
+    def case_topics(self, case: str, ctx: JobContext) -> List[str]:
+        """Topics the case's query writes besides its output topic, deleted with it"""
+        return []
+
+    def state_topics(self, ctx: JobContext, warm: bool = False) -> List[str]:
+        """Patterns of internal topics the engine leaves in Kafka; with warm, only those a running engine can lose"""
+        return []
+
+    def consumer_group_prefix(self, ctx: JobContext) -> Optional[str]:
+        """Prefix of the consumer groups the engine's queries leave in Kafka"""
+        return None
+
+class FlinkPlatform(Platform):
+    """Flink session cluster: a JobManager, flink_taskmanagers TaskManagers and a SQL Gateway"""
+    name = 'flink'
+    label = 'Flink'
+    images = ('flink_image', 'flink_cli_image')
+    memory_settings = ('flink_jobmanager_memory', 'flink_taskmanager_memory')
+    # Task metrics of a vertex, summed over its subtasks, and the time metrics of its busiest subtask
+    VERTEX_COUNTERS = {'numRecordsIn': 'records_in', 'numRecordsOut': 'records_out',
+                       'numRecordsInPerSecond': 'records_in_per_sec', 'numRecordsOutPerSecond': 'records_out_per_sec'}
+    VERTEX_TIMES = {'backPressuredTimeMsPerSecond': 'backpressured_ms_per_sec', 'busyTimeMsPerSecond': 'busy_ms_per_sec'}
+
+    def start(self, case: str, ctx: JobContext) -> List[Container]:
+        """Start Flink cluster: the JobManager followed by flink_taskmanagers TaskManagers"""
+        taskmanagers = self.config.flink_taskmanagers
+        logger.info(f"Starting Flink cluster with {taskmanagers} TaskManagers...")
+
+        # JobManager
+        jm_config = {
+            'image': self.host.image('flink_image'),
+            'ports': {f'{self.config.flink_port}/tcp': ctx.port(self.config.flink_port)},
+            'name': ctx.name('flink-jobmanager'),
+            'command': 'jobmanager',
+            'environment': [
+                f'FLINK_PROPERTIES=jobmanager.rpc.address: flink-jobmanager\n'
+                f'parallelism.default: {self.config.parallelism}'
+            ],
+            'labels': {NODE_LABEL: 'flink/jobmanager'},
+            'mem_limit': self.config.flink_jobmanager_memory,
+            'cpu_period': self.config.cpu_period,
+            'cpu_quota': self.config.cpu_quota,
+            **ctx.cpu_pinning(0),
+            **self.host.network_config(ctx, 'flink-jobmanager'),
+            'detach': True,
+            'auto_remove': True
+        }
+
+        containers = [self.host.container_manager.create_container(**jm_config)]
+
+        # TaskManagers, with enough slots between them for the configured parallelism
+        slots = max(self.config.flink_taskmanager_slots, -(-self.config.parallelism // taskmanagers))
+        for index in range(taskmanagers):
+            # The first TaskManager keeps the single-TaskManager name
+            base = 'flink-taskmanager' if index == 0 else f'flink-taskmanager-{index}'
+            tm_config = {
+                'image': self.host.image('flink_image'),
+                'name': ctx.name(base),
+                'command': 'taskmanager',
+                'environment': [
+                    f'FLINK_PROPERTIES=jobmanager.rpc.address: flink-jobmanager\n'
+                    f'taskmanager.numberOfTaskSlots: {slots}\n'
+                    f'taskmanager.memory.flink.size: {self.config.flink_taskmanager_flink_memory}\n'
+                    f'taskmanager.memory.process.size: {self.config.flink_taskmanager_process_memory}'
+                ],
+                'labels': {NODE_LABEL: f'flink/taskmanager-{index}'},
+                'mem_limit': self.config.flink_taskmanager_memory,
+                'cpu_period': self.config.cpu_period,
+                'cpu_quota': self.config.cpu_quota,
+                **ctx.cpu_pinning(1 + index),
+                **self.host.network_config(ctx, base),
+                'detach': True,
+                'auto_remove': True
+            }
+            containers.append(self.host.container_manager.create_container(**tm_config))
+
+        if self.config.query_submission == 'session':
+            containers.append(self._start_sql_gateway(ctx, len(containers)))
+
+        # Wait for cluster to be ready
+        overview_url = f'http://localhost:{ctx.port(self.config.flink_port)}/overview'
+        deadline = self.config.flink_health_check_interval * self.config.flink_max_health_checks
+        if not self.host.wait_for_http_endpoint(overview_url, deadline):
+            raise RuntimeError("Flink cluster failed to start")
+
+        # Verify every taskmanager is registered
+        if self.host.readiness.wait_for_http(overview_url, deadline,
+                                             predicate=lambda r: r.json().get('taskmanagers', 0) >= taskmanagers):
+            gateway_url = f'http://localhost:{ctx.port(self.config.flink_sql_gateway_port)}/v1/info'
+            if self.config.query_submission == 'session' and not self.host.wait_for_http_endpoint(gateway_url, deadline):
+                raise RuntimeError("Flink SQL Gateway failed to start")
+            logger.info("Flink cluster is ready")
+            return containers
+
+        raise RuntimeError(f"Flink cluster failed to register {taskmanagers} taskmanagers")
+
+    def _start_sql_gateway(self, ctx: JobContext, index: int) -> Container:
+        """Start a SQL Gateway submitting to the JobManager, with the SQL client's connector jars"""
+        port = self.config.flink_sql_gateway_port
+        command = (
+            'cp /opt/sql-client/lib/*.jar /opt/flink/lib/ && exec /opt/flink/bin/sql-gateway.sh start-foreground '
+            f'-Dsql-gateway.endpoint.rest.address=0.0.0.0 -Dsql-gateway.endpoint.rest.port={port} '
+            f'-Dexecution.target=remote -Drest.address=flink-jobmanager -Drest.port={self.config.flink_port} '
+            f'-Djobmanager.rpc.address=flink-jobmanager -Dparallelism.default={self.config.parallelism}'
+        )
+        config = {
+            'image': self.host.image('flink_cli_image'),
+            'name': ctx.name('flink-sql-gateway'),
+            'entrypoint': ['bash', '-c', command],
+            'ports': {f'{port}/tcp': ctx.port(port)},
+            'labels': {NODE_LABEL: 'flink/sql-gateway'},
+            'cpu_period': self.config.cpu_period,
+            'cpu_quota': self.config.cpu_quota,
+            **ctx.cpu_pinning(index),
+            **self.host.network_config(ctx, 'flink-sql-gateway'),
+            'detach': True,
+            'auto_remove': True
+        }
+        return self.host.container_manager.create_container(**config)
+
+    def reset(self, containers: List[Container], ctx: JobContext):
+        """Cancel all Flink jobs and wait until they have terminated"""
+        base_url = f'http://localhost:{ctx.port(self.config.flink_port)}'
+        terminal_states = {'FINISHED', 'CANCELED', 'FAILED'}
+
+        def cancelled():
+            response = requests.get(f'{base_url}/jobs', timeout=5)
+            response.raise_for_status()
+            active = [job['id'] for job in response.json().get('jobs', []) if job['status'] not in terminal_states]
+            for job_id in active:
+                requests.patch(f'{base_url}/jobs/{job_id}', params={'mode': 'cancel'}, timeout=5)
+            return not active
+
+        if not self.host.readiness.poll('flink jobs cancelled', cancelled):
+            raise RuntimeError("Flink jobs did not cancel")
+
+    def session(self, ctx: JobContext):
+        return FlinkGatewaySession(f'http://localhost:{ctx.port(self.config.flink_sql_gateway_port)}')
+
+    def run_script(self, case: str, ctx: JobContext, containers: List[Container]):
+        """Run Flink SQL query"""
+        logger.info(f"Running Flink query for case: {case}")
+
+        config = {
+            'image': self.host.image('flink_cli_image'),
+            'name': ctx.name('run_flink_query'),
+            'entrypoint': [
+                '/opt/flink/bin/sql-client.sh',
+                'embedded',
+                '-l', '/opt/sql-client/lib',
+                '-f', f'/home/scripts/{case}.sql'
+            ],
+            'volumes': {self.host.script_dir(self.name, case, ctx): {'bind': '/home/scripts', 'mode': 'rw'}},
+            **({'cpuset_cpus': format_cpuset(ctx.cpus)} if ctx.cpus else {}),
+            'network': ctx.network,
+            'detach': False,
+            'auto_remove': True
+        }
+
+        try:
+            self.host.container_manager.create_container(**config)
+            logger.info(f"Flink query {case}.sql completed")
+        except Exception as e:
+            logger.error(f"Flink query failed: {e}")
+            raise RuntimeError(f"Flink query execution failed: {e}")
+
+    def pending_records(self, ctx: JobContext, containers: List[Container]) -> Optional[float]:
+        """Input records the Kafka sources of the running Flink jobs have not read, None before they report it"""
+        base_url = f'http://localhost:{ctx.port(self.config.flink_port)}'
+        response = requests.get(f'{base_url}/jobs', timeout=5)
+        response.raise_for_status()
+        running = [job['id'] for job in response.json().get('jobs', []) if job['status'] == 'RUNNING']
+
+        pending_total = None
+        for job_id in running:
+            job = requests.get(f'{base_url}/jobs/{job_id}', timeout=5).json()
+            for vertex in job.get('vertices', []):
+                metrics_url = f"{base_url}/jobs/{job_id}/vertices/{vertex['id']}/subtasks/metrics"
+                available = [m['id'] for m in requests.get(metrics_url, timeout=5).json()]
+                # FLIP-33 source metric, reported by the Kafka source operator of a chained vertex
+                pending = [name for name in available if name.endswith('pendingRecords')]
+                if not pending:
+                    continue
+                values = requests.get(metrics_url, params={'get': ','.join(pending), 'agg': 'sum'}, timeout=5).json()
+                pending_total = (pending_total or 0) + sum(float(value.get('sum', 0)) for value in values)
+        return pending_total
+
+    def scrape_metrics(self, ctx: JobContext, containers: List[Container]) -> Dict[str, Dict[str, float]]:
+        """Records, backpressure and busy time per vertex and checkpoints per job of the running jobs, from the REST API"""
+        base_url = f'http://localhost:{ctx.port(self.config.flink_port)}'
+        response = requests.get(f'{base_url}/jobs', timeout=5)
+        response.raise_for_status()
+        running = [job['id'] for job in response.json().get('jobs', []) if job['status'] == 'RUNNING']
+
+        scopes = {}
+        for job_id in running:
+            job = requests.get(f'{base_url}/jobs/{job_id}', timeout=5).json()
+            for vertex in job.get('vertices', []):
+                metrics_url = f"{base_url}/jobs/{job_id}/vertices/{vertex['id']}/subtasks/metrics"
+                available = [m['id'] for m in requests.get(metrics_url, timeout=5).json()]
+                # A source task has no network input, its FLIP-33 source operator counts the records it reads
+                source_in = [name for name in available if name.endswith('.numRecordsIn')]
+                names = [name for name in available if name in self.VERTEX_COUNTERS or name in self.VERTEX_TIMES]
+                if not names and not source_in:
+                    continue
+                values = requests.get(metrics_url, params={'get': ','.join(names + source_in), 'agg': 'sum,max'},
+                                      timeout=5).json()
+                metrics = {}
+                for value in values:
+                    if value['id'] in self.VERTEX_COUNTERS:
+                        metrics[self.VERTEX_COUNTERS[value['id']]] = float(value.get('sum', 0))
+                    elif value['id'] in self.VERTEX_TIMES:
+                        metrics[self.VERTEX_TIMES[value['id']]] = float(value.get('max', 0))
+                source = [float(value.get('sum', 0)) for value in values if value['id'] in source_in]
+                if source and not metrics.get('records_in'):
+                    # Chained operators after the source count fewer records, the largest count is the source's
+                    metrics['records_in'] = max(source)
+                    metrics.pop('records_in_per_sec', None)
+                scopes[vertex['name']] = metrics
+
+            checkpoints = requests.get(f'{base_url}/jobs/{job_id}/checkpoints', timeout=5).json()
+            counts = checkpoints.get('counts', {})
+            metrics = {'checkpoints_completed': counts.get('completed', 0), 'checkpoints_failed': counts.get('failed', 0)}
+            latest = (checkpoints.get('latest') or {}).get('completed')
+            if latest:
+                metrics['checkpoint_duration_ms'] = latest.get('end_to_end_duration', math.nan)
+                metrics['checkpoint_size_bytes'] = latest.get('state_size', math.nan)
+            scopes[job.get('name', job_id)] = metrics
+        return scopes
+
+    def requirements(self) -> Tuple[int, int]:
+        taskmanagers = self.config.flink_taskmanagers
+        gateway = 1 if self.config.query_submission == 'session' else 0
+        return 1 + taskmanagers + gateway, (parse_memory(self.config.flink_jobmanager_memory)
+                                            + taskmanagers * parse_memory(self.config.flink_taskmanager_memory))
+
+class TimeplusPlatform(Platform):
+    """Single timeplusd server"""
+    name = 'timeplus'
+    label = 'Timeplus'
+    images = ('timeplusd_image',)
+    memory_settings = ('timeplus_memory',)
+
+    def start(self, case: str, ctx: JobContext) -> List[Container]:
+        """Start Timeplus container"""
+        logger.info("Starting Timeplus container...")
+
+        config = {
+            'image': self.host.image('timeplusd_image'),
+            'ports': {
+                '3218/tcp': ctx.port(3218),  # HTTP Streaming
+                '8123/tcp': ctx.port(8123),  # HTTP Snapshot
+                '8463/tcp': ctx.port(8463)   # TCP Streaming
+            },
+            'name': ctx.name('timeplus'),
+            'labels': {NODE_LABEL: 'timeplus/server'},
+            'mem_limit': self.config.timeplus_memory,
+            'cpu_period': self.config.cpu_period,
+            'cpu_quota': self.config.cpu_quota,
+            **ctx.cpu_pinning(0),
+            'network': ctx.network,
+            'volumes': {self.host.script_dir(self.name, case, ctx): {'bind': '/home/scripts', 'mode': 'rw'}},
+            'healthcheck': {
+                'test': ["CMD", "curl", "http://localhost:3218/timeplus/ping"],
+                'interval': 2 * 1000000000,
+                'timeout': self.config.health_check_timeout * 1000000000,
+                'retries': self.config.health_check_retries,
+                'start_period': 10 * 1000000000
+            },
+            'detach': True,
+            'auto_remove': True
+        }
+
+        container = self.host.container_manager.create_container(**config)
+
+        if not self.host.wait_for_health(container):
+            raise RuntimeError("Timeplus container failed to become healthy")
+
+        return [container]
+
+    def reset(self, containers: List[Container], ctx: JobContext):
+        """Drop all materialized views, then all streams and external streams"""
+        container = containers[0]
+        query = ("SELECT name, engine FROM system.tables WHERE database = current_database() "
+                 "ORDER BY engine = 'MaterializedView' DESC FORMAT TSV")
+        exit_code, output = container.exec_run(['timeplusd', 'client', '--query', query])
+        if exit_code != 0:
+            raise RuntimeError(f"Failed to list Timeplus streams: {output}")
+
+        statements = []
+        for line in output.decode('utf-8').splitlines():
+            name, engine = line.split('\t')
+            kind = 'VIEW' if engine == 'MaterializedView' else 'STREAM'
+            statements.append(f'DROP {kind} IF EXISTS `{name}`')
+
+        if statements:
+            exit_code, output = container.exec_run(['timeplusd', 'client', '--multiquery', '--query', ';'.join(statements)])
+            if exit_code != 0:
+                raise RuntimeError(f"Failed to drop Timeplus streams: {output}")
+
+    def session(self, ctx: JobContext):
+        return TimeplusSession('localhost', ctx.port(3218), self.config.timeplusd_user,
+                               self.config.timeplusd_password, settings={'max_threads': str(self.config.parallelism)})
+
+    def run_script(self, case: str, ctx: JobContext, containers: List[Container]):
+        """Run Timeplus query"""
+        logger.info(f"Running Timeplus query for case: {case}")
+
+        cmd = [
+            'timeplusd',
+            'client',
+            '--multiquery',
+            f'--max_threads={self.config.parallelism}',
+            '--queries-file',
+            f'/home/scripts/{case}.sql'
+        ]
+
+        try:
+            exit_code, output = containers[0].exec_run(cmd)
+            if exit_code != 0:
+                raise RuntimeError(f"Timeplus query failed with exit code {exit_code}: {output}")
+            logger.info(f"Timeplus query {case}.sql completed successfully")
+        except Exception as e:
+            logger.error(f"Timeplus query execution failed: {e}")
+            raise RuntimeError(f"Timeplus query execution failed: {e}")
+
+    def has_progress(self) -> bool:
+        return bool(self.config.timeplus_progress_query)
+
+    def pending_records(self, ctx: JobContext, containers: List[Container]) -> Optional[float]:
+        """Unconsumed input records, as reported by the configured Timeplus progress query"""
+        exit_code, output = containers[0].exec_run(['timeplusd', 'client', '--query', self.config.timeplus_progress_query])
+        if exit_code != 0:
+            raise RuntimeError(f"Timeplus progress query failed: {output}")
+        return int(float(output.decode('utf-8').strip() or 0))
+
+    def scrape_metrics(self, ctx: JobContext, containers: List[Container]) -> Dict[str, Dict[str, float]]:
+        """Records and memory per running query, from the configured metrics query over the snapshot HTTP port"""
+        http = TimeplusHttp('localhost', ctx.port(8123), self.config.timeplusd_user, self.config.timeplusd_password,
+                            pool_size=1, retries=0)
+        try:
+            output = http.command(self.config.timeplus_metrics_query)
+        finally:
+            http.session.close()
+        scopes = {}
+        for line in output.splitlines():
+            scope, records_in, records_out, memory = line.split('\t')
+            scopes[scope] = {'records_in': float(records_in), 'records_out': float(records_out),
+                             'memory_bytes': float(memory)}
+        return scopes
+
+    def requirements(self) -> Tuple[int, int]:
+        return 1, parse_memory(self.config.timeplus_memory)
+
+class KsqldbPlatform(Platform):
+    """ksqldb_nodes ksqlDB servers sharing one service id"""
+    name = 'ksqldb'
+    label = 'KsqlDB'
+    images = ('ksqldb_image',)
+    memory_settings = ('ksqldb_memory',)
+
+    def service_id(self, ctx: JobContext) -> str:
+        return f'ksql_service_{ctx.job_id}_' if ctx.job_id else 'ksql_service_'
+
+    def start(self, case: str, ctx: JobContext) -> List[Container]:
+        """Start ksqldb_nodes KsqlDB servers sharing one service id, the first serving the REST API"""
+        logger.info(f"Starting {self.config.ksqldb_nodes} KsqlDB containers...")
+
+        containers = []
+        for index in range(self.config.ksqldb_nodes):
+            name = ctx.name('ksqldb' if index == 0 else f'ksqldb-{index}')
+            # Match your working docker-compose configuration exactly
+            ksqldb_config = {
+                'image': self.host.image('ksqldb_image'),
+                'ports': {'8088/tcp': ctx.port(8088)} if index == 0 else {},
+                'name': name,
+                'labels': {NODE_LABEL: f'ksqldb/server-{index}'},
+                'mem_limit': self.config.ksqldb_memory,
+                'cpu_period': self.config.cpu_period,
+                'cpu_quota': self.config.cpu_quota,
+                **ctx.cpu_pinning(index),
+                'network': ctx.network,
+                'environment': {
+                    'KSQL_BOOTSTRAP_SERVERS': 'kafka:9092',
+                    'KSQL_LISTENERS': 'http://0.0.0.0:8088/',
+                    # Servers of one service id forward requests to each other by this address
+                    'KSQL_KSQL_ADVERTISED_LISTENER': f'http://{name}:8088',
+                    'KSQL_KSQL_SERVICE_ID': self.service_id(ctx),
+                    'KSQL_KSQL_STREAMS_NUM_STREAM_THREADS': str(self.config.parallelism)
+                },
+                'volumes': {self.host.script_dir(self.name, case, ctx): {'bind': '/home/scripts', 'mode': 'rw'}},
+                'healthcheck': {
+                    'test': ["CMD", "curl", "http://localhost:8088/info"],
+                    'interval': 2 * 1000000000,  # 2 seconds in nanoseconds
+                    'timeout': 10 * 1000000000,    # 10 seconds in nanoseconds
+                    'retries': 3,
+                    'start_period': 10 * 1000000000  # 10 seconds in nanoseconds
+                },
+                'detach': True,  # Run container in detached mode
+                'auto_remove': True
+            }
+
+            ksqldb_container = self.host.client.containers.run(**ksqldb_config)
+            self.host.container_manager.containers.append(ksqldb_container)
+            logger.info(f"ksqldb container started: {ksqldb_container.id}")
+            containers.append(ksqldb_container)
+
+        # Servers start concurrently, a query is only submitted once all of them have joined
+        for ksqldb_container in containers:
+            if not self.host.wait_for_health(ksqldb_container, deadline=300):
+                raise RuntimeError(f"KsqlDB container {ksqldb_container.name} failed to become healthy")
+
+        return containers
+
+    def _ksql(self, ctx: JobContext, statement: str) -> List[Dict]:
+        """Run a statement on the ksqlDB REST API"""
+        response = requests.post(
+            f'http://localhost:{ctx.port(8088)}/ksql',
+            json={'ksql': statement, 'streamsProperties': {}},
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def reset(self, containers: List[Container], ctx: JobContext):
+        """Terminate all ksqlDB queries, then drop all tables and streams, keeping their topics"""
+        self._ksql(ctx, 'TERMINATE ALL;')
+        for table in self._ksql(ctx, 'SHOW TABLES;')[0].get('tables', []):
+            self._ksql(ctx, f"DROP TABLE IF EXISTS {table['name']};")
+        for stream in self._ksql(ctx, 'SHOW STREAMS;')[0].get('streams', []):
+            if stream['name'] != 'KSQL_PROCESSING_LOG':
+                self._ksql(ctx, f"DROP STREAM IF EXISTS {stream['name']};")
+
+    def session(self, ctx: JobContext):
+        return KsqlSession(f'http://localhost:{ctx.port(8088)}')
+
+    def run_script(self, case: str, ctx: JobContext, containers: List[Container]):
+        """Run KsqlDB query"""
+        logger.info(f"Running KsqlDB query for case: {case}")
+
+        cmd = [
+            'ksql',
+            'http://localhost:8088',
+            '--file',
+            f'/home/scripts/{case}.sql'
+        ]
+
+        try:
+            exit_code, output = containers[0].exec_run(cmd)
+            if exit_code != 0:
+                raise RuntimeError(f"KsqlDB query failed with exit code {exit_code}: {output}")
+            logger.info(f"KsqlDB query {case}.sql completed successfully")
+        except Exception as e:
+            logger.error(f"KsqlDB query execution failed: {e}")
+            raise RuntimeError(f"KsqlDB query execution failed: {e}")
+
+    def pending_records(self, ctx: JobContext, containers: List[Container]) -> Optional[float]:
+        """Input records the running ksqlDB queries have not committed, None before every query has committed"""
+        ends = self.host.input_end_offsets()
+        prefix = f'_confluent-ksql-{self.service_id(ctx)}query_'
+        admin = KafkaAdminClient(bootstrap_servers=self.config.kafka_bootstrap_servers)
+        try:
+            groups = [group_id for group_id, _ in admin.list_consumer_groups() if group_id.startswith(prefix)]
+            if not groups:
+                return None
+            lag = 0
+            for group_id in groups:
+                committed = admin.list_consumer_group_offsets(group_id)
+                if not any(tp in ends for tp in committed):
+                    return None
+                lag += sum(max(0, ends[tp] - metadata.offset) for tp, metadata in committed.items() if tp in ends)
+            return lag
+        finally:
+            admin.close()
+
+    def scrape_metrics(self, ctx: JobContext, containers: List[Container]) -> Dict[str, Dict[str, float]]:
+        """Messages per query from SHOW QUERIES EXTENDED, and failed commands from the server status"""
+        response = requests.get(f'http://localhost:{ctx.port(8088)}/status', timeout=5)
+        response.raise_for_status()
+        statuses = response.json().get('commandStatuses', {}).values()
+        scopes = {'commands': {'errors': sum(1 for status in statuses if status == 'ERROR')}}
+        for query in self._ksql(ctx, 'SHOW QUERIES EXTENDED;')[0].get('queryDescriptions', []):
+            scopes[query['id']] = ksql_query_metrics(query.get('statistics') or '', query.get('errorStats') or '')
+        return scopes
+
+    def requirements(self) -> Tuple[int, int]:
+        return self.config.ksqldb_nodes, self.config.ksqldb_nodes * parse_memory(self.config.ksqldb_memory)
+
+    def case_topics(self, case: str, ctx: JobContext) -> List[str]:
+        # Intermediate stream of the scripts that repartition their input
+        return [ctx.namespaced('PROCESSING_STREAM')]
+
+    def state_topics(self, ctx: JobContext, warm: bool = False) -> List[str]:
+        # Command and internal topics, which the next server of the service id would replay. A warm
+        # server keeps its command topic, its streams were dropped when it was reset.
+        service = f'_confluent-ksql-{self.service_id(ctx)}'
+        return [f'^{service}query_.*' if warm else f'^{service}.*']
+
+    def consumer_group_prefix(self, ctx: JobContext) -> Optional[str]:
+        return f'_confluent-ksql-{self.service_id(ctx)}'
+
+# Registered engines, in the order a case runs on them
+PLATFORMS = {platform.name: platform for platform in (FlinkPlatform, TimeplusPlatform, KsqldbPlatform)}
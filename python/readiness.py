@@ -0,0 +1,193 @@
+import re
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+import docker
+import requests
+from kafka import KafkaConsumer
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class WaitRecord:
+    """Duration of one readiness wait"""
+    name: str
+    duration: float
+    ready: bool
+
+class Backoff:
+    """Exponential backoff with full jitter, capped by an overall deadline"""
+
+    def __init__(self, deadline: float, initial: float = 0.05, maximum: float = 2.0, factor: float = 2.0):
+        self.deadline = time.monotonic() + deadline
+        self.delay = initial
+        self.maximum = maximum
+        self.factor = factor
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def sleep(self) -> bool:
+        """Sleep before the next attempt, returning False once the deadline has passed"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            return False
+        time.sleep(min(remaining, random.uniform(0, self.delay)))
+        self.delay = min(self.maximum, self.delay * self.factor)
+        return True
+
+class Readiness:
+    """Waits for containers, HTTP endpoints and Kafka to become ready, recording each wait's duration"""
+
+    def __init__(self, docker_client: docker.DockerClient, deadline: float = 120.0,
+                 initial_backoff: float = 0.05, max_backoff: float = 2.0):
+        self.client = docker_client
+        self.deadline = deadline
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.waits: List[WaitRecord] = []
+        self._local = threading.local()
+
+    def backoff(self, deadline: Optional[float] = None) -> Backoff:
+        return Backoff(deadline or self.deadline, self.initial_backoff, self.max_backoff)
+
+    def open_scope(self) -> List[WaitRecord]:
+        """Start collecting the waits made by the current thread into the returned list"""
+        scopes = getattr(self._local, 'scopes', None)
+        if scopes is None:
+            scopes = self._local.scopes = []
+        records: List[WaitRecord] = []
+        scopes.append(records)
+        return records
+
+    def close_scope(self, records: List[WaitRecord]):
+        scopes = getattr(self._local, 'scopes', [])
+        if records in scopes:
+            scopes.remove(records)
+
+    def _record(self, name: str, start: float, ready: bool) -> bool:
+        record = WaitRecord(name=name, duration=time.monotonic() - start, ready=ready)
+        self.waits.append(record)
+        for records in getattr(self._local, 'scopes', []):
+            records.append(record)
+        logger.info(f"Readiness wait '{name}': {'ready' if ready else 'not ready'} after {record.duration:.3f}s")
+        return ready
+
+    def poll(self, name: str, check: Callable[[], bool], deadline: Optional[float] = None) -> bool:
+        """Call check with backoff until it returns True or the deadline passes"""
+        start = time.monotonic()
+        backoff = self.backoff(deadline)
+        while True:
+            try:
+                if check():
+                    return self._record(name, start, True)
+            except Exception as e:
+                logger.debug(f"Readiness check '{name}' not ready: {e}")
+            if not backoff.sleep():
+                return self._record(name, start, False)
+
+    def wait_for_http(self, url: str, deadline: Optional[float] = None,
+                      predicate: Optional[Callable[[requests.Response], bool]] = None) -> bool:
+        """Wait for an HTTP endpoint to answer 200, and optionally satisfy a predicate"""
+        def check():
+            response = requests.get(url, timeout=5)
+            return response.status_code == 200 and (predicate is None or predicate(response))
+        return self.poll(f'http {url}', check, deadline)
+
+    def wait_for_container(self, container: docker.models.containers.Container,
+                           deadline: Optional[float] = None) -> bool:
+        """Wait for a container's health status to become healthy, driven by Docker events"""
+        start = time.monotonic()
+        deadline = deadline or self.deadline
+        name = f'container {container.name}'
+
+        # Subscribe before inspecting the container so no transition can be missed in between
+        events = self.client.events(
+            decode=True,
+            filters={'container': container.id},
+            until=int(time.time() + deadline) + 1
+        )
+        try:
+            state = self._container_state(container)
+            if state is not None:
+                return self._record(name, start, state)
+
+            for event in events:
+                action = event.get('Action') or event.get('status') or ''
+                if action.startswith('health_status'):
+                    status = action.split(':', 1)[-1].strip()
+                    if status == 'healthy':
+                        logger.info(f"Container {container.name} is healthy")
+                        return self._record(name, start, True)
+                    if status == 'unhealthy':
+                        logger.error(f"Container {container.name} is unhealthy")
+                        self._log_container(container)
+                        return self._record(name, start, False)
+                elif action in ('die', 'destroy', 'oom'):
+                    logger.error(f"Container {container.name} stopped during startup ({action})")
+                    self._log_container(container)
+                    return self._record(name, start, False)
+                if time.monotonic() - start >= deadline:
+                    break
+        except docker.errors.NotFound:
+            logger.error(f"Container {container.name} was removed or does not exist")
+            return self._record(name, start, False)
+        finally:
+            events.close()
+
+        logger.error(f"Container {container.name} failed to become healthy within {deadline}s")
+        return self._record(name, start, False)
+
+    def _container_state(self, container: docker.models.containers.Container) -> Optional[bool]:
+        """True if ready, False if failed, None if still starting"""
+        container.reload()
+        if container.status in ['exited', 'dead']:
+            logger.error(f"Container {container.name} has exited with status: {container.status}")
+            self._log_container(container)
+            return False
+
+        health_status = container.attrs.get('State', {}).get('Health', {}).get('Status')
+        if health_status == 'healthy':
+            logger.info(f"Container {container.name} is healthy")
+            return True
+        if health_status == 'unhealthy':
+            logger.error(f"Container {container.name} is unhealthy")
+            self._log_container(container)
+            return False
+        if health_status is None and container.status == 'running':
+            # Container might not have health check configured
+            logger.info(f"Container {container.name} is running (no health check configured)")
+            return True
+        return None
+
+    def _log_container(self, container: docker.models.containers.Container):
+        try:
+            logs = container.logs(tail=50).decode('utf-8')
+            logger.error(f"Container {container.name} logs:\n{logs}")
+        except Exception as e:
+            logger.warning(f"Could not retrieve logs for {container.name}: {e}")
+
+    def wait_for_kafka(self, bootstrap_servers: str, topics: Optional[List[str]] = None,
+                       absent: bool = False, deadline: Optional[float] = None) -> bool:
+        """Wait until the broker answers metadata requests and the given topics exist (or are gone).
+
+        Topics may be regular expressions when waiting for them to be absent.
+        """
+        topics = topics or []
+
+        def check():
+            consumer = KafkaConsumer(bootstrap_servers=bootstrap_servers, enable_auto_commit=False,
+                                     request_timeout_ms=5000, api_version_auto_timeout_ms=5000)
+            try:
+                existing = consumer.topics()
+                if absent:
+                    return not any(re.fullmatch(pattern, topic) for pattern in topics for topic in existing)
+                return all(topic in existing and consumer.partitions_for_topic(topic) for topic in topics)
+            finally:
+                consumer.close()
+
+        label = 'absent' if absent else 'present'
+        return self.poll(f'kafka topics {label} {topics}' if topics else 'kafka broker', check, deadline)
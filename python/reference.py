@@ -0,0 +1,525 @@
+import os
+import re
+import json
+import time
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+import numpy as np
+from cases import CASES
+from nexmark_generator import TOPICS
+from run_journal import replacing
+from verification import FINGERPRINT_MODULUS, normalize_name, normalize_value, row_hash
+
+logger = logging.getLogger(__name__)
+
+GOLDEN_FILE = 'golden_d{digits}.json'  # next to the cached dataset, per verify_float_digits
+WATERMARK_DELAY_MS = 4000  # every script declares WATERMARK FOR date_time AS date_time - INTERVAL '4' SECOND
+DAY_MS = 86400000
+READ_CHUNK = 1 << 16
+
+# Cases without one expected output
+UNSUPPORTED_CASES = {case.name: case.unverifiable for case in CASES if case.unverifiable}
+
+RANK_COLUMNS = ['total_bids', 'rank1_bids', 'rank2_bids', 'rank3_bids',
+                'total_bidders', 'rank1_bidders', 'rank2_bidders', 'rank3_bidders',
+                'total_auctions', 'rank1_auctions', 'rank2_auctions', 'rank3_auctions']
+
+# Output columns of each case, as the Flink scripts declare their sink tables
+OUTPUT_COLUMNS = {
+    'q0': ['auction', 'bidder', 'price', 'date_time', 'extra'],
+    'q1': ['auction', 'bidder', 'price', 'dateTime', 'extra'],
+    'q2': ['auction', 'price'],
+    'q3': ['name', 'city', 'state', 'id'],
+    'q4': ['id', 'final'],
+    'q5': ['auction', 'num'],
+    'q7': ['auction', 'bidder', 'price', 'dateTime', 'extra'],
+    'q8': ['id', 'name', 'stime'],
+    'q9': ['id', 'itemName', 'description', 'initialBid', 'reserve', 'dateTime', 'expires', 'seller', 'category',
+           'extra', 'auction', 'bidder', 'price', 'bid_dateTime', 'bid_extra'],
+    'q10': ['auction', 'bidder', 'price', 'date_time', 'extra', 'd1', 'd2'],
+    'q11': ['bidder', 'bid_count', 'starttime', 'endtime'],
+    'q14': ['auction', 'bidder', 'price', 'bidTimeType', 'dateTime', 'extra', 'c_counts'],
+    'q15': ['day'] + RANK_COLUMNS,
+    'q16': ['channel', 'day', 'minute'] + RANK_COLUMNS,
+    'q17': ['auction', 'day', 'total_bids', 'rank1_bids', 'rank2_bids', 'rank3_bids',
+            'min_price', 'max_price', 'avg_price', 'sum_price'],
+    'q18': ['auction', 'bidder', 'price', 'channel', 'url', 'dateTime', 'extra'],
+    'q20': ['auction', 'bidder', 'price', 'channel', 'url', 'bid_dateTime', 'bid_extra', 'itemName', 'description',
+            'initialBid', 'reserve', 'auction_dateTime', 'expires', 'seller', 'category', 'auction_extra'],
+    'q21': ['auction', 'bidder', 'price', 'channel', 'channel_id'],
+    'q22': ['auction', 'bidder', 'price', 'channel', 'dir1', 'dir2', 'dir3']
+}
+GOLDEN_CASES = list(OUTPUT_COLUMNS)
+# Cases hashed row by row while the bids are read, in worker processes
+BID_STREAM_CASES = ['q0', 'q1', 'q2', 'q10', 'q14', 'q20', 'q21', 'q22']
+
+Q3_STATES = ('or', 'wy', 'ca')
+Q21_CHANNELS = {'apple': '0', 'google': '1', 'facebook': '2', 'baidu': '3'}
+CHANNEL_ID = re.compile(r'(&|^)channel_id=([^&]*)')
+
+class GoldenResult:
+    """Order-independent fingerprint of a case's expected rows, computed as verification does for captured output"""
+
+    def __init__(self, columns: Sequence[str], float_digits: int):
+        self.columns = list(columns)
+        self.float_digits = float_digits
+        # Rows are built in canonical key order, so they encode as canonical() would without sorting each one
+        self.order = sorted((normalize_name(column), i) for i, column in enumerate(self.columns))
+        self.encoder = json.JSONEncoder(separators=(',', ':'))
+        self.rows = 0
+        self.total = 0
+
+    def add(self, *values):
+        row = {name: values[i] if type(values[i]) is int else normalize_value(values[i], self.float_digits)
+               for name, i in self.order}
+        self.total = (self.total + row_hash(self.encoder.encode(row))) % FINGERPRINT_MODULUS
+        self.rows += 1
+
+    def merge(self, rows: int, total: int):
+        self.rows += rows
+        self.total = (self.total + total) % FINGERPRINT_MODULUS
+
+    def summary(self) -> Dict:
+        return {'columns': [name for name, _ in self.order], 'rows': self.rows, 'fingerprint': f'{self.total:032x}'}
+
+def _raw_chunks(values: Iterable[Optional[bytes]]) -> Iterator[List[bytes]]:
+    chunk = []
+    for value in values:
+        if value:
+            chunk.append(value)
+            if len(chunk) >= READ_CHUNK:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def _chunks(values: Iterable[Optional[bytes]]) -> Iterator[List[Dict]]:
+    for chunk in _raw_chunks(values):
+        yield [json.loads(value) for value in chunk]
+
+def _ordered_map(function: Callable, chunks: Iterable, processes: int, initializer: Callable, initargs: tuple) -> Iterator:
+    """function of each chunk in worker processes, in chunk order, with a bounded number of chunks in flight"""
+    if processes <= 1:
+        initializer(*initargs)
+        yield from map(function, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(function, chunk))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _times(texts: List) -> np.ndarray:
+    """Epoch milliseconds of the events' date_time, read as UTC wall-clock time"""
+    return np.array(texts, dtype='datetime64[ms]').astype(np.int64)
+
+def _concat(parts: List[np.ndarray]) -> np.ndarray:
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+def _euro(price: int) -> float:
+    """0.908 * price, exactly as the DECIMAL(23, 3) the scripts output"""
+    millis = price * 908
+    return float(f'{millis // 1000}.{millis % 1000:03d}')
+
+def _group_last(keys: np.ndarray) -> np.ndarray:
+    """Mask of the last element of each run of equal keys"""
+    return np.r_[keys[1:] != keys[:-1], True] if len(keys) else np.zeros(0, dtype=bool)
+
+def _group_first(keys: np.ndarray) -> np.ndarray:
+    return np.r_[True, keys[1:] != keys[:-1]] if len(keys) else np.zeros(0, dtype=bool)
+
+def _distinct_counts(group: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    """Distinct values per group index"""
+    if not len(values):
+        return np.zeros(groups, dtype=np.int64)
+    width = int(values.max()) + 1
+    pairs = np.unique(group * width + values)
+    return np.bincount(pairs // width, minlength=groups)
+
+_bid_worker: tuple = ()
+
+def _init_bid_worker(q20_auctions: Dict[int, tuple], float_digits: int):
+    global _bid_worker
+    _bid_worker = (q20_auctions, float_digits)
+
+def _evaluate_bids(values: List[bytes]):
+    """Numeric columns and channels of a chunk of bids, and the partial fingerprints of the cases streamed over bids.
+
+    Channels are indexes into the returned channel names.
+    """
+    q20_auctions, float_digits = _bid_worker
+    r = {case: GoldenResult(OUTPUT_COLUMNS[case], float_digits) for case in BID_STREAM_CASES}
+    chunk = [json.loads(value) for value in values]
+    times = _times([e['date_time'] for e in chunk])
+    texts = np.datetime_as_string(times.astype('datetime64[ms]'), unit='ms').tolist()
+    for e, t, text in zip(chunk, times.tolist(), texts):
+        auction, bidder, price = e['auction'], e['bidder'], e['price']
+        channel, url, extra = e['channel'], e['url'], e['extra']
+        euro = _euro(price)
+        r['q0'].add(auction, bidder, price, t, extra)
+        r['q1'].add(auction, bidder, euro, t, extra)
+        if auction % 123 == 0:
+            r['q2'].add(auction, price)
+        r['q10'].add(auction, bidder, price, t, extra, text[:10], text[11:16])
+        if 1000000000 < price * 908 < 50000000000:
+            hour = int(text[11:13])
+            kind = 'dayTime' if 8 <= hour <= 18 else 'nightTime' if hour <= 6 or hour >= 20 else 'otherTime'
+            r['q14'].add(auction, bidder, euro, kind, t, extra, extra.count('c'))
+        auction_row = q20_auctions.get(auction)
+        if auction_row is not None:
+            r['q20'].add(auction, bidder, price, channel, url, t, extra, *auction_row)
+        match = CHANNEL_ID.search(url)
+        channel_id = match.group(2) if match else None
+        if channel.lower() in Q21_CHANNELS:
+            r['q21'].add(auction, bidder, price, channel, Q21_CHANNELS[channel.lower()])
+        elif channel_id is not None:
+            r['q21'].add(auction, bidder, price, channel, channel_id)
+        dirs = url.split('/')
+        r['q22'].add(auction, bidder, price, channel, *(dirs[i] if i < len(dirs) else None for i in (3, 4, 5)))
+
+    names, channels = np.unique([e['channel'] for e in chunk], return_inverse=True)
+    columns = {name: np.array([e[name] for e in chunk], dtype=np.int64) for name in ('auction', 'bidder', 'price')}
+    columns.update(date_time=times, channel=channels.astype(np.int64))
+    return columns, names.tolist(), {case: (result.rows, result.total) for case, result in r.items()}
+
+class ReferenceEvaluator:
+    """Expected output of the Nexmark cases on a dataset, computed from the input topics.
+
+    Numeric columns of every event are held as arrays; strings only where a case needs them. Cases that
+    stream over the bids are hashed while reading, in processes, and the strings of aggregated rows come
+    from a second read of the topics.
+    The semantics are the Flink scripts': windows fire once the watermark, 4s behind the largest event time
+    of its topic, passes their end, so windows still open at the end of the input emit nothing.
+    """
+
+    def __init__(self, read_topic: Callable[[str], Iterable[Optional[bytes]]], float_digits: int = 3,
+                 processes: int = 0):
+        self.read_topic = read_topic
+        self.float_digits = float_digits
+        self.processes = processes or os.cpu_count() or 1
+        self.results = {case: GoldenResult(columns, float_digits) for case, columns in OUTPUT_COLUMNS.items()}
+        self.watermarks: Dict[str, Optional[int]] = {}
+
+    def evaluate(self) -> Dict[str, Dict]:
+        """Summary of the expected rows of every supported case"""
+        started = time.time()
+        self._read_people()
+        self._read_auctions()
+        self._read_bids()
+        logger.info(f"Read {len(self.person_id)} people, {len(self.auction['id'])} auctions and "
+                    f"{len(self.bid['auction'])} bids in {time.time() - started:.1f}s")
+
+        selected = self._aggregate()
+        self._read_selected(*selected)
+        logger.info(f"Evaluated {len(self.results)} cases in {time.time() - started:.1f}s")
+        return {case: result.summary() for case, result in self.results.items()}
+
+    def _watermark(self, times: np.ndarray) -> Optional[int]:
+        return int(times.max()) - WATERMARK_DELAY_MS if len(times) else None
+
+    def _fired(self, ends: np.ndarray, topic: str) -> np.ndarray:
+        """Mask of the windows ending at ends the topic's final watermark has passed"""
+        watermark = self.watermarks[topic]
+        if watermark is None:
+            return np.zeros(len(ends), dtype=bool)
+        return ends - 1 <= watermark
+
+    def _read_people(self):
+        ids, times = [], []
+        self.names: Dict[int, str] = {}
+        self.q3_people: Dict[int, tuple] = {}
+        for chunk in _chunks(self.read_topic(TOPICS['person'])):
+            ids.append(np.array([e['id'] for e in chunk], dtype=np.int64))
+            times.append(_times([e['date_time'] for e in chunk]))
+            for e in chunk:
+                self.names[e['id']] = e['name']
+                if e['state'] in Q3_STATES:
+                    self.q3_people[e['id']] = (e['name'], e['city'], e['state'])
+        self.person_id = _concat(ids)
+        self.person_time = _concat(times)
+        self.watermarks['person'] = self._watermark(self.person_time)
+
+    def _read_auctions(self):
+        names = ('id', 'seller', 'category', 'initialBid', 'reserve')
+        parts = {name: [] for name in names + ('date_time', 'expires')}
+        self.q20_auctions: Dict[int, tuple] = {}
+        q3 = self.results['q3']
+        for chunk in _chunks(self.read_topic(TOPICS['auction'])):
+            for name in names:
+                parts[name].append(np.array([e[name] for e in chunk], dtype=np.int64))
+            times = _times([e['date_time'] for e in chunk])
+            expires = _times([e['expires'] for e in chunk])
+            parts['date_time'].append(times)
+            parts['expires'].append(expires)
+            for e, t, x in zip(chunk, times.tolist(), expires.tolist()):
+                if e['category'] == 14 and e['seller'] in self.q3_people:
+                    q3.add(*self.q3_people[e['seller']], e['id'])
+                if e['category'] == 10:
+                    self.q20_auctions[e['id']] = (e['itemName'], e['description'], e['initialBid'], e['reserve'],
+                                                  t, x, e['seller'], e['category'], e['extra'])
+        self.auction = {name: _concat(values) for name, values in parts.items()}
+        self.watermarks['auction'] = self._watermark(self.auction['date_time'])
+
+    def _read_bids(self):
+        parts = {name: [] for name in ('auction', 'bidder', 'price', 'date_time', 'channel')}
+        channels: Dict[str, int] = {}
+        chunks = _raw_chunks(self.read_topic(TOPICS['bid']))
+        for columns, names, partial in _ordered_map(_evaluate_bids, chunks, self.processes, _init_bid_worker,
+                                                    (self.q20_auctions, self.float_digits)):
+            codes = np.array([channels.setdefault(name, len(channels)) for name in names], dtype=np.int64)
+            columns['channel'] = codes[columns['channel']]
+            for name, values in columns.items():
+                parts[name].append(values)
+            for case, (rows, total) in partial.items():
+                self.results[case].merge(rows, total)
+        self.bid = {name: _concat(values) for name, values in parts.items()}
+        self.channels = list(channels)
+        self.watermarks['bid'] = self._watermark(self.bid['date_time'])
+
+    def _aggregate(self):
+        """Add the rows of the aggregating cases, returning the bids whose strings the rest need"""
+        self._q4()
+        self._q5()
+        self._q8()
+        self._q11()
+        self._q15_q16()
+        self._q17()
+        return self._q7(), self._q9(), self._q18()
+
+    def _auction_bids(self):
+        """(bid index, auction index) of the bids made while their auction was open"""
+        a, b = self.auction, self.bid
+        if not len(a['id']) or not len(b['auction']):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        order = np.argsort(a['id'], kind='stable')
+        sorted_ids = a['id'][order]
+        pos = np.minimum(np.searchsorted(sorted_ids, b['auction']), len(sorted_ids) - 1)
+        auction = order[pos]
+        open_bids = sorted_ids[pos] == b['auction']
+        open_bids &= (b['date_time'] >= a['date_time'][auction]) & (b['date_time'] <= a['expires'][auction])
+        bids = np.nonzero(open_bids)[0]
+        return bids, auction[bids]
+
+    def _q4(self):
+        bids, auctions = self._auction_bids()
+        final = np.full(len(self.auction['id']), -1, dtype=np.int64)
+        np.maximum.at(final, auctions, self.bid['price'][bids])
+        closed = np.unique(auctions)
+        categories, inverse = np.unique(self.auction['category'][closed], return_inverse=True)
+        sums = np.zeros(len(categories), dtype=np.int64)
+        np.add.at(sums, inverse, final[closed])
+        counts = np.bincount(inverse, minlength=len(categories))
+        # AVG of a BIGINT is a BIGINT
+        for category, total, count in zip(categories.tolist(), sums.tolist(), counts.tolist()):
+            self.results['q4'].add(category, total // count)
+
+    def _q5(self):
+        t, auction = self.bid['date_time'], self.bid['auction']
+        if not len(t):
+            return
+        # Count per 2s pane, then sum five panes into each 10s hopping window
+        pane = t // 2000
+        base = int(pane.min())
+        width = int(auction.max()) + 1
+        keys, counts = np.unique((pane - base) * width + auction, return_counts=True)
+        pane_index, pane_auction = keys // width, keys % width
+        starts = np.concatenate([pane_index - k for k in range(5)])
+        window_keys, inverse = np.unique((starts + 4) * width + np.tile(pane_auction, 5), return_inverse=True)
+        window_counts = np.bincount(inverse, weights=np.tile(counts, 5)).astype(np.int64)
+        window_start = window_keys // width - 4
+        window_auction = window_keys % width
+
+        fired = self._fired((window_start + base) * 2000 + 10000, 'bid')
+        window_start, window_auction, window_counts = window_start[fired], window_auction[fired], window_counts[fired]
+        windows, inverse = np.unique(window_start, return_inverse=True)
+        maxn = np.zeros(len(windows), dtype=np.int64)
+        np.maximum.at(maxn, inverse, window_counts)
+        top = window_counts >= maxn[inverse]
+
+        # Upserts keyed by auction: the auction's latest top window is its final row
+        order = np.lexsort((window_start[top], window_auction[top]))
+        auctions, nums = window_auction[top][order], window_counts[top][order]
+        last = _group_last(auctions)
+        for a, num in zip(auctions[last].tolist(), nums[last].tolist()):
+            self.results['q5'].add(a, num)
+
+    def _q7(self) -> np.ndarray:
+        """Times each bid is output: bids at a window's maximum price within [end - 10s, end] of it"""
+        t, price = self.bid['date_time'], self.bid['price']
+        selected = np.zeros(len(t), dtype=np.int64)
+        if not len(t):
+            return selected
+        window = t // 10000
+        windows, inverse = np.unique(window, return_inverse=True)
+        maxprice = np.full(len(windows), -1, dtype=np.int64)
+        np.maximum.at(maxprice, inverse, price)
+        fired = self._fired(windows * 10000 + 10000, 'bid')
+        selected += fired[inverse] & (price == maxprice[inverse])
+        # A bid exactly at a window's end also falls in the BETWEEN of the window before
+        pos = np.minimum(np.searchsorted(windows, window - 1), len(windows) - 1)
+        previous = (windows[pos] == window - 1) & (t % 10000 == 0)
+        selected += previous & fired[pos] & (price == maxprice[pos])
+        return selected
+
+    def _q8(self):
+        person_window = self.person_time // 10000
+        auction_window = self.auction['date_time'] // 10000
+        people = self._fired(person_window * 10000 + 10000, 'person')
+        sellers = self._fired(auction_window * 10000 + 10000, 'auction')
+        if not people.any() or not sellers.any():
+            return
+        low = int(min(person_window.min(), auction_window.min()))
+        span = int(max(person_window.max(), auction_window.max())) - low + 1
+        seller_keys = np.unique(self.auction['seller'][sellers] * span + auction_window[sellers] - low)
+        person_keys = np.unique(self.person_id[people] * span + person_window[people] - low)
+        for key in person_keys[np.isin(person_keys, seller_keys)].tolist():
+            person, window = divmod(key, span)
+            self.results['q8'].add(person, self.names[person], (window + low) * 10000)
+
+    def _q9(self) -> np.ndarray:
+        """Auction index of each bid that is the highest, earliest bid of its auction, else -1"""
+        bids, auctions = self._auction_bids()
+        price, t = self.bid['price'][bids], self.bid['date_time'][bids]
+        order = np.lexsort((bids, t, -price, auctions))
+        first = _group_first(auctions[order])
+        selected = np.full(len(self.bid['auction']), -1, dtype=np.int64)
+        selected[bids[order][first]] = auctions[order][first]
+        return selected
+
+    def _q11(self):
+        bidder, t = self.bid['bidder'], self.bid['date_time']
+        if not len(t):
+            return
+        order = np.lexsort((t, bidder))
+        bidder, t = bidder[order], t[order]
+        # A bid within the 10s gap after the previous bid of the bidder extends its session
+        starts = np.nonzero(np.r_[True, (bidder[1:] != bidder[:-1]) | (np.diff(t) >= 10000)])[0]
+        ends = np.r_[starts[1:], len(t)] - 1
+        endtime = t[ends] + 10000
+        fired = self._fired(endtime, 'bid')
+        for b, count, start, end in zip(bidder[starts][fired].tolist(), (ends - starts + 1)[fired].tolist(),
+                                        t[starts][fired].tolist(), endtime[fired].tolist()):
+            self.results['q11'].add(b, count, start, end)
+
+    def _days(self):
+        days, inverse = np.unique(self.bid['date_time'] // DAY_MS, return_inverse=True)
+        names = np.datetime_as_string((days * DAY_MS).astype('datetime64[ms]'), unit='D').tolist()
+        return names, inverse
+
+    def _rank_counts(self, group: np.ndarray, groups: int) -> List[List[int]]:
+        """Bids, distinct bidders and distinct auctions of each group, in total and per price rank"""
+        price = self.bid['price']
+        masks = [np.ones(len(price), dtype=bool), price < 10000, (price >= 10000) & (price < 1000000),
+                 price >= 1000000]
+        columns = [np.bincount(group[m], minlength=groups) for m in masks]
+        columns += [_distinct_counts(group[m], self.bid['bidder'][m], groups) for m in masks]
+        columns += [_distinct_counts(group[m], self.bid['auction'][m], groups) for m in masks]
+        return [column.tolist() for column in columns]
+
+    def _q15_q16(self):
+        if not len(self.bid['date_time']):
+            return
+        days, day = self._days()
+        for i, counts in enumerate(zip(*self._rank_counts(day, len(days)))):
+            if counts[0]:
+                self.results['q15'].add(days[i], *counts)
+
+        groups, group = np.unique(self.bid['channel'] * len(days) + day, return_inverse=True)
+        minute = np.zeros(len(groups), dtype=np.int64)
+        np.maximum.at(minute, group, (self.bid['date_time'] % DAY_MS) // 60000)
+        for (key, m), counts in zip(zip(groups.tolist(), minute.tolist()), zip(*self._rank_counts(group, len(groups)))):
+            channel, d = divmod(key, len(days))
+            self.results['q16'].add(self.channels[channel], days[d], f'{m // 60:02d}:{m % 60:02d}', *counts)
+
+    def _q17(self):
+        if not len(self.bid['date_time']):
+            return
+        days, day = self._days()
+        price = self.bid['price']
+        groups, group = np.unique(self.bid['auction'] * len(days) + day, return_inverse=True)
+        n = len(groups)
+        counts = [np.bincount(group[m], minlength=n).tolist()
+                  for m in (np.ones(len(price), dtype=bool), price < 10000, (price >= 10000) & (price < 1000000),
+                            price >= 1000000)]
+        low = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+        high = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+        total = np.zeros(n, dtype=np.int64)
+        np.minimum.at(low, group, price)
+        np.maximum.at(high, group, price)
+        np.add.at(total, group, price)
+        for i, key in enumerate(groups.tolist()):
+            auction, d = divmod(key, len(days))
+            self.results['q17'].add(auction, days[d], counts[0][i], counts[1][i], counts[2][i], counts[3][i],
+                                    int(low[i]), int(high[i]), int(total[i]) // counts[0][i], int(total[i]))
+
+    def _q18(self) -> np.ndarray:
+        """Mask of the latest bid of each (bidder, auction); of equal times, the one read last"""
+        b = self.bid
+        selected = np.zeros(len(b['auction']), dtype=bool)
+        order = np.lexsort((np.arange(len(selected)), b['date_time'], b['auction'], b['bidder']))
+        pairs = b['bidder'][order] * (int(b['auction'].max(initial=0)) + 1) + b['auction'][order]
+        selected[order[_group_last(pairs)]] = True
+        return selected
+
+    def _read_selected(self, q7: np.ndarray, q9: np.ndarray, q18: np.ndarray):
+        """Add the rows of the cases that output the strings of selected bids and auctions"""
+        if not (q7.any() or (q9 >= 0).any() or q18.any()):
+            return
+        r = self.results
+        q9_bids: Dict[int, tuple] = {}
+        wanted = (q7 > 0) | (q9 >= 0) | q18
+        index = 0
+        for chunk in _raw_chunks(self.read_topic(TOPICS['bid'])):
+            rows = np.nonzero(wanted[index:index + len(chunk)])[0]
+            events = [json.loads(chunk[i]) for i in rows.tolist()]
+            times = _times([e['date_time'] for e in events]).tolist()
+            for i, e, t in zip((rows + index).tolist(), events, times):
+                for _ in range(q7[i]):
+                    # The script selects B.price into bidder and B.bidder into price
+                    r['q7'].add(e['auction'], e['price'], e['bidder'], t, e['extra'])
+                if q18[i]:
+                    r['q18'].add(e['auction'], e['bidder'], e['price'], e['channel'], e['url'], t, e['extra'])
+                if q9[i] >= 0:
+                    q9_bids[int(q9[i])] = (e['auction'], e['bidder'], e['price'], t, e['extra'])
+            index += len(chunk)
+        if not q9_bids:
+            return
+
+        index = 0
+        for chunk in _chunks(self.read_topic(TOPICS['auction'])):
+            times = _times([e['date_time'] for e in chunk]).tolist()
+            expires = _times([e['expires'] for e in chunk]).tolist()
+            for i, (e, t, x) in enumerate(zip(chunk, times, expires), start=index):
+                bid = q9_bids.get(i)
+                if bid is not None:
+                    r['q9'].add(e['id'], e['itemName'], e['description'], e['initialBid'], e['reserve'], t, x,
+                                e['seller'], e['category'], e['extra'], *bid)
+            index += len(chunk)
+
+def golden_path(directory: str, float_digits: int) -> str:
+    return os.path.join(directory, GOLDEN_FILE.format(digits=float_digits))
+
+def load_golden(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def store_golden(path: str, read_topic: Callable[[str], Iterable[Optional[bytes]]], float_digits: int = 3,
+                 processes: int = 0) -> Dict:
+    """Evaluate the expected output of every supported case and store it as a golden artifact at path"""
+    golden = {
+        'float_digits': float_digits,
+        'created': time.time(),
+        'cases': ReferenceEvaluator(read_topic, float_digits, processes).evaluate(),
+        'unsupported': UNSUPPORTED_CASES
+    }
+    with replacing(path) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(golden, f, indent=2)
+    return golden
@@ -1,30 +1,276 @@
 import os
 import csv
+import math
+import json
 import time
+import random
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import click
-import timeplus_connect
+import requests
+from requests.adapters import HTTPAdapter
 
 db_name = 'nexmark'
 stats_stream_name = 'nexmark_benchmark_stats_report'
 result_stream_name  = 'nexmark_benchmark_result_report'
+engine_metrics_stream_name = 'nexmark_benchmark_engine_metrics_report'
 
 timeplus_host = os.getenv('TIMEPLUS_HOST', 'localhost')
 timeplus_port = os.getenv('TIMEPLUS_PORT', '3218')
 timeplus_user = os.getenv('TIMEPLUS_USER', 'proton')
 timeplus_password = os.getenv('TIMEPLUS_PASSWORD', 'timeplus@t+')
-client = timeplus_connect.get_client(host=timeplus_host, port=int(timeplus_port), user=timeplus_user, password=timeplus_password)
+
+# Typed columns of the streams; rows are keyed by (report_time, seq) so a retried upload overwrites instead of duplicating
+STATS_COLUMNS = [
+    ('report_time', 'string'),
+    ('seq', 'int64'),
+    ('case', 'string'),
+    ('platform', 'string'),
+    ('node', 'string'),
+    ('container_name', 'string'),
+    ('timestamp', 'datetime64(3)'),
+    ('cpu_percent', 'nullable(float64)'),
+    ('cpu_seconds', 'nullable(float64)'),
+    ('memory_usage_bytes', 'nullable(float64)'),
+    ('memory_rss_bytes', 'nullable(float64)'),
+    ('memory_limit_bytes', 'nullable(float64)'),
+    ('net_rx_bytes', 'nullable(float64)'),
+    ('net_tx_bytes', 'nullable(float64)'),
+    ('blk_read_bytes', 'nullable(float64)'),
+    ('blk_write_bytes', 'nullable(float64)'),
+    ('cpu_pressure_us', 'nullable(float64)'),
+    ('memory_pressure_us', 'nullable(float64)'),
+    ('io_pressure_us', 'nullable(float64)')
+]
+
+# Engine metrics join the stats on (report_time, case, platform, timestamp), their samples share the ticks
+ENGINE_METRICS_COLUMNS = [
+    ('report_time', 'string'),
+    ('seq', 'int64'),
+    ('case', 'string'),
+    ('platform', 'string'),
+    ('node', 'string'),
+    ('scope', 'string'),
+    ('timestamp', 'datetime64(3)'),
+    ('records_in', 'nullable(float64)'),
+    ('records_out', 'nullable(float64)'),
+    ('records_in_per_sec', 'nullable(float64)'),
+    ('records_out_per_sec', 'nullable(float64)'),
+    ('backpressured_ms_per_sec', 'nullable(float64)'),
+    ('busy_ms_per_sec', 'nullable(float64)'),
+    ('checkpoint_duration_ms', 'nullable(float64)'),
+    ('checkpoint_size_bytes', 'nullable(float64)'),
+    ('checkpoints_completed', 'nullable(float64)'),
+    ('checkpoints_failed', 'nullable(float64)'),
+    ('memory_bytes', 'nullable(float64)'),
+    ('errors', 'nullable(float64)')
+]
+
+RESULT_COLUMNS = [
+    ('report_time', 'string'),
+    ('seq', 'int64'),
+    ('case', 'string'),
+    ('platform', 'string'),
+    ('trial', 'int64'),
+    ('warmup', 'bool'),
+    ('statistic', 'string'),
+    ('execution_time', 'float64'),
+    ('output_size', 'int64'),
+    ('error', 'string'),
+    ('engine_mode', 'string'),
+    ('nodes', 'int64'),
+    ('startup_time', 'float64'),
+    ('readiness_time', 'float64'),
+    ('completion_detector', 'string'),
+    ('completion_time', 'nullable(float64)'),
+    ('detection_delay', 'nullable(float64)'),
+    ('cpu_seconds', 'float64'),
+    ('peak_memory_bytes', 'float64'),
+    ('first_output_time', 'nullable(float64)'),
+    ('last_output_time', 'nullable(float64)'),
+    ('input_events', 'int64'),
+    ('input_events_per_sec', 'nullable(float64)'),
+    ('output_records_per_sec', 'nullable(float64)'),
+    ('peak_output_records_per_sec', 'nullable(int64)'),
+    ('median_output_records_per_sec', 'nullable(float64)'),
+    ('lag_p50_ms', 'nullable(float64)'),
+    ('lag_p99_ms', 'nullable(float64)'),
+    ('lag_max_ms', 'nullable(float64)')
+]
+
+def create_stream_sql(name, columns):
+    column_defs = ',\n    '.join(f'{column} {column_type}' for column, column_type in columns)
+    return (f"CREATE STREAM IF NOT EXISTS {db_name}.{name} (\n    {column_defs}\n)\n"
+            f"PRIMARY KEY (report_time, seq)\nSETTINGS mode = 'versioned_kv'")
+
+def coerce(value, column_type):
+    """Convert a CSV or JSON value to the JSON value of a column type"""
+    if value is None or value == '':
+        if column_type.startswith('nullable'):
+            return None
+        if column_type == 'bool':
+            return False
+        return '' if column_type == 'string' else 0
+    if column_type == 'bool':
+        # CSV rows carry 'True'/'False'
+        return value if isinstance(value, bool) else value == 'True'
+    if 'int' in column_type:
+        return int(float(value))
+    if 'float' in column_type:
+        value = float(value)
+        return None if math.isnan(value) else value
+    if column_type.startswith('datetime'):
+        # Parquet timestamps arrive as datetimes, legacy JSON as ISO strings
+        text = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        return text.replace('T', ' ').split('+')[0]
+    return str(value)
+
+class TimeplusHttp:
+    """Timeplus HTTP interface, with pooled connections and retry with backoff"""
+
+    def __init__(self, host, port, user, password, pool_size=4, retries=5, initial_backoff=0.2, max_backoff=10.0,
+                 settings=None):
+        self.url = f'http://{host}:{port}/'
+        self.auth = (user, password)
+        self.settings = settings or {}  # query settings sent with every request, e.g. max_threads
+        self.retries = retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _post(self, query, body=None):
+        delay = self.initial_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(self.url, params={'query': query, **self.settings}, data=body, auth=self.auth, timeout=60)
+                if response.status_code < 500:
+                    if response.status_code >= 400:
+                        raise RuntimeError(f'{response.status_code}: {response.text.strip()}')
+                    return response.text
+                error = RuntimeError(f'{response.status_code}: {response.text.strip()}')
+            except requests.RequestException as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            # Full jitter keeps concurrent workers from retrying in lockstep
+            time.sleep(random.uniform(0, delay))
+            delay = min(self.max_backoff, delay * 2)
+
+    def command(self, sql):
+        return self._post(sql)
+
+    def insert(self, stream, column_names, body):
+        """Insert JSONEachRow encoded rows"""
+        columns = ', '.join(column_names)
+        self._post(f'INSERT INTO {db_name}.{stream} ({columns}) FORMAT JSONEachRow', body)
+
+class BatchUploader:
+    """Encodes rows into byte-bounded JSONEachRow batches and inserts them over a small pool of connections"""
+
+    def __init__(self, client, stream, columns, batch_bytes=4 * 1024 * 1024, concurrency=4):
+        self.client = client
+        self.stream = stream
+        self.columns = columns
+        self.column_names = [name for name, _ in columns]
+        self.batch_bytes = batch_bytes
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        # Bound the encoded batches in flight so a large file is not buffered whole
+        self.in_flight = threading.Semaphore(concurrency * 2)
+        self.futures = []
+        self.rows = 0
+        self.bytes = 0
+
+    def _submit(self, lines):
+        body = ''.join(lines).encode('utf-8')
+        self.in_flight.acquire()
+        future = self.executor.submit(self.client.insert, self.stream, self.column_names, body)
+        future.add_done_callback(lambda _: self.in_flight.release())
+        self.futures.append(future)
+        self.bytes += len(body)
+
+    def upload(self, rows):
+        """Upload rows (dicts of column values), returning the number of rows sent"""
+        lines, size = [], 0
+        try:
+            for row in rows:
+                line = json.dumps({name: coerce(row.get(name), column_type) for name, column_type in self.columns}) + '\n'
+                lines.append(line)
+                size += len(line)
+                self.rows += 1
+                if size >= self.batch_bytes:
+                    self._submit(lines)
+                    lines, size = [], 0
+            if lines:
+                self._submit(lines)
+            for future in self.futures:
+                future.result()
+        finally:
+            self.executor.shutdown()
+        return self.rows
+
+def stats_rows(report_time):
+    """Stats samples with a file-order sequence number, from the Parquet or legacy JSON stats file"""
+    parquet_file_name = f'stats_report_{report_time}.parquet'
+    seq = 0
+    if os.path.exists(parquet_file_name):
+        from stats_store import open_stats
+        for batch in open_stats(parquet_file_name).to_batches():
+            for row in batch.to_pylist():
+                row.update(report_time=report_time, seq=seq)
+                seq += 1
+                yield row
+    else:
+        with open(f'stats_report_{report_time}.json', 'r') as file:
+            for line in file:
+                row = json.loads(line)
+                # legacy files carry '<platform>_<case>' in case
+                if 'platform' not in row and '_' in row.get('case', ''):
+                    row['platform'], row['case'] = row['case'].split('_', 1)
+                row.update(report_time=report_time, seq=seq)
+                seq += 1
+                yield row
+
+def engine_metrics_rows(report_time):
+    """Engine metrics samples with a file-order sequence number, none when the run did not scrape them"""
+    parquet_file_name = f'engine_metrics_{report_time}.parquet'
+    json_file_name = f'engine_metrics_{report_time}.json'
+    seq = 0
+    if os.path.exists(parquet_file_name):
+        from stats_store import open_stats
+        for batch in open_stats(parquet_file_name).to_batches():
+            for row in batch.to_pylist():
+                row.update(report_time=report_time, seq=seq)
+                seq += 1
+                yield row
+    elif os.path.exists(json_file_name):
+        with open(json_file_name, 'r') as file:
+            for line in file:
+                row = json.loads(line)
+                row.update(report_time=report_time, seq=seq)
+                seq += 1
+                yield row
+
+def result_rows(report_time):
+    with open(f'report_{report_time}.csv', newline='') as csvfile:
+        # older reports have fewer columns; missing ones are uploaded as null
+        for seq, row in enumerate(csv.DictReader(csvfile)):
+            row.update(report_time=report_time, seq=seq)
+            yield row
 
 def extract_time_from_filename(filename):
     # Pattern: report_ followed by any characters, ending with .csv
     pattern = r'^report_(.+)\.csv$'
     match = re.match(pattern, filename)
-    
+
     if match:
         return match.group(1)  # Returns the time part
     else:
         return None
-    
+
 def get_last_report_time():
     #list file name in current directory
     files = os.listdir('.')
@@ -34,86 +280,65 @@ def get_last_report_time():
             report_time = extract_time_from_filename(file)
             if report_time:
                 report_times.append(report_time)
-                
+
     report_times.sort()
     last_report_time = report_times[-1]
     return last_report_time
 
+def init_streams(client):
+    client.command(f"CREATE DATABASE IF NOT EXISTS {db_name}")
+    client.command(create_stream_sql(stats_stream_name, STATS_COLUMNS))
+    client.command(create_stream_sql(result_stream_name, RESULT_COLUMNS))
+    client.command(create_stream_sql(engine_metrics_stream_name, ENGINE_METRICS_COLUMNS))
+
+def upload_report(client, report_time, batch_bytes=4 * 1024 * 1024, concurrency=4):
+    """Upload the stats and results of one report, returning (stats rows, result rows)"""
+    stats = BatchUploader(client, stats_stream_name, STATS_COLUMNS, batch_bytes, concurrency).upload(stats_rows(report_time))
+    results = BatchUploader(client, result_stream_name, RESULT_COLUMNS, batch_bytes, concurrency).upload(result_rows(report_time))
+    return stats, results
+
+def upload_engine_metrics(client, report_time, batch_bytes=4 * 1024 * 1024, concurrency=4):
+    """Upload the engine metrics of one report, returning the number of rows"""
+    return BatchUploader(client, engine_metrics_stream_name, ENGINE_METRICS_COLUMNS, batch_bytes,
+                         concurrency).upload(engine_metrics_rows(report_time))
+
 @click.command()
 @click.option('--report_time', help='the time of the report to be uploaded')
 @click.option('--init_stream', default=True, help='whether to initialize the stream, default to false')
-def main(report_time, init_stream):
-    report_time = report_time or get_last_report_time()
-    print(f"using report time {report_time}")
-    report_file_name = f'stats_report_{report_time}.json'
-    result_file_name = f'report_{report_time}.csv'
+@click.option('--batch-bytes', default=4 * 1024 * 1024, help='maximum encoded size of one insert')
+@click.option('--concurrency', default=4, help='number of concurrent insert connections')
+@click.option('--replay-spool', help='replay a live sink spool file instead of uploading a report')
+def main(report_time, init_stream, batch_bytes, concurrency, replay_spool):
+    client = TimeplusHttp(timeplus_host, timeplus_port, timeplus_user, timeplus_password, pool_size=concurrency)
 
     if init_stream:
         try:
-            client.command(f"CREATE DATABASE IF NOT EXISTS {db_name}")
+            init_streams(client)
         except Exception as e:
-            print(f'faile to create db {e}')
+            print(f'failed to create streams {e}')
             exit(1)
-            
+
+    if replay_spool:
+        from live_sink import replay_spool as replay
         try:
-            client.command(f"CREATE STREAM IF NOT EXISTS {db_name}.{stats_stream_name} (raw string, report_time string)")
+            print(f"replayed {replay(client, replay_spool)} rows from {replay_spool}")
         except Exception as e:
-            print(f'faile to create stats stream {e}')
+            print(f'failed to replay {e}')
             exit(1)
+        return
 
-        try:  # create a new result stream
-            client.command(f"""CREATE STREAM IF NOT EXISTS {db_name}.{result_stream_name} (
-                               report_time string,
-                               case string,
-                               platform string,
-                               execution_time float64,
-                               output_size int,
-                               error string
-                            )
-                           """)
-        except Exception as e:
-            print(f'faile to create result stream {e}')
-            exit(1)
-    
-    # wait for the stream to be created        
-    time.sleep(3)
-        
-    with open(report_file_name, 'r') as file:
-        batch = []
-        for line in file:
-            # Load each line as a JSON object
-            row = line.strip()
-            batch.append([row, report_time])
-            if len(batch) == 100:
-                try:
-                    client.insert(stats_stream_name, batch, column_names=['raw', 'report_time'], database=db_name)
-                    time.sleep(0.5)
-                except Exception as e:
-                    print(f'failed to ingest {e}')
-                finally:
-                    batch = []
-                    
-            try:
-                client.insert(stats_stream_name, batch, column_names=['raw', 'report_time'], database=db_name)
-                time.sleep(0.5)
-            except Exception as e:
-                print(f'failed to ingest {e}')
-                
-        print("stats data uploaded")
-                    
-    with open(result_file_name, newline='') as csvfile:
-        result_reader = csv.reader(csvfile)
-        next(result_reader)
-        for row in result_reader:
-            #print(row)
-            data = [report_time] + row
-            try:
-                client.insert(result_stream_name, [data], column_names=["report_time", "case","platform","execution_time","output_size","error"], database=db_name)
-                time.sleep(0.5)
-            except Exception as e:
-                print(f'failed to ingest {e}')
-                
-        print("result data uploaded")
+    report_time = report_time or get_last_report_time()
+    print(f"using report time {report_time}")
+
+    start = time.time()
+    try:
+        stats, results = upload_report(client, report_time, batch_bytes, concurrency)
+        engine_metrics = upload_engine_metrics(client, report_time, batch_bytes, concurrency)
+    except Exception as e:
+        print(f'failed to ingest {e}')
+        exit(1)
+    print(f"uploaded {stats} stats rows, {results} result rows and {engine_metrics} engine metrics rows "
+          f"in {time.time() - start:.2f}s")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
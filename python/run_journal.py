@@ -0,0 +1,123 @@
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_ROOT = '.runs'
+JOURNAL_FILE = 'journal.jsonl'
+PARAMS_FILE = 'params.json'
+
+@contextmanager
+def replacing(path: str):
+    """Yield a temporary path that replaces path once the block completes, so readers never see a partial file"""
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class RunJournal:
+    """Append-only journal of the finished trials of a run's (case, platform) pairs, fsynced after every entry.
+
+    A run lives in <root>/<run id>/ with the run parameters, the journal and the committed stats
+    of each finished trial, so an interrupted run can be resumed and its reports rebuilt.
+    """
+
+    def __init__(self, run_id: str, root: str = JOURNAL_ROOT):
+        self.run_id = run_id
+        self.directory = os.path.join(root, run_id)
+        self.stats_dir = os.path.join(self.directory, 'stats')
+        self.journal_path = os.path.join(self.directory, JOURNAL_FILE)
+        self.params: Dict = {}
+        self.entries: List[Dict] = []
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, run_id: str, params: Dict, root: str = JOURNAL_ROOT) -> 'RunJournal':
+        """Start the journal of a new run"""
+        journal = cls(run_id, root)
+        os.makedirs(journal.stats_dir, exist_ok=True)
+        journal.params = params
+        with replacing(os.path.join(journal.directory, PARAMS_FILE)) as tmp_path:
+            with open(tmp_path, 'w') as f:
+                json.dump(params, f, indent=2)
+        journal._file = open(journal.journal_path, 'a')
+        return journal
+
+    @classmethod
+    def resume(cls, run_id: str, root: str = JOURNAL_ROOT) -> 'RunJournal':
+        """Reopen the journal of an interrupted run, dropping an entry torn by the interruption"""
+        journal = cls(run_id, root)
+        params_path = os.path.join(journal.directory, PARAMS_FILE)
+        if not os.path.exists(params_path):
+            raise RuntimeError(f"No run journal for {run_id} in {root}")
+        with open(params_path) as f:
+            journal.params = json.load(f)
+
+        if os.path.exists(journal.journal_path):
+            with open(journal.journal_path, 'rb+') as f:
+                data = f.read()
+                complete = data.rfind(b'\n') + 1
+                if complete < len(data):
+                    logger.warning(f"Dropping a partial entry at the end of {journal.journal_path}")
+                    f.truncate(complete)
+            journal.entries = [json.loads(line) for line in data[:complete].splitlines() if line.strip()]
+
+        journal._file = open(journal.journal_path, 'a')
+        journal._append({'event': 'resume'})
+        return journal
+
+    @property
+    def attempt(self) -> int:
+        """Number of times the run was resumed, 0 for its first attempt"""
+        return sum(1 for entry in self._entries() if entry['event'] == 'resume')
+
+    def _append(self, entry: Dict):
+        line = json.dumps(entry, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.entries.append(entry)
+
+    def record_result(self, row: Dict):
+        """Durably record the report row of a finished test"""
+        self._append({'event': 'result', 'row': row})
+
+    def record_done(self, case: str, platform: str):
+        """Record that a pair needs no further trials"""
+        self._append({'event': 'done', 'case': case, 'platform': platform})
+
+    def _entries(self) -> List[Dict]:
+        with self._lock:
+            return list(self.entries)
+
+    def completed(self, case: str, platform: str) -> bool:
+        """Whether all trials of the pair are journaled"""
+        return any(entry['event'] == 'done' and entry['case'] == case and entry['platform'] == platform
+                   for entry in self._entries())
+
+    def trial_rows(self, case: str, platform: str) -> List[Dict]:
+        """Journaled trial rows of a pair, including those of earlier attempts of the run"""
+        return [entry['row'] for entry in self._entries()
+                if entry['event'] == 'result' and entry['row']['case'] == case and entry['row']['platform'] == platform]
+
+    def result_rows(self) -> List[Dict]:
+        """Report rows in journal order; case-level failures of earlier attempts are dropped since the case reruns"""
+        entries = self._entries()
+        last_resume = max((i for i, entry in enumerate(entries) if entry['event'] == 'resume'), default=-1)
+        return [entry['row'] for i, entry in enumerate(entries)
+                if entry['event'] == 'result' and (i > last_resume or entry['row']['platform'] != 'unknown')]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,74 @@
+import statistics
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, List, Optional, Sequence
+from trials import measured, metric_values
+
+SCALING_FIELDS = ['case', 'platform', 'partitions', 'cpu_quota_cores', 'run_id', 'trials', 'execution_time',
+                  'input_events_per_sec', 'speedup', 'efficiency', 'error']
+
+@dataclass(frozen=True)
+class ScalingPoint:
+    """One configuration of a scaling sweep: input/output partitions, and CPU cores per engine container"""
+    partitions: int
+    cores: float
+
+    @property
+    def label(self) -> str:
+        return f'p{self.partitions}_c{self.cores:g}'
+
+def scaling_grid(partitions: Sequence[int], cores: Sequence[float]) -> List[ScalingPoint]:
+    """Every (partitions, cores) combination, smallest first"""
+    return [ScalingPoint(p, c) for c, p in product(sorted(set(cores)), sorted(set(partitions)))]
+
+def _median(values: List[float]) -> Optional[float]:
+    return statistics.median(values) if values else None
+
+def point_rows(point: ScalingPoint, run_id: str, rows: List[Dict]) -> List[Dict]:
+    """One scaling row per (case, platform) of a sweep point, the median over its measured trials"""
+    pairs: Dict[tuple, List[Dict]] = {}
+    for row in rows:
+        pairs.setdefault((row['case'], row['platform']), []).append(row)
+
+    scaling = []
+    for (case, platform), pair_rows in pairs.items():
+        trial_rows = measured(pair_rows)
+        errors = [row['error'] for row in pair_rows if row.get('error')]
+        scaling.append({
+            'case': case,
+            'platform': platform,
+            'partitions': point.partitions,
+            'cpu_quota_cores': point.cores,
+            'run_id': run_id,
+            'trials': len(trial_rows),
+            'execution_time': _median(metric_values(trial_rows, 'execution_time')),
+            'input_events_per_sec': _median(metric_values(trial_rows, 'input_events_per_sec')),
+            'error': errors[0] if errors and not trial_rows else None
+        })
+    return scaling
+
+def add_speedup(rows: List[Dict]) -> List[Dict]:
+    """Fill speedup and efficiency of each row relative to the smallest point of its (case, platform).
+
+    Speedup is the throughput ratio, or the inverse execution time ratio where throughput is not reported;
+    efficiency divides it by the ratio of cores.
+    """
+    pairs: Dict[tuple, List[Dict]] = {}
+    for row in rows:
+        pairs.setdefault((row['case'], row['platform']), []).append(row)
+
+    for pair_rows in pairs.values():
+        candidates = [row for row in pair_rows if row.get('input_events_per_sec') or row.get('execution_time')]
+        if not candidates:
+            continue
+        base = min(candidates, key=lambda row: (row['cpu_quota_cores'], row['partitions']))
+        for row in pair_rows:
+            speedup = None
+            if row.get('input_events_per_sec') and base.get('input_events_per_sec'):
+                speedup = row['input_events_per_sec'] / base['input_events_per_sec']
+            elif row.get('execution_time') and base.get('execution_time'):
+                speedup = base['execution_time'] / row['execution_time']
+            row['speedup'] = speedup
+            row['efficiency'] = (speedup / (row['cpu_quota_cores'] / base['cpu_quota_cores'])
+                                 if speedup is not None else None)
+    return rows
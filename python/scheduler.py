@@ -0,0 +1,131 @@
+import os
+import math
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Callable, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+MEMORY_UNITS = {'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+def parse_memory(value: str) -> int:
+    """Convert a Docker memory string such as '4g' or '512M' to bytes"""
+    value = str(value).strip().lower()
+    if value and value[-1] in MEMORY_UNITS:
+        return int(float(value[:-1]) * MEMORY_UNITS[value[-1]])
+    return int(value)
+
+def parse_cpuset(spec: str) -> List[int]:
+    """Expand a cpuset string such as '0-3,8' into a list of CPU ids"""
+    cpus = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            low, high = part.split('-')
+            cpus.extend(range(int(low), int(high) + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+def format_cpuset(cpus: List[int]) -> str:
+    return ','.join(str(cpu) for cpu in sorted(cpus))
+
+def host_cpus() -> List[int]:
+    """CPUs this process is allowed to schedule on"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+def host_memory_bytes() -> int:
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+def cores_for_quota(cpu_quota_cores: float) -> int:
+    """Whole cores needed to pin a container without lowering its CPU quota"""
+    return max(1, math.ceil(cpu_quota_cores))
+
+@dataclass
+class Allocation:
+    """Resources granted to one running job"""
+    slot: int
+    cpus: List[int]
+    memory: int
+
+class AdmissionController:
+    """Hands out disjoint CPU sets and memory, blocking jobs until they fit"""
+
+    def __init__(self, cpus: List[int], memory: int, slots: int):
+        self.free_cpus = sorted(cpus)
+        self.total_cpus = len(cpus)
+        self.free_memory = memory
+        self.total_memory = memory
+        self.free_slots = list(range(slots))
+        self.condition = threading.Condition()
+
+    def check(self, cores: int, memory: int):
+        """Fail fast for jobs that could never be admitted"""
+        if cores > self.total_cpus:
+            raise ValueError(f"Job needs {cores} cores but only {self.total_cpus} are available for jobs")
+        if memory > self.total_memory:
+            raise ValueError(f"Job needs {memory} bytes of memory but only {self.total_memory} are available for jobs")
+
+    def acquire(self, cores: int, memory: int) -> Allocation:
+        self.check(cores, memory)
+        with self.condition:
+            while not (self.free_slots and len(self.free_cpus) >= cores and self.free_memory >= memory):
+                self.condition.wait()
+            cpus = self.free_cpus[:cores]
+            self.free_cpus = self.free_cpus[cores:]
+            self.free_memory -= memory
+            slot = self.free_slots.pop(0)
+            logger.info(f"Admitted job in slot {slot} with cpus {format_cpuset(cpus)} and {memory} bytes")
+            return Allocation(slot=slot, cpus=cpus, memory=memory)
+
+    def release(self, allocation: Allocation):
+        with self.condition:
+            self.free_cpus = sorted(self.free_cpus + allocation.cpus)
+            self.free_memory += allocation.memory
+            self.free_slots.append(allocation.slot)
+            self.free_slots.sort()
+            self.condition.notify_all()
+
+@dataclass
+class Job:
+    """One (case, platform) benchmark run"""
+    index: int
+    case: str
+    platform: str
+    cores: int
+    memory: int
+
+class ParallelScheduler:
+    """Runs jobs concurrently under an admission controller, returning results in job order"""
+
+    def __init__(self, admission: AdmissionController, max_workers: int):
+        self.admission = admission
+        self.max_workers = max_workers
+
+    def run(self, jobs: List[Job], runner: Callable[[Job, Allocation], Any],
+            on_error: Optional[Callable[[Job, Exception], Any]] = None) -> List[Any]:
+        for job in jobs:
+            self.admission.check(job.cores, job.memory)
+
+        def run_job(job: Job):
+            allocation = self.admission.acquire(job.cores, job.memory)
+            try:
+                return runner(job, allocation)
+            except Exception as e:
+                logger.error(f"Job {job.case}/{job.platform} failed: {e}")
+                if on_error is None:
+                    raise
+                return on_error(job, e)
+            finally:
+                self.admission.release(allocation)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(run_job, job) for job in jobs]
+            return [future.result() for future in futures]
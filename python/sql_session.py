@@ -0,0 +1,171 @@
+import re
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+import requests
+from report_upload import TimeplusHttp
+
+logger = logging.getLogger(__name__)
+
+# Statements that start processing input: the query clock starts at the first of them
+PROCESSING_STATEMENT = re.compile(
+    r'^(INSERT\b|EXECUTE\b|BEGIN\s+STATEMENT\s+SET\b|CREATE\s+(OR\s+REPLACE\s+)?MATERIALIZED\s+VIEW\b'
+    r'|CREATE\s+(OR\s+REPLACE\s+)?(STREAM|TABLE)\b.*?\bAS\s+SELECT\b)',
+    re.IGNORECASE | re.DOTALL)
+SET_STATEMENT = re.compile(r"^SET\s+'([^']+)'\s*=\s*'([^']*)'$", re.IGNORECASE | re.DOTALL)
+UNSET_STATEMENT = re.compile(r"^UNSET\s+'([^']+)'$", re.IGNORECASE | re.DOTALL)
+
+def strip_comments(statement: str) -> str:
+    """Statement without leading/trailing whitespace and comment-only lines before it"""
+    lines = statement.strip().splitlines()
+    while lines and (not lines[0].strip() or lines[0].strip().startswith('--')):
+        lines.pop(0)
+    return '\n'.join(lines).strip()
+
+def split_statements(script: str) -> List[str]:
+    """Statements of a SQL script, split at semicolons outside of quotes and comments"""
+    statements = []
+    current = []
+    quote = None
+    i = 0
+    while i < len(script):
+        char = script[i]
+        if quote:
+            current.append(char)
+            if char == quote:
+                quote = None
+        elif char in ("'", '"', '`'):
+            quote = char
+            current.append(char)
+        elif script.startswith('--', i):
+            end = script.find('\n', i)
+            end = len(script) if end < 0 else end
+            current.append(script[i:end])
+            i = end
+            continue
+        elif script.startswith('/*', i):
+            end = script.find('*/', i + 2)
+            end = len(script) if end < 0 else end + 2
+            current.append(script[i:end])
+            i = end
+            continue
+        elif char == ';':
+            statements.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statements.append(''.join(current))
+    return [statement for statement in map(strip_comments, statements) if statement]
+
+def is_processing(statement: str) -> bool:
+    return PROCESSING_STATEMENT.match(strip_comments(statement)) is not None
+
+def split_script(script: str) -> Tuple[List[str], List[str]]:
+    """(setup, processing) statements: everything before the first processing statement, and the rest"""
+    statements = split_statements(script)
+    for index, statement in enumerate(statements):
+        if is_processing(statement):
+            return statements[:index], statements[index:]
+    return statements, []
+
+class FlinkGatewaySession:
+    """Session on the Flink SQL Gateway REST API; each statement is waited for until it has finished or failed"""
+
+    def __init__(self, url: str, poll_interval: float = 0.05, timeout: float = 300.0):
+        self.url = url.rstrip('/')
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.handle: Optional[str] = None
+
+    def _open(self):
+        response = self.http.post(f'{self.url}/v1/sessions', json={}, timeout=30)
+        response.raise_for_status()
+        self.handle = response.json()['sessionHandle']
+
+    def execute(self, statement: str):
+        if self.handle is None:
+            self._open()
+        response = self.http.post(f'{self.url}/v1/sessions/{self.handle}/statements',
+                                  json={'statement': statement}, timeout=30)
+        if response.status_code == 404:
+            # The gateway expired an idle session, e.g. of a warm engine between cases
+            self._open()
+            response = self.http.post(f'{self.url}/v1/sessions/{self.handle}/statements',
+                                      json={'statement': statement}, timeout=30)
+        response.raise_for_status()
+        operation = f"{self.url}/v1/sessions/{self.handle}/operations/{response.json()['operationHandle']}"
+
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            status = self.http.get(f'{operation}/status', timeout=30).json()['status']
+            if status == 'FINISHED':
+                return
+            if status in ('ERROR', 'CANCELED', 'CLOSED', 'TIMEOUT'):
+                # The error is returned by the result endpoint
+                result = self.http.get(f'{operation}/result/0', timeout=30)
+                raise RuntimeError(f"Flink statement {status.lower()}: {result.text.strip()}")
+            time.sleep(self.poll_interval)
+        raise RuntimeError(f"Flink statement did not finish within {self.timeout}s")
+
+    def close(self):
+        if self.handle is not None:
+            try:
+                self.http.delete(f'{self.url}/v1/sessions/{self.handle}', timeout=10)
+            except requests.RequestException as e:
+                logger.debug(f"Failed to close Flink SQL Gateway session: {e}")
+            self.handle = None
+        self.http.close()
+
+class TimeplusSession:
+    """Statements over the Timeplus HTTP interface, on pooled keep-alive connections"""
+
+    def __init__(self, host: str, port: int, user: str, password: str, settings: Optional[Dict[str, str]] = None):
+        self.http = TimeplusHttp(host, port, user, password, pool_size=1, retries=2, settings=settings)
+
+    def execute(self, statement: str):
+        self.http.command(statement)
+
+    def close(self):
+        self.http.session.close()
+
+class KsqlSession:
+    """Statements over the ksqlDB /ksql REST endpoint.
+
+    SET and UNSET only change the properties sent with later statements, as in the ksql CLI,
+    and each statement waits for the server to have executed the previous one.
+    """
+
+    def __init__(self, url: str, timeout: float = 300.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.properties: Dict[str, str] = {}
+        self.sequence: Optional[int] = None
+
+    def execute(self, statement: str):
+        statement = strip_comments(statement)
+        match = SET_STATEMENT.match(statement)
+        if match:
+            self.properties[match.group(1)] = match.group(2)
+            return
+        match = UNSET_STATEMENT.match(statement)
+        if match:
+            self.properties.pop(match.group(1), None)
+            return
+        request = {'ksql': f'{statement};', 'streamsProperties': dict(self.properties)}
+        if self.sequence is not None:
+            request['commandSequenceNumber'] = self.sequence
+        response = self.http.post(f'{self.url}/ksql', json=request, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise RuntimeError(f"ksqlDB statement failed: {response.text.strip()}")
+        for entity in response.json():
+            if entity.get('commandSequenceNumber') is not None:
+                self.sequence = entity['commandSequenceNumber']
+            status = (entity.get('commandStatus') or {}).get('status')
+            if status in ('ERROR', 'TERMINATED'):
+                raise RuntimeError(f"ksqlDB statement failed: {entity['commandStatus'].get('message')}")
+
+    def close(self):
+        self.http.close()
@@ -0,0 +1,189 @@
+import os
+import json
+import math
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from container_stats import STAT_FIELDS, row_dict
+
+logger = logging.getLogger(__name__)
+
+# Label columns, dictionary-encoded since a run has few distinct values
+LABEL_FIELDS = ['case', 'platform', 'node', 'container_name']
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Columnar stats need pyarrow (pip install pyarrow), or use --stats-format json")
+    return pyarrow
+
+def stats_schema(fields: List[str] = STAT_FIELDS, labels: List[str] = LABEL_FIELDS):
+    """Schema of a stats file: the labels, then the timestamp and metrics of fields"""
+    pa = _pyarrow()
+    label_columns = [pa.field(name, pa.dictionary(pa.int32(), pa.string())) for name in labels]
+    metrics = [pa.field(name, pa.float64()) for name in fields[1:]]
+    return pa.schema(label_columns + [pa.field('timestamp', pa.timestamp('ms', tz='UTC'))] + metrics)
+
+class ParquetStatsWriter:
+    """Appends stats samples to a Parquet file, one row group per flush"""
+
+    def __init__(self, path: str, fields: List[str] = STAT_FIELDS, labels: List[str] = LABEL_FIELDS):
+        pa = _pyarrow()
+        self.path = path
+        self.schema = stats_schema(fields, labels)
+        self._writer = pa.parquet.ParquetWriter(path, self.schema, compression='zstd', use_dictionary=labels)
+        self._lock = threading.Lock()
+        self.rows = 0
+
+    def write(self, case: str, platform: str, container_name: str, rows: Sequence[Tuple[float, ...]], node: str = ''):
+        """Write samples of one container, each a tuple in the order of fields; container_name is the last label"""
+        if not rows:
+            return
+        pa = _pyarrow()
+        columns = list(zip(*rows))
+        arrays = [pa.DictionaryArray.from_arrays(pa.array([0] * len(rows), pa.int32()), pa.array([value]))
+                  for value in (case, platform, node, container_name)]
+        arrays.append(pa.array([int(t * 1000) for t in columns[0]], pa.int64()).cast(self.schema.field('timestamp').type))
+        # NaN marks a metric the backend does not report
+        arrays += [pa.array(column, pa.float64(), from_pandas=True) for column in columns[1:]]
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        with self._lock:
+            self._writer.write_table(table)
+            self.rows += len(rows)
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+
+class JsonStatsWriter:
+    """Legacy line-delimited JSON stats, one object per sample"""
+
+    def __init__(self, path: str, fields: List[str] = STAT_FIELDS, labels: List[str] = LABEL_FIELDS):
+        self.path = path
+        self.fields = fields
+        self.labels = labels
+        self._file = open(path, 'w')
+        self._lock = threading.Lock()
+        self.rows = 0
+
+    def _row(self, case: str, platform: str, container_name: str, values: Tuple[float, ...], node: str) -> Dict:
+        if self.fields is STAT_FIELDS:
+            return row_dict(values, f'{platform}_{case}' if platform else case, container_name, node)
+        row = dict(zip(self.labels, (case, platform, node, container_name)))
+        row['timestamp'] = datetime.fromtimestamp(values[0]).isoformat()
+        row.update((name, None if math.isnan(value) else value) for name, value in zip(self.fields[1:], values[1:]))
+        return row
+
+    def write(self, case: str, platform: str, container_name: str, rows: Sequence[Tuple[float, ...]], node: str = ''):
+        lines = [json.dumps(self._row(case, platform, container_name, values, node)) + '\n' for values in rows]
+        with self._lock:
+            self._file.writelines(lines)
+            self.rows += len(rows)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class TeeStatsWriter:
+    """Hands every flush to several stats writers, e.g. the stats file and a live sink"""
+
+    def __init__(self, *writers):
+        self.writers = writers
+        self.path = writers[0].path
+
+    def write(self, case: str, platform: str, container_name: str, rows: Sequence[Tuple[float, ...]], node: str = ''):
+        for writer in self.writers:
+            writer.write(case, platform, container_name, rows, node)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+STATS_EXTENSIONS = {'parquet': 'parquet', 'json': 'json'}
+
+class CheckpointStatsWriter:
+    """Writes the stats of each trial of a (case, platform) pair to its own file, published once the trial is committed.
+
+    Samples of a pair go to <prefix><platform>_<case>.<ext>.part; commit() closes and renames it to the trial's
+    file, so a trial interrupted mid-test leaves only a part file that is ignored and overwritten when it reruns.
+    """
+
+    def __init__(self, directory: str, stats_format: str, fields: List[str] = STAT_FIELDS,
+                 labels: List[str] = LABEL_FIELDS, prefix: str = ''):
+        self.path = directory
+        self.stats_format = stats_format
+        self.fields = fields
+        self.labels = labels
+        self.prefix = prefix  # keeps the files of several stores in one directory apart
+        self._writers: Dict[Tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+
+    def committed_path(self, case: str, platform: str, trial: int = 0) -> str:
+        return os.path.join(self.path, f'{self.prefix}{platform}_{case}_{trial}.{STATS_EXTENSIONS[self.stats_format]}')
+
+    def _part_path(self, case: str, platform: str) -> str:
+        return os.path.join(self.path, f'{self.prefix}{platform}_{case}.{STATS_EXTENSIONS[self.stats_format]}.part')
+
+    def _writer(self, case: str, platform: str):
+        with self._lock:
+            writer = self._writers.get((case, platform))
+            if writer is None:
+                part_path = self._part_path(case, platform)
+                writer_class = JsonStatsWriter if self.stats_format == 'json' else ParquetStatsWriter
+                writer = writer_class(part_path, self.fields, self.labels)
+                self._writers[(case, platform)] = writer
+            return writer
+
+    def write(self, case: str, platform: str, container_name: str, rows: Sequence[Tuple[float, ...]], node: str = ''):
+        if rows:
+            self._writer(case, platform).write(case, platform, container_name, rows, node)
+
+    def commit(self, case: str, platform: str, trial: int = 0):
+        """Publish the stats of a finished trial"""
+        with self._lock:
+            writer = self._writers.pop((case, platform), None)
+        if writer is not None:
+            writer.close()
+            os.replace(writer.path, self.committed_path(case, platform, trial))
+
+    def close(self):
+        """Close uncommitted pairs, leaving their part files behind"""
+        with self._lock:
+            writers, self._writers = list(self._writers.values()), {}
+        for writer in writers:
+            writer.close()
+
+def merge_stats(paths: List[str], stats_format: str, path: str, fields: List[str] = STAT_FIELDS,
+                labels: List[str] = LABEL_FIELDS) -> int:
+    """Concatenate committed stats files into one stats file, returning the number of samples"""
+    rows = 0
+    if stats_format == 'json':
+        with open(path, 'w') as out:
+            for source in paths:
+                with open(source) as f:
+                    for line in f:
+                        out.write(line)
+                        rows += 1
+        return rows
+    pa = _pyarrow()
+    writer = pa.parquet.ParquetWriter(path, stats_schema(fields, labels), compression='zstd', use_dictionary=labels)
+    try:
+        for source in paths:
+            # Row groups are copied one at a time, never the whole file
+            parquet_file = pa.parquet.ParquetFile(source)
+            for index in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(index)
+                writer.write_table(table)
+                rows += table.num_rows
+    finally:
+        writer.close()
+    return rows
+
+def open_stats(path: str, columns: Optional[List[str]] = None, filter=None):
+    """Lazily scan a Parquet stats file, reading only the requested columns and matching row groups"""
+    _pyarrow()
+    import pyarrow.dataset as ds
+    return ds.dataset(path, format='parquet').scanner(columns=columns, filter=filter)
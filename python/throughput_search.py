@@ -0,0 +1,128 @@
+import math
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A generator producing less than this fraction of the target rate limits the search, not the engine
+GENERATOR_SHORTFALL = 0.9
+
+@dataclass
+class SearchStep:
+    """One probe of the search: input produced at a target rate while the engine runs the query"""
+    rate: int  # target input events per second
+    produced_rate: float  # input events per second actually appended to the input topics
+    lag_growth: Optional[float]  # slope of the input lag over the measured window, in records per second
+    final_lag: Optional[float]  # input lag at the end of the measured window, in records
+    sustained: bool
+    generator_limited: bool
+
+SEARCH_FIELDS = ['case', 'platform', 'cpu_quota_cores', 'step', 'rate', 'produced_rate', 'lag_growth', 'final_lag',
+                 'sustained', 'generator_limited', 'sustainable_rate', 'error']
+
+def lag_slope(samples: List[Tuple[float, float]]) -> Optional[float]:
+    """Least-squares slope of (seconds, lag) samples"""
+    if len(samples) < 2:
+        return None
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_lag = sum(lag for _, lag in samples) / n
+    variance = sum((t - mean_t) ** 2 for t, _ in samples)
+    if variance == 0:
+        return None
+    return sum((t - mean_t) * (lag - mean_lag) for t, lag in samples) / variance
+
+class RateSearch:
+    """Bisection of the input rate between a sustained lower bound and an unsustained upper bound.
+
+    Rates are bisected geometrically, so a range spanning orders of magnitude takes few probes.
+    """
+
+    def __init__(self, min_rate: int, max_rate: int, precision: float = 0.1, max_steps: int = 10):
+        self.low = min_rate
+        self.high = max_rate
+        self.precision = precision
+        self.max_steps = max_steps
+        self.steps: List[SearchStep] = []
+        self.best: Optional[int] = None  # highest rate sustained so far
+        self.generator_limited = False
+
+    @property
+    def done(self) -> bool:
+        return (self.generator_limited or len(self.steps) >= self.max_steps
+                or self.high <= self.low * (1 + self.precision))
+
+    def next_rate(self) -> int:
+        return int(math.sqrt(self.low * self.high))
+
+    def record(self, step: SearchStep):
+        self.steps.append(step)
+        if step.generator_limited:
+            # Higher rates cannot be produced, so they cannot be probed either
+            self.generator_limited = True
+            logger.warning(f"Input generator reached only {step.produced_rate:.0f} of {step.rate} events/s, "
+                           f"stopping the search")
+        if step.sustained:
+            self.low = step.rate
+            self.best = int(step.produced_rate) if step.generator_limited else step.rate
+        else:
+            self.high = step.rate
+
+class RateProbe:
+    """Produces input at a target rate and judges from the input lag whether the engine keeps up"""
+
+    def __init__(self, start_input: Callable[[int], Callable[[], None]], input_offset: Callable[[], int],
+                 lag: Callable[[], Optional[float]], duration: float = 60.0, warmup: float = 15.0,
+                 sample_interval: float = 1.0, growth_tolerance: float = 0.01, max_lag_seconds: float = 10.0,
+                 drain_timeout: float = 120.0):
+        self.start_input = start_input  # starts producing at a rate, returning a function that stops it
+        self.input_offset = input_offset  # records appended to the input topics so far
+        self.lag = lag  # records not yet consumed by the engine, None while unknown
+        self.duration = duration
+        self.warmup = warmup
+        self.sample_interval = sample_interval
+        self.growth_tolerance = growth_tolerance
+        self.max_lag_seconds = max_lag_seconds
+        self.drain_timeout = drain_timeout
+
+    def run(self, rate: int) -> SearchStep:
+        stop_input = self.start_input(rate)
+        try:
+            # Let the producer and the engine ramp up before measuring
+            time.sleep(self.warmup)
+            first_offset = self.input_offset()
+            started = time.monotonic()
+            samples = []
+            while time.monotonic() - started < self.duration:
+                lag = self.lag()
+                if lag is not None:
+                    samples.append((time.monotonic() - started, lag))
+                time.sleep(self.sample_interval)
+            produced_rate = (self.input_offset() - first_offset) / (time.monotonic() - started)
+        finally:
+            stop_input()
+
+        growth = lag_slope(samples)
+        final_lag = samples[-1][1] if samples else None
+        # Bounded lag: it does not grow by more than a small fraction of the input, and stays within a few seconds of it
+        sustained = (growth is not None and growth <= self.growth_tolerance * rate
+                     and final_lag <= self.max_lag_seconds * rate)
+        step = SearchStep(rate=rate, produced_rate=produced_rate, lag_growth=growth, final_lag=final_lag,
+                          sustained=sustained, generator_limited=produced_rate < rate * GENERATOR_SHORTFALL)
+        logger.info(f"Probed {rate} events/s: produced {produced_rate:.0f}/s, lag growth "
+                    f"{growth if growth is None else round(growth)}/s, final lag {final_lag}, "
+                    f"{'sustained' if sustained else 'not sustained'}")
+        self._drain()
+        return step
+
+    def _drain(self):
+        """Wait for the engine to consume the backlog, so the next probe starts without one"""
+        deadline = time.monotonic() + self.drain_timeout
+        while time.monotonic() < deadline:
+            lag = self.lag()
+            if lag is not None and lag <= 0:
+                return
+            time.sleep(self.sample_interval)
+        logger.warning(f"Input lag did not drain within {self.drain_timeout}s, the next probe starts with a backlog")
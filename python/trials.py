@@ -0,0 +1,118 @@
+import math
+import random
+import statistics
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Report metrics summarized over the measured trials of a (case, platform) pair
+SUMMARY_METRICS = ['execution_time', 'completion_time', 'input_events_per_sec', 'output_records_per_sec',
+                   'lag_p99_ms', 'cpu_seconds', 'peak_memory_bytes']
+SUMMARY_STATISTICS = ['median', 'p5', 'p95', 'stdev', 'ci_low', 'ci_high']
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """q-th percentile (0-100) with linear interpolation between the closest ranks"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def bootstrap_ci(values: Sequence[float], confidence: float = 0.95, resamples: int = 2000,
+                 seed: int = 0) -> Tuple[float, float]:
+    """Percentile bootstrap confidence interval of the median"""
+    rng = random.Random(seed)
+    n = len(values)
+    medians = [statistics.median(rng.choices(values, k=n)) for _ in range(resamples)]
+    tail = (1 - confidence) / 2 * 100
+    return percentile(medians, tail), percentile(medians, 100 - tail)
+
+def summarize(values: Sequence[float], confidence: float = 0.95, resamples: int = 2000) -> Dict[str, Optional[float]]:
+    """Summary statistics of one metric over the measured trials; spread and CIs need two or more values"""
+    summary = dict.fromkeys(SUMMARY_STATISTICS)
+    if not values:
+        return summary
+    summary['median'] = statistics.median(values)
+    summary['p5'] = percentile(values, 5)
+    summary['p95'] = percentile(values, 95)
+    if len(values) > 1:
+        summary['stdev'] = statistics.stdev(values)
+        summary['ci_low'], summary['ci_high'] = bootstrap_ci(values, confidence, resamples)
+    return summary
+
+def measured(rows: List[Dict]) -> List[Dict]:
+    """Trial rows that count towards the summaries: not warm-up and not failed"""
+    return [row for row in rows if not row.get('warmup') and not row.get('error')]
+
+def metric_values(rows: List[Dict], metric: str) -> List[float]:
+    values = [row.get(metric) for row in rows]
+    return [float(value) for value in values if value is not None and not math.isnan(float(value))]
+
+@dataclass
+class TrialPolicy:
+    """How often a (case, platform) pair is run: warm-up trials, a fixed number of measured trials, and
+    optionally more until the confidence interval of one metric is narrow enough"""
+    trials: int = 1
+    warmup: int = 0
+    ci_target: float = 0.0  # relative half-width of the metric's median CI, 0 to run exactly `trials`
+    max_trials: int = 20
+    time_budget: float = 0.0  # seconds, 0 for no limit
+    metric: str = 'input_events_per_sec'
+    confidence: float = 0.95
+    resamples: int = 2000
+
+    def relative_ci(self, rows: List[Dict]) -> Optional[float]:
+        """Half-width of the metric's median CI relative to the median, None until it can be estimated"""
+        values = metric_values(measured(rows), self.metric)
+        if len(values) < 2:
+            return None
+        median = statistics.median(values)
+        if median == 0:
+            return None
+        low, high = bootstrap_ci(values, self.confidence, self.resamples)
+        return (high - low) / 2 / abs(median)
+
+    def done(self, rows: List[Dict], elapsed: float) -> bool:
+        """Whether the pair needs no further trial, given its trial rows so far"""
+        if any(row.get('error') for row in rows):
+            # A failing pair is not retried until it passes
+            return True
+        if len(rows) < self.warmup + self.trials:
+            return False
+        if self.ci_target <= 0:
+            return True
+        if len(measured(rows)) >= self.max_trials:
+            return True
+        if self.time_budget and elapsed >= self.time_budget:
+            return True
+        if not metric_values(measured(rows), self.metric):
+            # The metric is not reported for this pair, so it cannot converge
+            return True
+        relative = self.relative_ci(rows)
+        return relative is not None and relative <= self.ci_target
+
+def summary_rows(rows: List[Dict], confidence: float = 0.95, resamples: int = 2000) -> List[Dict]:
+    """One report row per summary statistic of each pair with two or more measured trials.
+
+    The statistic is named in 'statistic', its value is in each summarized metric's column,
+    and 'trial' holds the number of trials summarized.
+    """
+    pairs: Dict[Tuple[str, str], List[Dict]] = {}
+    for row in rows:
+        pairs.setdefault((row['case'], row['platform']), []).append(row)
+
+    summaries = []
+    for (case, platform), pair_rows in pairs.items():
+        trial_rows = measured(pair_rows)
+        if len(trial_rows) < 2:
+            continue
+        by_metric = {metric: summarize(metric_values(trial_rows, metric), confidence, resamples)
+                     for metric in SUMMARY_METRICS}
+        for statistic in SUMMARY_STATISTICS:
+            summaries.append({
+                'case': case,
+                'platform': platform,
+                'trial': len(trial_rows),
+                'statistic': statistic,
+                **{metric: by_metric[metric][statistic] for metric in SUMMARY_METRICS}
+            })
+    return summaries
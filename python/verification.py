@@ -0,0 +1,295 @@
+import os
+import re
+import json
+import heapq
+import hashlib
+import logging
+import calendar
+import tempfile
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+APPEND = 'append'  # every output record is a result row
+UPSERT = 'upsert'  # keyed changelog: the last record of each key is the row, an empty value deletes it
+
+VERIFICATION_FIELDS = ['case', 'platform', 'reference', 'status', 'mode', 'records', 'rows', 'columns',
+                       'fingerprint', 'missing', 'unexpected', 'samples']
+
+FLINK_UPSERT_SINK = re.compile(r"'connector'\s*=\s*'upsert-kafka'", re.IGNORECASE)
+KSQLDB_TABLE_SINK = re.compile(r"CREATE\s+(OR\s+REPLACE\s+)?TABLE\s+\w+\s+WITH\s*\([^)]*kafka_topic\s*=\s*'NEXMARK_",
+                               re.IGNORECASE)
+TIMESTAMP = re.compile(r'^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})(\.\d{1,9})?Z?$')
+FINGERPRINT_MODULUS = 1 << 128
+
+def output_mode(platform: str, script: str) -> str:
+    """Whether a platform's script writes its output topic as an append stream or as a keyed changelog"""
+    if platform == 'flink' and FLINK_UPSERT_SINK.search(script):
+        return UPSERT
+    if platform == 'ksqldb' and KSQLDB_TABLE_SINK.search(script):
+        return UPSERT
+    return APPEND
+
+def normalize_name(name: str) -> str:
+    """Column name shared by the platforms' spellings: dateTime, date_time and DATETIME are all datetime"""
+    return name.lower().replace('_', '')
+
+def normalize_value(value, float_digits: int):
+    """Value compared across platforms: rounded floats, integral numbers as int, timestamps as epoch milliseconds"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        value = round(value, float_digits)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str):
+        match = TIMESTAMP.match(value)
+        if match:
+            seconds = calendar.timegm(datetime.strptime(f'{match.group(1)} {match.group(2)}', '%Y-%m-%d %H:%M:%S').timetuple())
+            millis = int(float(match.group(3) or 0) * 1000)
+            return seconds * 1000 + millis
+        return value
+    if isinstance(value, dict):
+        return {normalize_name(k): normalize_value(v, float_digits) for k, v in value.items()}
+    if isinstance(value, list):
+        return [normalize_value(v, float_digits) for v in value]
+    return value
+
+def _json(payload: Optional[bytes]):
+    if payload is None:
+        return None
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return payload.decode('utf-8', errors='replace')
+
+def decode_rows(platform: str, key: Optional[bytes], value: Optional[bytes], float_digits: int) -> List[Dict]:
+    """Normalized rows of one output record.
+
+    Timeplus writes JSONEachRow, possibly several rows per record. Flink and ksqlDB write one JSON object;
+    ksqlDB leaves key columns out of the value, so the fields of a JSON object key are merged in.
+    """
+    if value is None:
+        return []
+    if platform == 'timeplus':
+        objects = [json.loads(line) for line in value.splitlines() if line.strip()]
+    else:
+        objects = [_json(value)]
+    key_fields = _json(key) if platform == 'ksqldb' else None
+    rows = []
+    for obj in objects:
+        if not isinstance(obj, dict):
+            obj = {'value': obj}
+        if isinstance(key_fields, dict):
+            obj = {**key_fields, **obj}
+        rows.append(normalize_value(obj, float_digits))
+    return rows
+
+def canonical(row: Dict) -> str:
+    return json.dumps(row, sort_keys=True, separators=(',', ':'))
+
+class ExternalSorter:
+    """Sorts lines in bounded memory: full buffers are sorted and spilled as runs, then merged"""
+
+    def __init__(self, directory: str, buffer_lines: int = 100000):
+        self.directory = directory
+        self.buffer_lines = buffer_lines
+        self.buffer: List[str] = []
+        self.runs: List[str] = []
+
+    def add(self, line: str):
+        self.buffer.append(line)
+        if len(self.buffer) >= self.buffer_lines:
+            self._spill()
+
+    def _spill(self):
+        fd, path = tempfile.mkstemp(prefix='run-', suffix='.txt', dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            for line in sorted(self.buffer):
+                f.write(line + '\n')
+        self.runs.append(path)
+        self.buffer = []
+
+    def sorted(self) -> Iterator[str]:
+        """The added lines in order; in memory when nothing was spilled"""
+        if not self.runs:
+            yield from sorted(self.buffer)
+            return
+        if self.buffer:
+            self._spill()
+        files = [open(path) for path in self.runs]
+        try:
+            yield from (line.rstrip('\n') for line in heapq.merge(*files))
+        finally:
+            for f in files:
+                f.close()
+
+    def close(self):
+        for path in self.runs:
+            os.remove(path)
+        self.runs = []
+        self.buffer = []
+
+def _compact(sorter: ExternalSorter) -> Iterator[str]:
+    """The last row of each key of (key, sequence, row) lines sorted by key and sequence, without deleted keys"""
+    for _, lines in groupby(sorter.sorted(), key=lambda line: line.split('\t', 1)[0]):
+        last = None
+        for last in lines:
+            pass
+        row = last.split('\t', 2)[2]
+        if row:
+            yield row
+
+def capture_output(platform: str, mode: str, records: Iterable[Tuple[int, int, Optional[bytes], Optional[bytes]]],
+                   path: str, float_digits: int = 3, buffer_lines: int = 100000) -> Dict:
+    """Write the normalized result rows of an output topic's records to path, one canonical JSON row per line.
+
+    Upsert output is compacted to the last row of each key with an external sort, so memory stays bounded.
+    Returns the capture's metadata, also written next to the rows.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    columns = set()
+    count = rows = 0
+    sorter = ExternalSorter(directory, buffer_lines)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    try:
+        with open(tmp_path, 'w') as out:
+            for partition, offset, key, value in records:
+                count += 1
+                decoded = decode_rows(platform, key, value, float_digits)
+                if mode == UPSERT:
+                    # Hex keeps the sort key free of tabs and newlines; a tombstone leaves the row empty
+                    sequence = f'{partition:06d}{offset:020d}'
+                    key_text = (key or b'').hex()
+                    for row in decoded or [None]:
+                        sorter.add(f'{key_text}\t{sequence}\t{canonical(row) if row is not None else ""}')
+                else:
+                    for row in decoded:
+                        columns.update(row)
+                        out.write(canonical(row) + '\n')
+                        rows += 1
+            if mode == UPSERT:
+                for line in _compact(sorter):
+                    columns.update(json.loads(line))
+                    out.write(line + '\n')
+                    rows += 1
+        os.replace(tmp_path, path)
+    finally:
+        sorter.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    meta = {'platform': platform, 'mode': mode, 'records': count, 'rows': rows, 'columns': sorted(columns)}
+    with open(f'{path}.json', 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+def load_capture(path: str) -> Dict:
+    with open(f'{path}.json') as f:
+        return json.load(f)
+
+def _projected(path: str, columns: List[str]) -> Iterator[str]:
+    with open(path) as f:
+        for line in f:
+            row = json.loads(line)
+            yield canonical({column: row.get(column) for column in columns})
+
+def row_hash(line: str) -> int:
+    return int.from_bytes(hashlib.blake2b(line.encode(), digest_size=16).digest(), 'big')
+
+def fingerprint(lines: Iterable[str]) -> Tuple[int, str]:
+    """(rows, hash) of a multiset of rows, independent of their order: the sum of the rows' 128-bit hashes"""
+    count = total = 0
+    for line in lines:
+        count += 1
+        total = (total + row_hash(line)) % FINGERPRINT_MODULUS
+    return count, f'{total:032x}'
+
+def diff(reference: Iterator[str], other: Iterator[str], samples: int) -> Tuple[int, int, Dict[str, List[str]]]:
+    """(missing, unexpected, samples) of two sorted row streams, compared as multisets"""
+    missing = unexpected = 0
+    found = {'missing': [], 'unexpected': []}
+    ref, oth = next(reference, None), next(other, None)
+    while ref is not None or oth is not None:
+        if oth is None or (ref is not None and ref < oth):
+            missing += 1
+            if len(found['missing']) < samples:
+                found['missing'].append(ref)
+            ref = next(reference, None)
+        elif ref is None or oth < ref:
+            unexpected += 1
+            if len(found['unexpected']) < samples:
+                found['unexpected'].append(oth)
+            oth = next(other, None)
+        else:
+            ref, oth = next(reference, None), next(other, None)
+    return missing, unexpected, found
+
+def _sorted_rows(path: str, columns: List[str], directory: str, buffer_lines: int) -> Tuple[ExternalSorter, Iterator[str]]:
+    sorter = ExternalSorter(directory, buffer_lines)
+    for line in _projected(path, columns):
+        sorter.add(line)
+    return sorter, sorter.sorted()
+
+def compare_outputs(case: str, captures: Dict[str, str], samples: int = 5,
+                    buffer_lines: int = 100000) -> List[Dict]:
+    """One verification row per platform of a case, comparing each captured output with the first platform's.
+
+    Rows are compared on the columns all platforms output. Fingerprints decide a match; only a mismatch
+    sorts both outputs externally to count and sample the differing rows.
+    """
+    metas = {platform: load_capture(path) for platform, path in captures.items()}
+    columns = sorted(set.intersection(*(set(meta['columns']) for meta in metas.values()))) if metas else []
+    reference = next(iter(captures), None)
+    prints = {platform: fingerprint(_projected(path, columns)) for platform, path in captures.items()} if columns else {}
+
+    rows = []
+    for platform, path in captures.items():
+        meta = metas[platform]
+        row = {'case': case, 'platform': platform, 'reference': reference, 'mode': meta['mode'],
+               'records': meta['records'], 'rows': meta['rows'], 'columns': ' '.join(columns),
+               'fingerprint': prints[platform][1] if platform in prints else None,
+               'missing': None, 'unexpected': None, 'samples': None}
+        if not columns:
+            row['status'] = 'incomparable'
+        elif platform == reference:
+            row['status'] = 'reference'
+        elif prints[platform] == prints[reference]:
+            row.update(status='match', missing=0, unexpected=0)
+        else:
+            directory = os.path.dirname(path) or '.'
+            ref_sorter, ref_rows = _sorted_rows(captures[reference], columns, directory, buffer_lines)
+            sorter, platform_rows = _sorted_rows(path, columns, directory, buffer_lines)
+            try:
+                missing, unexpected, found = diff(ref_rows, platform_rows, samples)
+            finally:
+                ref_rows.close()
+                platform_rows.close()
+                ref_sorter.close()
+                sorter.close()
+            row.update(status='mismatch', missing=missing, unexpected=unexpected, samples=json.dumps(found))
+        rows.append(row)
+    return rows
+
+def compare_golden(case: str, captures: Dict[str, str], golden: Dict) -> List[Dict]:
+    """One verification row per platform of a case, comparing its captured output with the golden result.
+
+    Only the fingerprint of the expected rows is known, so a mismatch has no row samples.
+    """
+    columns = golden['columns']
+    rows = []
+    for platform, path in captures.items():
+        meta = load_capture(path)
+        row = {'case': case, 'platform': platform, 'reference': 'golden', 'mode': meta['mode'],
+               'records': meta['records'], 'rows': meta['rows'], 'columns': ' '.join(columns),
+               'fingerprint': None, 'missing': None, 'unexpected': None, 'samples': None}
+        if meta['rows'] and not set(columns) <= set(meta['columns']):
+            row['status'] = 'incomparable'
+        else:
+            count, digest = fingerprint(_projected(path, columns))
+            row['fingerprint'] = digest
+            row['status'] = 'match' if (count, digest) == (golden['rows'], golden['fingerprint']) else 'mismatch'
+        rows.append(row)
+    return rows